@@ -1,12 +1,14 @@
+import argparse
+import heapq
+import os
 import statistics
-import traci
 import csv
-from collections import defaultdict
+import numpy as np
+from sumo_backend import traci, usar_backend, agregar_argumento_backend, agregar_argumentos_corrida, iniciar_sumo
 
 # Configuración de SUMO
-sumo_binary = "sumo"  # o "sumo-gui"
+sumo_binary = "sumo"  # o "sumo-gui" (solo con --backend traci)
 sumo_config = "./sumo_files/osm_actuated.sumocfg"
-traci.start([sumo_binary, "-c", sumo_config])
 
 # Semáforos y fases asociadas a carriles
 semaforos_ids = [
@@ -18,8 +20,8 @@ semaforos_ids = [
 
 fases_lanes_dict = {
     "2496228891": {
-        0: ["337277951#3_0", "337277951#3_1", "337277951#1_0", "337277951#1_1", "337277951#4_0", "337277951#4_1", "337277951#2_0", "337277951#2_1", "49217102_0"], 
-        2: ["567060342#1_0", "567060342#0_0"], 
+        0: ["337277951#3_0", "337277951#3_1", "337277951#1_0", "337277951#1_1", "337277951#4_0", "337277951#4_1", "337277951#2_0", "337277951#2_1", "49217102_0"],
+        2: ["567060342#1_0", "567060342#0_0"],
     },
     "cluster_12013799525_12013799526_2496228894": {
         0: ["42143912#5_0", "42143912#3_0", "42143912#4_0"],
@@ -35,122 +37,173 @@ fases_lanes_dict = {
     }
 }
 
-# Variables de control
-fase_actual = {}
-inicio_fase = {}
-historial_fases = []
+FASES_VERDES = (0, 2)  # solo se registran estas fases
+
+# ========= Seguimiento de fases =========
+# Una fila por fase verde terminada; el semáforo va como índice en semaforos
+DTYPE_FASE = np.dtype([
+    ("tiempo", "f8"),
+    ("semaforo", "i4"),
+    ("fase", "i4"),
+    ("duracion", "i8"),
+    ("vehiculos_en_carriles", "i4"),
+    ("paso_inicio", "i8"),
+])
+
+class SeguidorFases:
+    # Cada semáforo se suscribe a su fase y a su próximo cambio: SUMO manda ambos en la
+    # respuesta de simulationStep y el seguidor solo mira un semáforo cuando llega ese
+    # instante. Un actuado que extiende su verde corre el próximo cambio hacia adelante
+    # (se vuelve a encolar), pero nunca cambia antes del anunciado, así que alcanza con
+    # despertar en el mínimo de los próximos cambios.
+    def __init__(self, semaforos, fases_lanes, capacidad=4096):
+        self.semaforos = list(semaforos)
+        # Lanes únicos por (semáforo, fase): un vehículo está en un solo lane, así que
+        # sumar cantidades equivale a unir los IDs
+        self.carriles = {(i, fase): list(dict.fromkeys(lanes))
+                         for i, s in enumerate(self.semaforos) for fase, lanes in fases_lanes.get(s, {}).items()}
+        self.historial = np.zeros(capacidad, dtype=DTYPE_FASE)
+        self.n = 0
+        self.fase = [None] * len(self.semaforos)
+        self.inicio = [0] * len(self.semaforos)
+        self.eventos = []  # (próximo cambio, índice de semáforo)
+        self.verde_min = float('inf')
+        self.verde_max = float('-inf')
+
+    def suscribir(self):
+        for tls_id in self.semaforos:
+            traci.trafficlight.subscribe(tls_id, [traci.constants.TL_CURRENT_PHASE, traci.constants.TL_NEXT_SWITCH])
+
+    def _leer(self, i):
+        resultado = traci.trafficlight.getSubscriptionResults(self.semaforos[i])
+        return resultado[traci.constants.TL_CURRENT_PHASE], resultado[traci.constants.TL_NEXT_SWITCH]
+
+    def arrancar(self, paso):
+        # Primera lectura tras el primer simulationStep; paso es el instante anterior a él
+        ahora = traci.simulation.getTime()
+        for i in range(len(self.semaforos)):
+            self.fase[i], proximo = self._leer(i)
+            self.inicio[i] = paso
+            self.eventos.append((max(proximo, ahora + 1), i))
+        heapq.heapify(self.eventos)
+
+    def proximo_evento(self):
+        return self.eventos[0][0]
+
+    def _contar(self, i, fase):
+        return sum(traci.lane.getLastStepVehicleNumber(lane_id) for lane_id in self.carriles.get((i, fase), ()))
+
+    def registrar(self, i, fase, paso, ahora):
+        duracion = paso - self.inicio[i]
+        if self.n == len(self.historial):
+            self.historial = np.resize(self.historial, 2 * len(self.historial))
+        self.historial[self.n] = (ahora - duracion, i, fase, duracion, self._contar(i, fase), self.inicio[i])
+        self.n += 1
+        return duracion
+
+    def despertar(self, ahora):
+        # Los semáforos con cambio anunciado hasta ahora; el cambio de fase se fecha en el
+        # paso anterior, igual que el bucle que consultaba getPhase en cada paso
+        paso = int(ahora) - 1
+        while self.eventos and self.eventos[0][0] <= ahora:
+            _, i = heapq.heappop(self.eventos)
+            fase, proximo = self._leer(i)
+            if fase != self.fase[i]:
+                if self.fase[i] in FASES_VERDES:
+                    duracion = self.registrar(i, self.fase[i], paso, ahora)
+                    self.verde_min = min(self.verde_min, duracion)
+                    self.verde_max = max(self.verde_max, duracion)
+                self.fase[i] = fase
+                self.inicio[i] = paso
+            heapq.heappush(self.eventos, (max(proximo, ahora + 1), i))
+
+    def cerrar(self, paso):
+        # Fase en curso de cada semáforo al terminar la corrida (no cuenta para los límites de verde)
+        ahora = traci.simulation.getTime()
+        for i, fase in enumerate(self.fase):
+            if fase in FASES_VERDES:
+                self.registrar(i, fase, paso, ahora)
+
+    def filas(self):
+        return self.historial[:self.n]
+
+def ejecutar_actuado(seguidor, tiempo_fin=None):
+    # SUMO avanza de un cambio anunciado al siguiente con simulationStep(t); en el medio
+    # el script no hace nada
+    paso = int(traci.simulation.getTime())  # > 0 si se arrancó desde --estado-inicial
+    if traci.simulation.getMinExpectedNumber() <= 0 or (tiempo_fin is not None and paso >= tiempo_fin):
+        return paso
+    seguidor.suscribir()
+    traci.simulationStep()
+    seguidor.arrancar(paso)
+    ahora = traci.simulation.getTime()
 
-# Límites de verde globales
-tiempo_verde_min = float('inf')
-tiempo_verde_max = float('-inf')
-
-print("Iniciando simulación...\n")
-step = 0
-
-try:
     while traci.simulation.getMinExpectedNumber() > 0:
-        traci.simulationStep()
-
-        for tls_id in semaforos_ids:
-            fase = traci.trafficlight.getPhase(tls_id)
-
-            if tls_id not in fase_actual:
-                fase_actual[tls_id] = fase
-                inicio_fase[tls_id] = step
-                continue
-
-            # Detectar inicio de una nueva fase
-            if fase != fase_actual[tls_id]:
-                fase_anterior = fase_actual[tls_id]
-
-                # ✅ Solo fases 0 y 2
-                if fase_anterior in [0, 2]:
-                    duracion = step - inicio_fase[tls_id]
-                    vehiculos_en_fase = 0
-                    vehiculos_detectados = set()
-
-                    if tls_id in fases_lanes_dict and fase_anterior in fases_lanes_dict[tls_id]:
-                        carriles = list(set(fases_lanes_dict[tls_id][fase_anterior]))
-                        for lane_id in carriles:
-                            ids = traci.lane.getLastStepVehicleIDs(lane_id)
-                            vehiculos_detectados.update(ids)
-
-                        vehiculos_en_fase = len(vehiculos_detectados)
-
-                    historial_fases.append({
-                        "tiempo": traci.simulation.getTime() - duracion,
-                        "semaforo_id": tls_id,
-                        "fase": fase_anterior,
-                        "duracion": duracion,
-                        "vehiculos_en_carriles": vehiculos_en_fase,
-                        "paso_inicio": inicio_fase[tls_id]
-                    })
-
-                    # ⏱️ Actualizar tiempos mínimos y máximos
-                    tiempo_verde_min = min(tiempo_verde_min, duracion)
-                    tiempo_verde_max = max(tiempo_verde_max, duracion)
-
-                # Actualizar fase actual
-                fase_actual[tls_id] = fase
-                inicio_fase[tls_id] = step
-
-        step += 1
-
-    # Registrar fase final
-    for tls_id in semaforos_ids:
-        if tls_id in fase_actual:
-            fase_anterior = fase_actual[tls_id]
-
-            if fase_anterior in [0, 2]:
-                duracion = step - inicio_fase[tls_id]
-                vehiculos_en_fase = 0
-                if tls_id in fases_lanes_dict and fase_anterior in fases_lanes_dict[tls_id]:
-                    carriles = fases_lanes_dict[tls_id][fase_anterior]
-                    for lane_id in carriles:
-                        vehiculos_en_fase += traci.lane.getLastStepVehicleNumber(lane_id)
-
-                historial_fases.append({
-                    "tiempo": traci.simulation.getTime() - duracion,
-                    "semaforo_id": tls_id,
-                    "fase": fase_anterior,
-                    "duracion": duracion,
-                    "vehiculos_en_carriles": vehiculos_en_fase,
-                    "paso_inicio": inicio_fase[tls_id]
-                })
-finally:
-    traci.close()
-
-# Reporte final
-if tiempo_verde_min != float('inf'):
-    print(f"\n⏱️ Tiempo mínimo de verde observado: {tiempo_verde_min}s")
-    print(f"⏱️ Tiempo máximo de verde observado: {tiempo_verde_max}s")
-else:
-    print("\n⚠️ No se detectaron fases verdes (0 o 2)")
-
-# Obtener solo las duraciones de fases verdes (0 y 2)
-duraciones_verdes = [f["duracion"] for f in historial_fases if f["fase"] in [0, 2]]
-
-if duraciones_verdes:
-    media = statistics.mean(duraciones_verdes)
-    varianza = statistics.variance(duraciones_verdes) if len(duraciones_verdes) > 1 else 0
-    try:
-        moda = statistics.mode(duraciones_verdes)
-    except statistics.StatisticsError:
-        moda = "No única"
-
-    print(f"📊 Media de duración de verde     : {media:.2f}s")
-    print(f"📊 Moda de duración de verde      : {moda}")
-    print(f"📊 Varianza de duración de verde  : {varianza:.2f}")
-
-    # Guardar en CSV (añadir fila resumen al final)
-    csv_file = "datos_semaforos_actuated.csv"
+        if tiempo_fin is not None and ahora >= tiempo_fin:
+            break
+        objetivo = seguidor.proximo_evento()
+        if tiempo_fin is not None:
+            objetivo = min(objetivo, tiempo_fin)
+        traci.simulationStep(objetivo)
+        ahora = traci.simulation.getTime()
+        seguidor.despertar(ahora)
+    return int(ahora)
+
+def guardar_historial(seguidor, csv_file):
+    filas = seguidor.filas()
+    semaforos = seguidor.semaforos
     with open(csv_file, mode='w', newline='') as file:
-        fieldnames = ["tiempo", "semaforo_id", "fase", "duracion", "vehiculos_en_carriles", "paso_inicio"]
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        writer.writeheader()
-        for entry in historial_fases:
-            writer.writerow(entry)
-    print(f"\nHistorial guardado en {csv_file}")
-else:
-    print("⚠️ No se encontraron fases verdes para cálculo estadístico.")
-
+        writer = csv.writer(file)
+        writer.writerow(["tiempo", "semaforo_id", "fase", "duracion", "vehiculos_en_carriles", "paso_inicio"])
+        for tiempo, i, fase, duracion, vehiculos, paso_inicio in filas.tolist():
+            writer.writerow([tiempo, semaforos[i], fase, duracion, vehiculos, paso_inicio])
+
+# ========= MAIN =========
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Semáforos actuados de SUMO (línea base)")
+    agregar_argumento_backend(parser)
+    parser.add_argument("--salida", default=".", help="directorio del CSV de semáforos")
+    agregar_argumentos_corrida(parser)
+    args = parser.parse_args()
+    if args.backend == "simulado" and args.estado_inicial:
+        parser.error("--estado-inicial necesita SUMO: el backend simulado no carga estados")
+    usar_backend(args.backend)
+
+    iniciar_sumo(sumo_config, args, sumo_binary)
+    seguidor = SeguidorFases(semaforos_ids, fases_lanes_dict)
+
+    print("Iniciando simulación...\n")
+    try:
+        paso_final = ejecutar_actuado(seguidor, args.fin)
+        seguidor.cerrar(paso_final)
+    finally:
+        traci.close()
+
+    # Reporte final
+    if seguidor.verde_min != float('inf'):
+        print(f"\n⏱️ Tiempo mínimo de verde observado: {seguidor.verde_min}s")
+        print(f"⏱️ Tiempo máximo de verde observado: {seguidor.verde_max}s")
+    else:
+        print("\n⚠️ No se detectaron fases verdes (0 o 2)")
+
+    # Solo se registran fases verdes (0 y 2)
+    duraciones_verdes = seguidor.filas()["duracion"].tolist()
+
+    if duraciones_verdes:
+        media = statistics.mean(duraciones_verdes)
+        varianza = statistics.variance(duraciones_verdes) if len(duraciones_verdes) > 1 else 0
+        try:
+            moda = statistics.mode(duraciones_verdes)
+        except statistics.StatisticsError:
+            moda = "No única"
+
+        print(f"📊 Media de duración de verde     : {media:.2f}s")
+        print(f"📊 Moda de duración de verde      : {moda}")
+        print(f"📊 Varianza de duración de verde  : {varianza:.2f}")
+
+        os.makedirs(args.salida, exist_ok=True)
+        csv_file = os.path.join(args.salida, "datos_semaforos_actuated.csv")
+        guardar_historial(seguidor, csv_file)
+        print(f"\nHistorial guardado en {csv_file}")
+    else:
+        print("⚠️ No se encontraron fases verdes para cálculo estadístico.")
@@ -1,147 +1,193 @@
-import traci
+import argparse
+import heapq
 import numpy as np
 import skfuzzy as fuzz
 from skfuzzy import control as ctrl
-import csv
 import os
+import sys
+from sumo_backend import traci, usar_backend, agregar_argumento_backend, agregar_argumentos_corrida, iniciar_sumo
 from fuzzy_defs import *
 from fuzzy_utils import *
+from fuzzy_cache import *
 from logs_functions import *
-
-
-# Archivo CSV para guardar los datos
-CSV_PATH = "datos_colas_fuzzy.csv"
-
-# Inicializar archivo con encabezados
-with open(CSV_PATH, mode='w', newline='') as f:
-    writer = csv.writer(f)
-    writer.writerow(['tiempo', 'lane_id', 'vehiculos_en_cola'])
-
-CSV_SEMAFORO = "datos_semaforos_fuzzy.csv"
-
-with open(CSV_SEMAFORO, mode='w', newline='') as f:
-    writer = csv.writer(f)
-    writer.writerow(['tiempo', 'semaforo_id', 'num_vehiculos', 'fase', 'duracion_verde'])
-
-# Crear las variables con funciones de membresía
-fuzzy_vars = generar_membresias_fuzzy(funciones)
-llegada = fuzzy_vars["llegada"]
-vehiculos = fuzzy_vars["vehiculos"]
-verde = fuzzy_vars["verde"]
-
-reglas = crear_reglas_desde_lista(reglas_definidas, vehiculos, llegada, verde)
-sistema_ctrl = ctrl.ControlSystem(reglas)
+from lane_sensing import *
+from lane_index import *
+from registro_lanes import *
+from estadisticas_stream import *
+from columnar_logs import *
+import perfilado
+import metricas_http
+import checkpoints
+
+
+# Registros CSV de la corrida (se abren en abrir_logs, una vez por corrida)
+log_colas = None
+log_semaforos = None
+
+def abrir_logs(directorio=".", tamano_lote=1000, intervalo_s=5.0, formato="csv", reanudar=None):
+    # reanudar: marcas de marcas_logs() guardadas en un checkpoint
+    global log_colas, log_semaforos
+    colas = os.path.join(directorio, "datos_colas_fuzzy")
+    semaforos = os.path.join(directorio, "datos_semaforos_fuzzy")
+    marca_colas, marca_semaforos = (reanudar["colas"], reanudar["semaforos"]) if reanudar else (None, None)
+
+    if formato == "columnar":
+        log_colas = RegistroColumnar(colas, ESQUEMA_COLAS, tamano_lote, intervalo_s, marca_colas)
+        log_semaforos = RegistroColumnar(semaforos, ESQUEMA_SEMAFOROS, tamano_lote, intervalo_s, marca_semaforos)
+    elif formato == "parquet":
+        if reanudar:
+            raise ValueError("El formato parquet no admite checkpoints; use csv o columnar")
+        log_colas = RegistroParquet(colas + ".parquet", ESQUEMA_COLAS, tamano_lote, intervalo_s)
+        log_semaforos = RegistroParquet(semaforos + ".parquet", ESQUEMA_SEMAFOROS, tamano_lote, intervalo_s)
+    else:
+        log_colas = RegistroCSV(colas + ".csv", [col for col, _ in ESQUEMA_COLAS], tamano_lote, intervalo_s,
+                                marca_colas)
+        log_semaforos = RegistroCSV(semaforos + ".csv", [col for col, _ in ESQUEMA_SEMAFOROS],
+                                    tamano_lote, intervalo_s, marca_semaforos)
+
+def marcas_logs():
+    return {"colas": log_colas.marca(), "semaforos": log_semaforos.marca()}
+
+def cerrar_logs():
+    for log in (log_colas, log_semaforos):
+        if log is not None:
+            log.cerrar()
+
+# Sistema skfuzzy exacto: se construye solo cuando se necesita (modo exacto o verificación)
+sistema_ctrl = None
+
+def obtener_sistema_ctrl():
+    global sistema_ctrl
+    if sistema_ctrl is None:
+        # Crear las variables con funciones de membresía
+        fuzzy_vars = generar_membresias_fuzzy(funciones)
+        reglas = crear_reglas_desde_lista(reglas_definidas, fuzzy_vars, entradas)
+        sistema_ctrl = ctrl.ControlSystem(reglas)
+    return sistema_ctrl
+
+# Motor vectorizado equivalente (mismas funciones y reglas), cacheado en disco. Igual que
+# sistema_ctrl, se arma en el primer uso: importar el módulo no compila ni escribe la caché
+motor_fuzzy = None
+
+def obtener_motor_fuzzy():
+    global motor_fuzzy
+    if motor_fuzzy is None:
+        motor_fuzzy = obtener_sistema_compilado(funciones, reglas_definidas, entradas=entradas)["motor"]
+    return motor_fuzzy
+
+# Superficie de decisión (solo en modo compilado)
+superficie_verde = None
+# Modo compilado con entradas que no son vehiculos × llegada: no hay superficie y cada
+# decisión va al motor disperso (solo las reglas con antecedentes activos)
+motor_disperso = False
+
+# Entradas que el controlador mide sobre los lanes de la fase además de vehiculos y llegada
+ENTRADAS_LANES = ("movimiento", "detenidos", "velocidad_promedio")
+
+def entradas_adicionales(entradas):
+    adicionales = tuple(nombre for nombre in entradas if nombre not in ("vehiculos", "llegada"))
+    desconocidas = [nombre for nombre in adicionales if nombre not in ENTRADAS_LANES]
+    if desconocidas:
+        raise ValueError(f"Entradas que el controlador no mide: {desconocidas} "
+                         f"(disponibles: vehiculos, llegada, {', '.join(ENTRADAS_LANES)})")
+    return adicionales
+
+entradas_extra = entradas_adicionales(entradas)
+
+def compilar_calcular_verde(resolucion=resolucion_superficie, verificar=True):
+    global superficie_verde, motor_disperso, motor_fuzzy
+    compilado = obtener_sistema_compilado(funciones, reglas_definidas, resolucion,
+                                          crear_sistema_ctrl=obtener_sistema_ctrl if verificar else None,
+                                          entradas=entradas)
+    superficie_verde = compilado["superficie"]
+    motor_fuzzy = compilado["motor"]
+    if superficie_verde is None:
+        motor_disperso = True
+        print(f"🧮 Motor disperso: {len(entradas)} entradas ({', '.join(entradas)}), "
+              f"{len(reglas_definidas)} reglas")
+        if verificar:
+            paridad = verificar_paridad(compilado["motor"], obtener_sistema_ctrl(), funciones)
+            print(f"   Desviación máxima vs skfuzzy: {paridad['max_desviacion']:.3f}s "
+                  f"(en {paridad['muestras']} puntos al azar)")
+        return None
+    origen = "caché" if compilado["desde_cache"] else "compilada"
+    print(f"🧮 Superficie {origen}: {resolucion['vehiculos']}x{resolucion['llegada']} puntos")
+
+    reporte = compilado["reporte"]
+    if reporte is not None:
+        print(f"   Desviación máxima vs skfuzzy (estimada en {reporte['puntos']} puntos): "
+              f"{reporte['max_desviacion']:.3f}s (entera: {reporte['max_desviacion_entera']}s, "
+              f"en {reporte['peor_punto']})")
+    return reporte
+
+def usar_definiciones(ruta):
+    # Reemplaza funciones/reglas_definidas de fuzzy_defs por las de un JSON (candidatos
+    # del optimizador) y descarta todo lo construido con las anteriores
+    global funciones, reglas_definidas, entradas, entradas_extra
+    global sistema_ctrl, motor_fuzzy, superficie_verde, motor_disperso
+    funciones, reglas_definidas, entradas = cargar_definiciones(ruta, funciones, reglas_definidas, entradas)
+    entradas_extra = entradas_adicionales(entradas)
+    sistema_ctrl = None
+    superficie_verde = None
+    motor_disperso = False
+    motor_fuzzy = None
 
 # ========= Funciones Auxiliares =========
-def contar_vehiculos(lanes, tiempo_simulacion, registro_all_lanes, csv_path="datos_colas_fuzzy.csv"):
+def contar_vehiculos(lanes, tiempo_simulacion, registro_all_lanes):
     total = 0
-    with open(csv_path, mode='a', newline='') as f:
-        writer = csv.writer(f)
-        for lane in lanes:
-            registro = registro_all_lanes.get(lane)
-            if registro:
-                cantidad = len(registro["vehiculos_ids"])
-                total += cantidad
-                writer.writerow([tiempo_simulacion, lane, cantidad])
-                #print(f"📌 [{tiempo_simulacion:.2f}s] Lane: {lane} → {cantidad} vehículos")
-            #else:
-                #print(f"⚠️  Lane {lane} no encontrado en registro_all_lanes.")
+    posicion = registro_all_lanes.posicion
+    vehiculos = registro_all_lanes.datos["vehiculos"]
+    for lane in lanes:
+        i = posicion.get(lane)
+        if i is not None:
+            cantidad = int(vehiculos[i])
+            total += cantidad
+            log_colas.escribir([tiempo_simulacion, lane, cantidad])
+            #print(f"📌 [{tiempo_simulacion:.2f}s] Lane: {lane} → {cantidad} vehículos")
+        #else:
+            #print(f"⚠️  Lane {lane} no encontrado en registro_all_lanes.")
     return total
 
-def actualizar_limites_lanes(lanes, registro_all_lanes, limites_globales_lanes):
-    for lane_id in lanes:
-        if lane_id not in registro_all_lanes or lane_id not in limites_globales_lanes:
-            continue
-
-        reg = registro_all_lanes[lane_id]
-        lim = limites_globales_lanes[lane_id]
-
-        # Extraer métricas actuales
-        num_vehiculos = len(reg["vehiculos_ids"])
-        en_movimiento = len(reg["vehiculos_movimiento"])
-        detenidos = len(reg["vehiculos_detencion"])
-        velocidad = reg["velocidad_promedio"]
-        tasa = reg["tasa_llegada"]
-
-        # Actualizar límites
-        lim["vehiculos_min"] = min(lim["vehiculos_min"], num_vehiculos)
-        lim["vehiculos_max"] = max(lim["vehiculos_max"], num_vehiculos)
-
-        lim["movimiento_min"] = min(lim["movimiento_min"], en_movimiento)
-        lim["movimiento_max"] = max(lim["movimiento_max"], en_movimiento)
-
-        lim["detenidos_min"] = min(lim["detenidos_min"], detenidos)
-        lim["detenidos_max"] = max(lim["detenidos_max"], detenidos)
-
-        lim["velocidad_prom_min"] = min(lim["velocidad_prom_min"], velocidad)
-        lim["velocidad_prom_max"] = max(lim["velocidad_prom_max"], velocidad)
-
-        lim["tasa_llegada_min"] = min(lim["tasa_llegada_min"], tasa)
-        lim["tasa_llegada_max"] = max(lim["tasa_llegada_max"], tasa)
+def actualizar_estadisticas_lanes(semaforo_id, fase, lanes, tasa, registro_all_lanes, estadisticas):
+    # Una muestra por lane de la fase y una de la fase completa (cantidades sumadas, velocidad
+    # promediada y la tasa usada en la decisión); las series de lanes siguen el orden del registro
+    indices = registro_all_lanes.indices(lanes)
+    if not len(indices):
+        return
+    filas = registro_all_lanes.datos[indices].tolist()
+    estadisticas_lanes = estadisticas["lanes"]
+    total_vehiculos = total_movimiento = total_detenidos = 0
+    suma_velocidad = 0.0
+    for i, (num_vehiculos, en_movimiento, detenidos, velocidad, _, _, tasa_lane) in zip(indices.tolist(), filas):
+        estadisticas_lanes.anotar(i, (num_vehiculos, en_movimiento, detenidos, velocidad, tasa_lane))
+        total_vehiculos += num_vehiculos
+        total_movimiento += en_movimiento
+        total_detenidos += detenidos
+        suma_velocidad += velocidad
+
+    serie = estadisticas["fases"].posicion.get(clave_fase(semaforo_id, fase))
+    if serie is not None:
+        estadisticas["fases"].anotar(serie, (total_vehiculos, total_movimiento, total_detenidos,
+                                             suma_velocidad / len(filas), tasa))
 
 def update_parameters_fuzzy(lanes_id_seleccionados, registro_all_lanes):
     simTime = traci.simulation.getTime()
 
-    for lane_id in lanes_id_seleccionados:
-        vehiculos = traci.lane.getLastStepVehicleIDs(lane_id)
-        vehiculos_set = set(vehiculos)
-
-        vehs_mov = set()
-        vehs_det = set()
-        velocidades = []
-
-        for veh_id in vehiculos:
-            vel = traci.vehicle.getSpeed(veh_id)
-            if vel > 0.1:
-                vehs_mov.add(veh_id)
-                velocidades.append(vel)
-            else:
-                vehs_det.add(veh_id)
-
-        velocidad_promedio = np.mean(velocidades) if velocidades else 0.0
-
-        registro = registro_all_lanes[lane_id]
-        vehiculos_anteriores = registro["vehiculos_ids"]
-        tiempo_anterior = registro["tiempo_ultimo"]
-
-        nuevos_vehiculos = vehiculos_set - vehiculos_anteriores
-        num_nuevos = len(nuevos_vehiculos)
-
-        if tiempo_anterior is not None:
-            delta_t = simTime - tiempo_anterior
-            tasa_llegada = num_nuevos / delta_t if delta_t > 0 else 0.0
-        else:
-            tasa_llegada = 0.0
-
-        # Actualización del registro
-        registro_all_lanes[lane_id] = {
-            "vehiculos_ids": vehiculos_set,
-            "vehiculos_movimiento": vehs_mov,
-            "vehiculos_detencion": vehs_det,
-            "velocidades": velocidades,
-            "velocidad_promedio": velocidad_promedio,
-            "nuevos_vehiculos": num_nuevos,
-            "tiempo_ultimo": simTime,
-            "tasa_llegada": tasa_llegada
-        }
-"""
-        # Log opcional para depuración
-        print(f"[{simTime:.2f}s] Lane: {lane_id}")
-        print(f"   Vehs totales     : {len(vehiculos)}")
-        print(f"   Nuevos detectados: {num_nuevos}")
-        print(f"   Vel. promedio    : {velocidad_promedio:.2f} m/s")
-        print(f"   En movimiento    : {len(vehs_mov)}")
-        print(f"   Detenidos        : {len(vehs_det)}")
-        print(f"   Tasa de llegada  : {tasa_llegada:.3f} veh/s\n")
-"""
+    # Los lanes ya muestreados en este paso (compartidos) reutilizan la muestra
+    tiempos = registro_all_lanes.datos["tiempo_ultimo"]
+    posicion = registro_all_lanes.posicion
+    pendientes = [lane_id for lane_id in lanes_id_seleccionados if tiempos[posicion[lane_id]] != simTime]
+    registro_all_lanes.actualizar(pendientes, simTime, [leer_lane(lane_id) for lane_id in pendientes])
 
 def obtener_promedio_tasa_llegada(lane_ids_seleccionados, registro_all_lanes):
     tasas = []
+    posicion = registro_all_lanes.posicion
+    tasas_lanes = registro_all_lanes.datos["tasa_llegada"]
 
     for lane_id in lane_ids_seleccionados:
-        registro = registro_all_lanes.get(lane_id)
-        if registro:
-            tasa = registro.get("tasa_llegada", 0.0)
+        i = posicion.get(lane_id)
+        if i is not None:
+            tasa = float(tasas_lanes[i])
             if tasa > 0:
                 tasas.append(tasa)
 
@@ -154,16 +200,43 @@ def obtener_promedio_tasa_llegada(lane_ids_seleccionados, registro_all_lanes):
     return promedio
 
 
-def calcular_verde(num_vehiculos, tasa_llegada):
+def medir_entradas(lanes, registro_all_lanes):
+    # Entradas adicionales de la fase: movimiento y detenidos sumados, velocidad_promedio
+    # promediada entre lanes (igual que en las estadísticas por fase). Sumas en orden de
+    # lane, como las de entradas_lote
+    indices = registro_all_lanes.indices(lanes)
+    if not len(indices):
+        return {"movimiento": 0, "detenidos": 0, "velocidad_promedio": 0.0}
+    filas = registro_all_lanes.datos[indices]
+    velocidades = filas["velocidad_promedio"].tolist()
+    return {"movimiento": sum(filas["movimiento"].tolist()), "detenidos": sum(filas["detenidos"].tolist()),
+            "velocidad_promedio": sum(velocidades) / len(velocidades)}
+
+def calcular_verde(num_vehiculos, tasa_llegada, otras=None):
+    # otras: valores de entradas_extra (medir_entradas), si las reglas usan más entradas
 
     if num_vehiculos <= 3:
         return funciones["verde"]["lmin"]
-    
-    fuzzy_sim = ctrl.ControlSystemSimulation(sistema_ctrl)
+
+    if superficie_verde is not None:
+        return int(interpolar_superficie(superficie_verde, num_vehiculos, tasa_llegada))
+
+    valores = {"vehiculos": num_vehiculos, "llegada": tasa_llegada}
+    if otras:
+        valores.update(otras)
+
+    if motor_disperso:
+        verde = inferir_disperso(obtener_motor_fuzzy(), [valores[nombre] for nombre in entradas])
+        return int(verde) if verde is not None else 30
+
+    return inferir_skfuzzy(valores)
+
+def inferir_skfuzzy(valores):
+    fuzzy_sim = ctrl.ControlSystemSimulation(obtener_sistema_ctrl())
 
     try:
-        fuzzy_sim.input['vehiculos'] = num_vehiculos
-        fuzzy_sim.input['llegada'] = tasa_llegada
+        for nombre in entradas:
+            fuzzy_sim.input[nombre] = valores[nombre]
         fuzzy_sim.compute()
         return int(fuzzy_sim.output['verde'])
     except Exception as e:
@@ -171,12 +244,16 @@ def calcular_verde(num_vehiculos, tasa_llegada):
         return 30
 
 def guardar_datos_semaforo(tiempo, semaforo_id, fase, duracion, num_vehiculos):
-    with open(CSV_SEMAFORO, mode='a', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow([tiempo, semaforo_id, num_vehiculos, fase, duracion])
+    log_semaforos.escribir([tiempo, semaforo_id, num_vehiculos, fase, duracion])
 
 # ========= Controlador Múltiple =========
+# Índice de lanes únicos -> (semáforo, fase) que los usan
+indice_lanes = None
+
 def inicializar_controladores(semaforos_ids, fases_lanes_dict):
+    global indice_lanes
+    indice_lanes = construir_indice_lanes(fases_lanes_dict)
+
     estado = {}
     for semaforo_id in semaforos_ids:
         estado[semaforo_id] = {
@@ -184,101 +261,368 @@ def inicializar_controladores(semaforos_ids, fases_lanes_dict):
             "fase": 0,  # fase actual (0 o 2)
             "tiempo_restante": 0,
             "historial": {},
-            "fases_lanes": fases_lanes_dict[semaforo_id],
+            "fases_lanes": indice_lanes["fases"][semaforo_id],  # sin lanes repetidos
             "tiempo_verde_asignado": 0,
             "verde_extendido": False
 
         }
         traci.trafficlight.setPhase(semaforo_id, 1)
     
-    registro = {}
-    for fases in fases_lanes_dict.values():
-        for lanes in fases.values():
-            for lane_id in lanes:
-                if lane_id not in registro:
-                    registro[lane_id] = {
-                        "vehiculos_ids": set(),
-                        "vehiculos_movimiento": set(),
-                        "vehiculos_detencion": set(),
-                        "velocidades": [],
-                        "velocidad_promedio": 0.0,
-                        "nuevos_vehiculos": 0,
-                        "tiempo_ultimo": None,
-                        "tasa_llegada": 0.0
-                    }
+    # Un registro por lane único: es la muestra compartida que leen todos los semáforos
+    registro = RegistroLanes(indice_lanes["lanes"])
+
+    # Arranque desde un estado guardado (warm_start.py): la red ya tiene vehículos, así que
+    # se toma una muestra de todos los lanes para que no cuenten como llegadas en la primera
+    # decisión; la tasa de llegada se mide desde este instante
+    if traci.simulation.getTime() > 0:
+        update_parameters_fuzzy(indice_lanes["lanes"], registro)
 
     return estado, registro
 
 
-def actualizar_controladores(estado, registro_all_lanes, duracion_amarillo=3):
+def cambiar_fase(semaforo_id, datos, registro_all_lanes, duracion_amarillo=3):
+    fase = datos["fase"]  # fase actual
+
+    if datos["modo"] == "verde":
+        # Si no hay extensión, cambiamos a amarillo
+        nueva_fase = fase + 1
+        traci.trafficlight.setPhase(semaforo_id, nueva_fase)
+        datos["modo"] = "amarillo"
+        datos["tiempo_restante"] = duracion_amarillo
+        datos["fase"] = nueva_fase
+
+    elif datos["modo"] == "amarillo":
+        # Cambiar a la siguiente fase verde y calcular nuevo tiempo
+        nueva_fase = (fase + 1) % 4
+        lanes = datos["fases_lanes"].get(nueva_fase, [])
+        simTime = traci.simulation.getTime()
+
+        update_parameters_fuzzy(lanes, registro_all_lanes)
+        tasa = obtener_promedio_tasa_llegada(lanes, registro_all_lanes)
+        total_vehiculos = contar_vehiculos(lanes, simTime, registro_all_lanes)
+        actualizar_estadisticas_lanes(semaforo_id, nueva_fase, lanes, tasa, registro_all_lanes, estadisticas_globales)
+
+        otras = medir_entradas(lanes, registro_all_lanes) if entradas_extra else None
+        duracion_verde = calcular_verde(total_vehiculos, tasa, otras)
+        #print(f"[{semaforo_id}] Fase {fase} → Vehículos: {total_vehiculos}, Llegada: {tasa:.2f} → Verde: {duracion_verde}s")
+        guardar_datos_semaforo(simTime, semaforo_id, nueva_fase, duracion_verde, total_vehiculos)
+        aplicar_verde(semaforo_id, datos, nueva_fase, duracion_verde)
+
+def aplicar_verde(semaforo_id, datos, nueva_fase, duracion_verde):
+    traci.trafficlight.setPhase(semaforo_id, nueva_fase)
+    datos["modo"] = "verde"
+    datos["tiempo_restante"] = duracion_verde
+    datos["fase"] = nueva_fase
+    datos["tiempo_verde_asignado"] = duracion_verde
+    datos["verde_extendido"] = False  # reiniciar para la nueva fase
+
+# ========= Decisiones por lote =========
+# Todos los semáforos que salen del amarillo en el mismo instante deciden juntos: un solo
+# sensado para la unión de sus lanes, las entradas armadas en arreglos con una pasada sobre
+# el registro y una sola inferencia (superficie o motor vectorizado). Con la superficie el
+# resultado es idéntico a decidir uno por uno; sin ella se usa el motor NumPy en lugar de
+# skfuzzy (diferencias del orden de 1e-5 s antes de truncar el verde).
+def entradas_lote(lanes_por_decision, registro_all_lanes):
+    # Una fila por decisión con todas las entradas que el controlador sabe medir. bincount
+    # suma en el orden de los lanes de cada fase, igual que obtener_promedio_tasa_llegada,
+    # medir_entradas y actualizar_estadisticas_lanes. Devuelve además las filas del registro
+    # (lanes de todas las decisiones, seguidos), sus datos y cuántos lanes tiene cada decisión
+    posicion = registro_all_lanes.posicion
+    filas = [posicion[lane_id] for lanes in lanes_por_decision for lane_id in lanes if lane_id in posicion]
+    grupos = [k for k, lanes in enumerate(lanes_por_decision) for lane_id in lanes if lane_id in posicion]
+    n = len(lanes_por_decision)
+    datos = registro_all_lanes.datos[filas]
+    grupos = np.array(grupos, dtype=np.intp)
+    cuantos = np.bincount(grupos, minlength=n)
+
+    tasas = datos["tasa_llegada"]
+    positivas = tasas > 0
+    suma_tasas = np.bincount(grupos, weights=np.where(positivas, tasas, 0.0), minlength=n)
+    con_tasa = np.bincount(grupos, weights=positivas, minlength=n)
+    suma_velocidad = np.bincount(grupos, weights=datos["velocidad_promedio"], minlength=n)
+    valores = {
+        "vehiculos": np.bincount(grupos, weights=datos["vehiculos"], minlength=n),
+        "llegada": np.divide(suma_tasas, con_tasa, out=np.zeros(n), where=con_tasa > 0),
+        "movimiento": np.bincount(grupos, weights=datos["movimiento"], minlength=n),
+        "detenidos": np.bincount(grupos, weights=datos["detenidos"], minlength=n),
+        "velocidad_promedio": np.divide(suma_velocidad, cuantos, out=np.zeros(n), where=cuantos > 0),
+    }
+    return valores, filas, datos, cuantos
+
+def calcular_verde_lote(valores):
+    # calcular_verde para todas las filas de entradas_lote; int() trunca igual que astype
+    vehiculos = valores["vehiculos"]
+    lmin = funciones["verde"]["lmin"]
+    if superficie_verde is None and not motor_disperso:
+        # Modo exacto: skfuzzy fila por fila, como calcular_verde. El motor NumPy difiere en
+        # ~1e-5 s y, al truncar cerca de un entero, cambiaría el verde en un segundo
+        filas = zip(*(valores[nombre].tolist() for nombre in entradas))
+        return [lmin if v <= 3 else inferir_skfuzzy(dict(zip(entradas, fila)))
+                for v, fila in zip(vehiculos.tolist(), filas)]
+    if superficie_verde is not None:
+        verdes = interpolar_superficie_lote(superficie_verde, vehiculos, valores["llegada"])
+    else:
+        verdes = inferir_lote(obtener_motor_fuzzy(), *(valores[nombre] for nombre in entradas), por_defecto=30)
+    return [lmin if v <= 3 else verde for v, verde in zip(vehiculos.tolist(), verdes.astype(np.int64).tolist())]
+
+def registrar_colas_lote(tiempo_simulacion, lanes, cantidades):
+    for lane_id, cantidad in zip(lanes, cantidades):
+        log_colas.escribir([tiempo_simulacion, lane_id, cantidad])
+
+def actualizar_estadisticas_lote(claves, filas, datos, valores, cuantos, estadisticas):
+    # actualizar_estadisticas_lanes de todo el lote: mismas muestras y en el mismo orden.
+    # claves: clave_fase de cada decisión; las decisiones sin lanes no anotan su fase
+    estadisticas["lanes"].anotar_lote(filas, datos[list(VARIABLES)].tolist())
+    posicion = estadisticas["fases"].posicion
+    muestras = zip(claves, cuantos.tolist(), valores["vehiculos"].astype(np.int64).tolist(),
+                   valores["movimiento"].astype(np.int64).tolist(), valores["detenidos"].astype(np.int64).tolist(),
+                   valores["velocidad_promedio"].tolist(), valores["llegada"].tolist())
+    series = []
+    filas_fases = []
+    for clave, n, vehiculos, movimiento, detenidos, velocidad, tasa in muestras:
+        serie = posicion.get(clave)
+        if n and serie is not None:
+            series.append(serie)
+            filas_fases.append((vehiculos, movimiento, detenidos, velocidad, tasa))
+    estadisticas["fases"].anotar_lote(series, filas_fases)
+
+def decidir_lote(decisiones, registro_all_lanes):
+    # decisiones: [(semaforo_id, datos)] con el amarillo terminado, en el orden del bucle
+    simTime = traci.simulation.getTime()
+    fases = [(datos["fase"] + 1) % 4 for _, datos in decisiones]
+    lanes_por_decision = [datos["fases_lanes"].get(fase, []) for (_, datos), fase in zip(decisiones, fases)]
+
+    update_parameters_fuzzy(list(dict.fromkeys(lane_id for lanes in lanes_por_decision for lane_id in lanes)),
+                            registro_all_lanes)
+    valores, filas, datos_lanes, cuantos = entradas_lote(lanes_por_decision, registro_all_lanes)
+    verdes = calcular_verde_lote(valores)
+
+    # Registros y cambios de fase en el orden de las decisiones
+    lanes_registrados = [lane_id for lanes in lanes_por_decision for lane_id in lanes if lane_id in registro_all_lanes]
+    registrar_colas_lote(simTime, lanes_registrados, datos_lanes["vehiculos"].tolist())
+    actualizar_estadisticas_lote([clave_fase(semaforo_id, fase) for (semaforo_id, _), fase in zip(decisiones, fases)],
+                                 filas, datos_lanes, valores, cuantos, estadisticas_globales)
+    totales = valores["vehiculos"].astype(np.int64).tolist()
+    for (semaforo_id, datos), fase, verde, total in zip(decisiones, fases, verdes, totales):
+        guardar_datos_semaforo(simTime, semaforo_id, fase, verde, total)
+        aplicar_verde(semaforo_id, datos, fase, verde)
+
+def actualizar_controladores(estado, registro_all_lanes, duracion_amarillo=3, lote=False):
+    # lote: los semáforos que deciden en este paso van juntos a decidir_lote
+    decisiones = []
     for semaforo_id, datos in estado.items():
         fase = datos["fase"]  # fase actual
         # Control de tiempo
         if datos["tiempo_restante"] > 0:
             datos["tiempo_restante"] -= 1
+            if datos["tiempo_restante"] == 0 and datos["modo"] == "amarillo":
+                # La decisión ocurre en el próximo paso: sus lanes llegarán con simulationStep
+                preparar_sensado(datos["fases_lanes"].get((fase + 1) % 4, []),
+                                 traci.simulation.getTime() + 1, registro_all_lanes)
             continue
 
-        if datos["modo"] == "verde":
-            # Si no hay extensión, cambiamos a amarillo
-            nueva_fase = fase + 1
-            traci.trafficlight.setPhase(semaforo_id, nueva_fase)
-            datos["modo"] = "amarillo"
-            datos["tiempo_restante"] = duracion_amarillo
-            datos["fase"] = nueva_fase
-
-        elif datos["modo"] == "amarillo":
-            # Cambiar a la siguiente fase verde y calcular nuevo tiempo
-            nueva_fase = (fase + 1) % 4
-            lanes = datos["fases_lanes"].get(nueva_fase, [])
-            simTime = traci.simulation.getTime()
-
-            update_parameters_fuzzy(lanes, registro_all_lanes)
-            tasa = obtener_promedio_tasa_llegada(lanes, registro_all_lanes)
-            total_vehiculos = contar_vehiculos(lanes, simTime, registro_all_lanes)
-            actualizar_limites_lanes(lanes, registro_all_lanes, limites_globales_lanes)
-
-            duracion_verde = calcular_verde(total_vehiculos, tasa)
-            #print(f"[{semaforo_id}] Fase {fase} → Vehículos: {total_vehiculos}, Llegada: {tasa:.2f} → Verde: {duracion_verde}s")
-            guardar_datos_semaforo(simTime, semaforo_id, nueva_fase, duracion_verde, total_vehiculos)
-
-            traci.trafficlight.setPhase(semaforo_id, nueva_fase)
-            datos["modo"] = "verde"
-            datos["tiempo_restante"] = duracion_verde
-            datos["fase"] = nueva_fase
-            datos["tiempo_verde_asignado"] = duracion_verde
-            datos["verde_extendido"] = False  # reiniciar para la nueva fase
-
-# ========= MAIN =========
-if __name__ == "__main__":
-    traci.start([
-        "sumo",
-        "-c", sumo_cfg
-    ])
-
-    estado, registro = inicializar_controladores(semaforos_ids, fases_lanes_dict)
-
-    # Inicializa los límites globales por cada lane
-    limites_globales_lanes = {
-        lane_id: {
-            "vehiculos_min": float('inf'),
-            "vehiculos_max": float('-inf'),
-            "movimiento_min": float('inf'),
-            "movimiento_max": float('-inf'),
-            "detenidos_min": float('inf'),
-            "detenidos_max": float('-inf'),
-            "velocidad_prom_min": float('inf'),
-            "velocidad_prom_max": float('-inf'),
-            "tasa_llegada_min": float('inf'),
-            "tasa_llegada_max": float('-inf')
-        }
-        for lane_id in registro.keys()
+        if lote and datos["modo"] == "amarillo":
+            decisiones.append((semaforo_id, datos))
+            continue
+        cambiar_fase(semaforo_id, datos, registro_all_lanes, duracion_amarillo)
+
+    if decisiones:
+        decidir_lote(decisiones, registro_all_lanes)
+
+# Estadísticas por lane y por (semáforo, fase) (se inicializan al arrancar los controladores)
+estadisticas_globales = {}
+
+# ========= Checkpoints =========
+def capturar_controladores(estado, registro):
+    # Todo lo que la corrida necesita para seguir igual que sin el corte (ver checkpoints.py)
+    return {
+        "estado": estado,
+        "registro": registro,
+        "indice_lanes": indice_lanes,
+        "estadisticas": estadisticas_globales,
+        "suscripciones": dict(suscripciones),
+        "logs": marcas_logs(),
     }
 
+def restaurar_controladores(guardado):
+    global indice_lanes, estadisticas_globales
+    indice_lanes = guardado["indice_lanes"]
+    estadisticas_globales = guardado["estadisticas"]
+    restaurar_suscripciones(guardado["suscripciones"], traci.simulation.getTime())
+    return guardado["estado"], guardado["registro"]
+
+def ejecutar_control(estado, registro, tiempo_fin=None, puntos_control=None, lote=False):
     while traci.simulation.getMinExpectedNumber() > 0:
-        actualizar_controladores(estado, registro)
+        ahora = traci.simulation.getTime()
+        if tiempo_fin is not None and ahora >= tiempo_fin:
+            break
+        if puntos_control is not None and ahora >= puntos_control.proximo:
+            puntos_control.guardar(ahora)
+        actualizar_controladores(estado, registro, lote=lote)
         traci.simulationStep()
 
+def ejecutar_control_eventos(estado, registro, tiempo_fin=None, duracion_amarillo=3, puntos_control=None,
+                             lote=False):
+    # Programador por eventos: un min-heap con el próximo cambio de cada semáforo y
+    # simulationStep(t) directo hasta él. Equivale al bucle paso a paso: un semáforo con
+    # tiempo_restante = r en el instante t cambia de fase en t + r.
+    # lote: los que salen del amarillo en el mismo instante deciden juntos (decidir_lote)
+    ahora = traci.simulation.getTime()
+    eventos = [(ahora + datos["tiempo_restante"], orden, semaforo_id)
+               for orden, (semaforo_id, datos) in enumerate(estado.items())]
+    heapq.heapify(eventos)
+
+    while eventos:
+        tiempo = eventos[0][0]
+        if tiempo_fin is not None and tiempo >= tiempo_fin:
+            if ahora < tiempo_fin:
+                traci.simulationStep(tiempo_fin)
+                ahora = tiempo_fin
+            break
+
+        if ahora < tiempo:
+            traci.simulationStep(tiempo)
+            ahora = tiempo
+        if traci.simulation.getMinExpectedNumber() <= 0:
+            break
+
+        def programar(orden, semaforo_id, datos):
+            proximo = ahora + datos["tiempo_restante"] + 1
+            if datos["modo"] == "amarillo":
+                preparar_sensado(datos["fases_lanes"].get((datos["fase"] + 1) % 4, []), proximo, registro)
+            heapq.heappush(eventos, (proximo, orden, semaforo_id))
+
+        # Todos los semáforos con evento en este instante, en el mismo orden que el bucle por pasos
+        decisiones = []
+        while eventos and eventos[0][0] == ahora:
+            _, orden, semaforo_id = heapq.heappop(eventos)
+            datos = estado[semaforo_id]
+            datos["tiempo_restante"] = 0
+            if lote and datos["modo"] == "amarillo":
+                decisiones.append((orden, semaforo_id, datos))
+                continue
+            cambiar_fase(semaforo_id, datos, registro, duracion_amarillo)
+            programar(orden, semaforo_id, datos)
+        if decisiones:
+            decidir_lote([(semaforo_id, datos) for _, semaforo_id, datos in decisiones], registro)
+            for orden, semaforo_id, datos in decisiones:
+                programar(orden, semaforo_id, datos)
+
+        if puntos_control is not None and ahora >= puntos_control.proximo:
+            # tiempo_restante coherente con ahora: al reanudar, el heap se rearma igual
+            for tiempo, _, semaforo_id in eventos:
+                estado[semaforo_id]["tiempo_restante"] = int(tiempo - ahora)
+            puntos_control.guardar(ahora)
+
+    # Dejar tiempo_restante coherente con el instante actual (p. ej. para seguir paso a paso)
+    for tiempo, _, semaforo_id in eventos:
+        estado[semaforo_id]["tiempo_restante"] = max(0, int(tiempo - ahora))
+
+# ========= MAIN =========
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Control difuso de semáforos con SUMO")
+    agregar_argumento_backend(parser)
+    parser.add_argument("--por-pasos", action="store_true",
+                        help="avanzar SUMO de a 1 s en lugar de saltar al próximo cambio de fase")
+    parser.add_argument("--lote", action="store_true",
+                        help="decidir juntos los semáforos que salen del amarillo en el mismo paso "
+                             "(sin --compilado la inferencia sigue siendo skfuzzy, semáforo por semáforo)")
+    parser.add_argument("--salida", default=".", help="directorio de los CSV de colas y semáforos")
+    parser.add_argument("--log-lote", type=int, default=1000, help="filas acumuladas antes de escribir")
+    parser.add_argument("--log-intervalo", type=float, default=5.0, help="segundos máximos entre escrituras")
+    parser.add_argument("--formato-logs", choices=["csv", "columnar", "parquet"], default="csv",
+                        help="csv, columnar (binario por columna, ver columnar_logs.py) o parquet")
+    parser.add_argument("--definiciones", default=None,
+                        help="JSON con funciones y/o reglas_definidas que reemplazan a las de fuzzy_defs.py")
+    parser.add_argument("--compilado", action="store_true", help="forzar modo_compilado")
+    parser.add_argument("--sin-verificar", action="store_true",
+                        help="no comparar la superficie compilada contra skfuzzy (la verificación tarda segundos)")
+    parser.add_argument("--perfil", nargs="?", const="", default=None, metavar="JSON",
+                        help="medir tiempos por categoría (SUMO, sensado, inferencia, registro); "
+                             "por defecto guarda perfil_fuzzy.json en --salida")
+    parser.add_argument("--metricas-puerto", type=int, default=None,
+                        help="servir métricas en vivo (formato Prometheus) en http://HOST:PUERTO/metrics")
+    parser.add_argument("--metricas-host", default="127.0.0.1")
+    agregar_argumentos_corrida(parser)
+    checkpoints.agregar_argumentos_checkpoint(parser)
+    args = parser.parse_args()
+    usar_backend(args.backend)
+    if args.formato_logs == "parquet" and (args.checkpoint_intervalo or args.resume):
+        parser.error("los checkpoints necesitan --formato-logs csv o columnar")
+    if args.backend == "simulado" and (args.estado_inicial or args.checkpoint_intervalo or args.resume):
+        parser.error("--estado-inicial, --checkpoint-intervalo y --resume necesitan SUMO: "
+                     "el backend simulado no guarda ni carga estados")
+
+    # Reanudar: SUMO arranca desde el estado del checkpoint y los logs se cortan en sus marcas.
+    # Hay que repetir las mismas opciones de la corrida original
+    directorio_checkpoints = args.checkpoint_dir or os.path.join(args.salida, "checkpoints")
+    guardado = None
+    if args.resume:
+        ruta_checkpoint = checkpoints.ultimo_checkpoint(directorio_checkpoints)
+        if ruta_checkpoint is None:
+            parser.error(f"--resume: no hay checkpoints en {directorio_checkpoints}")
+        guardado = checkpoints.cargar_checkpoint(ruta_checkpoint)
+        args.estado_inicial = guardado["estado_sumo"]
+        # Las salidas de SUMO anteriores al corte quedan donde estaban; las nuevas van aparte
+        args.salidas_sumo = os.path.join(args.salidas_sumo or directorio_checkpoints,
+                                         f"reanudado_{int(guardado['tiempo'])}")
+        print(f"↩️  Reanudando desde {ruta_checkpoint} (t={guardado['tiempo']:.0f}s); "
+              f"salidas de SUMO en {args.salidas_sumo}")
+
+    if args.definiciones:
+        usar_definiciones(args.definiciones)
+    if modo_compilado or args.compilado:
+        compilar_calcular_verde(verificar=not args.sin_verificar)
+
+    abrir_logs(args.salida, args.log_lote, args.log_intervalo, args.formato_logs,
+               guardado["logs"] if guardado else None)
+    iniciar_sumo(sumo_cfg, args, extra=checkpoints.OPCIONES_SUMO if args.checkpoint_intervalo else ())
+
+    perfil = None
+    metricas = None
+    puntos_control = None
+    try:
+        if guardado is None:
+            estado, registro = inicializar_controladores(semaforos_ids, fases_lanes_dict)
+
+            # Inicializa las estadísticas por lane y por fase
+            estadisticas_globales = inicializar_estadisticas(registro.keys(), indice_lanes["fases"])
+        else:
+            estado, registro = restaurar_controladores(guardado)
+
+        if args.checkpoint_intervalo:
+            ahora = traci.simulation.getTime()
+            proximo = guardado["proximo_checkpoint"] if guardado else ahora + args.checkpoint_intervalo
+            puntos_control = checkpoints.PuntosControl(directorio_checkpoints, args.checkpoint_intervalo,
+                                                       lambda: capturar_controladores(estado, registro), proximo)
+
+        if args.metricas_puerto is not None:
+            metricas = metricas_http.iniciar(sys.modules[__name__], estado, registro,
+                                             args.metricas_puerto, args.metricas_host)
+            print(f"📡 Métricas en http://{args.metricas_host}:{args.metricas_puerto}/metrics")
+        if args.perfil is not None:
+            perfil = perfilado.activar(sys.modules[__name__])
+        if args.por_pasos:
+            ejecutar_control(estado, registro, args.fin, puntos_control=puntos_control, lote=args.lote)
+        else:
+            ejecutar_control_eventos(estado, registro, args.fin, puntos_control=puntos_control, lote=args.lote)
+    finally:
+        if perfil is not None:
+            perfil.desactivar()
+        if metricas is not None:
+            metricas.cerrar()
+        cerrar_logs()
+        traci.close()
+
+    if perfil is not None:
+        ruta_perfil = args.perfil or os.path.join(args.salida, "perfil_fuzzy.json")
+        perfil.guardar(ruta_perfil)
+        print(perfil.tabla())
+        print(f"💾 Perfil en {ruta_perfil}")
+
     # Mostrar resumen general
-    imprimir_limites_globales(limites_globales_lanes)
-    imprimir_limites_por_semaforo_y_fase(fases_lanes_dict, limites_globales_lanes)
-    traci.close()
+    prefijo = os.path.join(args.salida, "estadisticas_fuzzy")
+    guardar_estadisticas(estadisticas_globales, prefijo)
+    imprimir_estadisticas_globales(estadisticas_globales)
+    imprimir_estadisticas_por_semaforo_y_fase(indice_lanes["fases"], estadisticas_globales)
+    print(f"💾 Estadísticas en {prefijo}_lanes.npz y {prefijo}_fases.npz")
@@ -0,0 +1,75 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Compara pasos/segundo del controlador difuso sobre osm_fuzzy.sumocfg con cada backend.
+# Cada backend corre en su propio proceso (libsumo admite una sola simulación por proceso)
+# y en un directorio temporal para no pisar los CSV de una corrida real.
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+def medir_backend(backend, desde, pasos, compilado):
+    import Fuzzy_logic as F
+    from sumo_backend import traci, usar_backend
+
+    usar_backend(backend)
+    if compilado:
+        # Sin el costo de skfuzzy por decisión, la diferencia entre backends queda a la vista
+        F.compilar_calcular_verde(verificar=False)
+    traci.start(["sumo", "-c", os.path.join(RAIZ, F.sumo_cfg),
+                 "--no-step-log", "true", "--verbose", "false", "--duration-log.statistics", "false"])
+
+    F.abrir_logs()  # en el directorio temporal del proceso
+    estado, registro = F.inicializar_controladores(F.semaforos_ids, F.fases_lanes_dict)
+    F.estadisticas_globales = F.inicializar_estadisticas(registro.keys(), F.indice_lanes["fases"])
+
+    # Se llega a la hora de interés con el controlador activo y solo se mide el tramo siguiente
+    F.ejecutar_control(estado, registro, tiempo_fin=desde)
+    inicio = time.perf_counter()
+    F.ejecutar_control(estado, registro, tiempo_fin=desde + pasos)
+    segundos = time.perf_counter() - inicio
+    F.cerrar_logs()
+    traci.close()
+
+    return {"backend": backend, "desde": desde, "pasos": pasos,
+            "segundos": segundos, "pasos_por_segundo": pasos / segundos}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark traci vs libsumo")
+    parser.add_argument("--desde", type=int, default=21600, help="tiempo de simulación inicial medido (s)")
+    parser.add_argument("--pasos", type=int, default=3600, help="pasos de simulación medidos")
+    parser.add_argument("--backends", nargs="+", default=["traci", "libsumo"])
+    parser.add_argument("--compilado", action="store_true", help="usar la superficie de decisión precalculada")
+    parser.add_argument("--salida", default=None, help="archivo JSON con los resultados")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(medir_backend(args.worker, args.desde, args.pasos, args.compilado)))
+        return
+
+    resultados = []
+    for backend in args.backends:
+        with tempfile.TemporaryDirectory() as tmp:
+            proceso = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker", backend,
+                 "--desde", str(args.desde), "--pasos", str(args.pasos)]
+                + (["--compilado"] if args.compilado else []),
+                cwd=tmp, capture_output=True, text=True, check=True)
+        resultados.append(json.loads(proceso.stdout.strip().splitlines()[-1]))
+
+    base = resultados[0]["pasos_por_segundo"]
+    print(f"{'backend':<10} {'pasos/s':>10} {'speedup':>8}")
+    for r in resultados:
+        print(f"{r['backend']:<10} {r['pasos_por_segundo']:>10.1f} {r['pasos_por_segundo'] / base:>7.2f}x")
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Costo de los controladores a escala, sin SUMO: una cuadrícula sintética de semáforos
+# sobre traci_simulado. Se mide primero el simulador solo (cada semáforo con su programa
+# fijo) y después con el controlador difuso; la diferencia es el costo del controlador.
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+def medir(filas, columnas, pasos, vph, compilado, lote=False):
+    import traci_simulado
+    from sumo_backend import traci, usar_backend
+
+    usar_backend("simulado")
+    escenario = traci_simulado.red_sintetica(filas, columnas, vph=vph)
+
+    traci_simulado.iniciar(escenario["red"], escenario["flujos"])
+    inicio = time.perf_counter()
+    traci.simulationStep(pasos)
+    solo_simulador = time.perf_counter() - inicio
+    vehiculos = traci.vehicle.getIDCount()
+    traci.close()
+
+    import Fuzzy_logic as F
+    if compilado:
+        F.compilar_calcular_verde(verificar=False)
+    traci_simulado.iniciar(escenario["red"], escenario["flujos"])
+    with tempfile.TemporaryDirectory() as tmp:
+        F.abrir_logs(tmp)
+        estado, registro = F.inicializar_controladores(escenario["semaforos_ids"], escenario["fases_lanes_dict"])
+        F.estadisticas_globales = F.inicializar_estadisticas(registro.keys(), F.indice_lanes["fases"])
+        inicio = time.perf_counter()
+        F.ejecutar_control_eventos(estado, registro, tiempo_fin=pasos, lote=lote)
+        con_control = time.perf_counter() - inicio
+        F.cerrar_logs()
+        with open(os.path.join(tmp, "datos_semaforos_fuzzy.csv")) as f:
+            decisiones = sum(1 for _ in f) - 1
+    traci.close()
+
+    return {
+        "semaforos": len(escenario["semaforos_ids"]),
+        "lanes": len(escenario["red"]["lanes"]),
+        "pasos": pasos,
+        "vehiculos_en_red": vehiculos,
+        "segundos_simulador": solo_simulador,
+        "segundos_con_control": con_control,
+        "segundos_control": con_control - solo_simulador,
+        "pasos_por_segundo": pasos / con_control,
+        "semaforo_pasos_por_segundo": len(escenario["semaforos_ids"]) * pasos / con_control,
+        "decisiones": decisiones,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del controlador difuso sobre una red sintética")
+    parser.add_argument("--filas", type=int, default=40)
+    parser.add_argument("--columnas", type=int, default=50)
+    parser.add_argument("--pasos", type=int, default=3600)
+    parser.add_argument("--vph", type=float, default=300, help="vehículos/hora por corredor y sentido")
+    parser.add_argument("--compilado", action="store_true", help="usar la superficie de decisión precalculada")
+    parser.add_argument("--lote", action="store_true", help="decisiones del mismo instante juntas (decidir_lote)")
+    parser.add_argument("--salida", default=None, help="archivo JSON con los resultados")
+    args = parser.parse_args()
+
+    r = medir(args.filas, args.columnas, args.pasos, args.vph, args.compilado, args.lote)
+    print(f"{r['semaforos']} semáforos, {r['lanes']} lanes, {r['pasos']} pasos, {r['vehiculos_en_red']} vehículos en red")
+    print(f"simulador solo : {r['segundos_simulador']:.2f}s")
+    print(f"con controlador: {r['segundos_con_control']:.2f}s "
+          f"({r['pasos_por_segundo']:.0f} pasos/s, {r['semaforo_pasos_por_segundo']:.0f} semáforo·pasos/s)")
+    if r["decisiones"]:
+        print(f"controlador    : {r['segundos_control']:.2f}s en {r['decisiones']} decisiones "
+              f"({1e6 * r['segundos_control'] / r['decisiones']:.0f} µs/decisión)")
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(r, f, indent=2)
+
+if __name__ == "__main__":
+    main()
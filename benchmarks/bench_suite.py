@@ -0,0 +1,347 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Suite de benchmarks de los caminos calientes del controlador y del análisis. Cada caso
+# arma entradas sintéticas (la cuadrícula de traci_simulado para lo que necesita una red)
+# y mide solo la función de interés; lo que prepara cada repetición queda fuera del tiempo.
+#
+#   python benchmarks/bench_suite.py correr [-o resultados.json] [--casos ...]
+#   python benchmarks/bench_suite.py comparar base.json nuevo.json [--umbral 0.10]
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "plotters"))
+
+DIRECTORIO_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+UMBRAL_POR_DEFECTO = 0.10
+
+# ========= Medición =========
+def cronometrar(funcion, preparar=None, repeticiones=20, numero=1, calentamiento=1):
+    # Segundos por llamada de cada repetición; numero > 1 agrupa llamadas muy cortas
+    for _ in range(calentamiento):
+        if preparar is not None:
+            preparar()
+        funcion()
+    tiempos = []
+    for _ in range(repeticiones):
+        if preparar is not None:
+            preparar()
+        inicio = time.perf_counter()
+        for _ in range(numero):
+            funcion()
+        tiempos.append((time.perf_counter() - inicio) / numero)
+    return tiempos
+
+def resumir(tiempos, unidades):
+    mediana = statistics.median(tiempos)
+    return {
+        "repeticiones": len(tiempos),
+        "mediana_s": mediana,
+        "minimo_s": min(tiempos),
+        "media_s": statistics.fmean(tiempos),
+        "desviacion_s": statistics.stdev(tiempos) if len(tiempos) > 1 else 0.0,
+        "unidades": unidades,
+        "mediana_por_unidad_s": mediana / unidades,
+    }
+
+# ========= Entradas sintéticas =========
+def vph_pico(filas, columnas):
+    # La hora más cargada de generate_routes repartida entre los corredores de la cuadrícula
+    from generate_routes import hourly_intervals
+    return max(vph for _, _, vph in hourly_intervals) / (2 * (filas + columnas))
+
+def _fuzzy(logs):
+    import Fuzzy_logic as F
+    F.cerrar_logs()
+    F.abrir_logs(logs, formato="csv")
+    return F
+
+def _red_en_pico(p, con_controlador):
+    # Cuadrícula cargada con la demanda pico y llevada a régimen antes de medir
+    import traci_simulado
+    from sumo_backend import usar_backend
+    usar_backend("simulado")
+    escenario = traci_simulado.red_sintetica(p["filas"], p["columnas"], vph=p["vph"])
+    traci_simulado.iniciar(escenario["red"], escenario["flujos"])
+
+    F = _fuzzy(p["logs"])
+    if not p["compilado"]:
+        F.superficie_verde = None
+    elif F.superficie_verde is None:
+        F.compilar_calcular_verde(verificar=False)
+    if con_controlador:
+        estado, registro = F.inicializar_controladores(escenario["semaforos_ids"], escenario["fases_lanes_dict"])
+        F.estadisticas_globales = F.inicializar_estadisticas(registro.keys(), F.indice_lanes["fases"])
+        F.ejecutar_control_eventos(estado, registro, tiempo_fin=p["calentamiento"])
+    else:
+        F.traci.simulationStep(p["calentamiento"])
+        estado, registro = F.inicializar_controladores(escenario["semaforos_ids"], escenario["fases_lanes_dict"])
+    return F, estado, registro
+
+def _cerrar_red():
+    from sumo_backend import traci
+    traci.close()
+
+def _entradas_verde(p, n):
+    import numpy as np
+    from fuzzy_defs import funciones
+    rng = np.random.default_rng(p["semilla"])
+    vehiculos = rng.integers(funciones["vehiculos"]["lmin"], funciones["vehiculos"]["lmax"] + 1, n)
+    llegada = rng.uniform(funciones["llegada"]["lmin"], funciones["llegada"]["lmax"], n)
+    return list(zip(vehiculos.tolist(), llegada.tolist()))
+
+# ========= Casos =========
+def caso_calcular_verde(p, compilado):
+    F = _fuzzy(p["logs"])
+    if not compilado:
+        F.superficie_verde = None
+    elif F.superficie_verde is None:
+        F.compilar_calcular_verde(verificar=False)
+    entradas = _entradas_verde(p, 2000 if compilado else 100)
+
+    def funcion():
+        for vehiculos, llegada in entradas:
+            F.calcular_verde(vehiculos, llegada)
+    return {"funcion": funcion, "unidades": len(entradas), "unidad": "decisión",
+            "repeticiones": p["repeticiones"] if compilado else max(3, p["repeticiones"] // 4)}
+
+def caso_inferir_disperso(p, n_entradas):
+    # Tabla completa de reglas sobre n_entradas (5^n) con salidas al azar: mide cuánto crece
+    # una decisión del motor disperso al sumar entradas
+    import itertools
+    import numpy as np
+    from fuzzy_defs import funciones
+    from fuzzy_utils import compilar_motor_fuzzy, inferir_disperso
+    rng = np.random.default_rng(p["semilla"])
+    definiciones = {k: dict(v) for k, v in funciones.items()}
+    definiciones["detenidos"] = {"lmin": 0, "lmax": 20, "niveles": definiciones["vehiculos"]["niveles"]}
+    definiciones["velocidad_promedio"] = {"lmin": 0, "lmax": 14, "niveles": definiciones["vehiculos"]["niveles"]}
+    entradas = ["vehiculos", "llegada", "detenidos", "velocidad_promedio"][:n_entradas]
+    niveles_verde = definiciones["verde"]["niveles"]
+    reglas = [list(antecedentes) + [niveles_verde[rng.integers(len(niveles_verde))]]
+              for antecedentes in itertools.product(*(definiciones[e]["niveles"] for e in entradas))]
+    motor = compilar_motor_fuzzy(definiciones, reglas, entradas)
+    valores = list(zip(*(rng.uniform(definiciones[e]["lmin"], definiciones[e]["lmax"], 2000).tolist()
+                         for e in entradas)))
+
+    def funcion():
+        for fila in valores:
+            inferir_disperso(motor, fila)
+    return {"funcion": funcion, "unidades": len(valores), "unidad": "decisión"}
+
+def caso_update_parameters_fuzzy(p):
+    F, _, registro = _red_en_pico(p, con_controlador=False)
+    lanes = list(registro)
+    ahora = F.traci.simulation.getTime()
+
+    def preparar():
+        # Que cada lane vuelva a muestrearse (la función salta los ya leídos en este paso)
+        registro.datos["tiempo_ultimo"] = ahora - 1
+    return {"funcion": lambda: F.update_parameters_fuzzy(lanes, registro), "preparar": preparar,
+            "unidades": len(lanes), "unidad": "lane", "cerrar": _cerrar_red}
+
+def caso_actualizar_controladores(p, lote=False):
+    # Un paso de simulación por repetición (fuera del tiempo), como en ejecutar_control.
+    # La mayoría de los pasos solo descuentan tiempo y la mediana no ve las decisiones:
+    # se compara por la media sobre media hora simulada
+    F, estado, registro = _red_en_pico(p, con_controlador=True)
+    return {"funcion": lambda: F.actualizar_controladores(estado, registro, lote=lote),
+            "preparar": lambda: F.traci.simulationStep(),
+            "unidades": len(estado), "unidad": "semáforo·paso", "cerrar": _cerrar_red,
+            "repeticiones": 1800, "metrica": "media_s"}
+
+def caso_actualizar_estadisticas_lanes(p):
+    # Todos los lanes en una muestra, más la serie de una fase
+    F, _, registro = _red_en_pico(p, con_controlador=False)
+    lanes = list(registro)
+    estadisticas = F.inicializar_estadisticas(lanes, F.indice_lanes["fases"])
+    semaforo_id, fases = next(iter(F.indice_lanes["fases"].items()))
+    fase = next(iter(fases))
+    return {"funcion": lambda: F.actualizar_estadisticas_lanes(semaforo_id, fase, lanes, 0.1, registro, estadisticas),
+            "unidades": len(lanes), "unidad": "lane", "cerrar": _cerrar_red, "numero": 20}
+
+def caso_generar_flujos(p):
+    import generate_routes as g
+    perfil = g.repetir_perfil(g.hourly_intervals, p["dias"])
+    return {"funcion": lambda: sum(1 for _ in g.generar_flujos(perfil, g.routes)),
+            "unidades": len(perfil) * len(g.routes), "unidad": "flujo", "numero": 10}
+
+def caso_generar_demanda(p):
+    import generate_routes as g
+    perfil = g.repetir_perfil(g.hourly_intervals, p["dias"])
+    ruta = os.path.join(p["logs"], "demanda.rou.xml")
+    return {"funcion": lambda: g.generar_demanda(ruta, g.routes, perfil, forzar=True),
+            "unidades": len(perfil) * len(g.routes), "unidad": "flujo"}
+
+def caso_construir_onda_fases(p):
+    # Un día completo de un semáforo con ciclos verde/amarillo de largo variable
+    import numpy as np
+    import pandas as pd
+    import plotter_phases
+    rng = np.random.default_rng(p["semilla"])
+    filas = []
+    t = 0
+    fase = 0
+    while t < 86400:
+        verde = int(rng.integers(15, 51))
+        filas.append({"tiempo_inicio": t, "duracion_verde": verde, "fase": fase,
+                      "fase_amarilla": 1 if fase == 0 else 3})
+        t += verde + plotter_phases.duracion_amarillo
+        fase = 2 if fase == 0 else 0
+    df = pd.DataFrame(filas)
+    return {"funcion": lambda: plotter_phases.construir_onda_fases(df, 0, 1440, "duracion_verde", "fase"),
+            "unidades": len(df), "unidad": "fase", "repeticiones": max(3, p["repeticiones"] // 4)}
+
+def caso_calcular_estadisticas(p):
+    # Tres controladores con un día de viajes cada uno (~25 mil, como tripinfo_fuzzy.xml)
+    import numpy as np
+    import pandas as pd
+    import barras
+    rng = np.random.default_rng(p["semilla"])
+    datos = {etiqueta: pd.DataFrame({metrica: rng.gamma(2.0, 50.0, p["viajes"]) for metrica in barras.metricas})
+             for etiqueta in barras.archivos}
+
+    def funcion():
+        for metrica in barras.metricas:
+            barras.calcular_estadisticas(datos, metrica)
+    return {"funcion": funcion, "unidades": len(barras.metricas) * len(datos), "unidad": "serie", "numero": 5}
+
+CASOS = {
+    "calcular_verde_exacto": lambda p: caso_calcular_verde(p, compilado=False),
+    "calcular_verde_compilado": lambda p: caso_calcular_verde(p, compilado=True),
+    "inferir_disperso_2_entradas": lambda p: caso_inferir_disperso(p, 2),
+    "inferir_disperso_4_entradas": lambda p: caso_inferir_disperso(p, 4),
+    "update_parameters_fuzzy": caso_update_parameters_fuzzy,
+    "actualizar_controladores": caso_actualizar_controladores,
+    "actualizar_controladores_lote": lambda p: caso_actualizar_controladores(p, lote=True),
+    "actualizar_estadisticas_lanes": caso_actualizar_estadisticas_lanes,
+    "generar_flujos": caso_generar_flujos,
+    "generar_demanda": caso_generar_demanda,
+    "construir_onda_fases": caso_construir_onda_fases,
+    "calcular_estadisticas": caso_calcular_estadisticas,
+}
+
+# ========= Correr =========
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def correr(casos, parametros):
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        p = dict(parametros, logs=tmp)
+        for nombre in casos:
+            caso = CASOS[nombre](p)
+            try:
+                tiempos = cronometrar(caso["funcion"], caso.get("preparar"),
+                                      caso.get("repeticiones", p["repeticiones"]), caso.get("numero", 1))
+            finally:
+                if "cerrar" in caso:
+                    caso["cerrar"]()
+            resultados[nombre] = dict(resumir(tiempos, caso["unidades"]), unidad=caso["unidad"],
+                                      metrica=caso.get("metrica", "mediana_s"))
+            r = resultados[nombre]
+            print(f"  {nombre:<30} {1e3 * r[r['metrica']]:10.3f} ms  "
+                  f"({1e6 * r[r['metrica']] / r['unidades']:.2f} µs/{r['unidad']}, {r['repeticiones']} rep.)")
+        import Fuzzy_logic as F
+        F.cerrar_logs()
+
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": parametros,
+        "resultados": resultados,
+    }
+
+# ========= Comparar =========
+def comparar(base, nuevo, umbral=UMBRAL_POR_DEFECTO, metrica=None):
+    # Razón nuevo/base por caso (con la métrica de cada caso si no se fija una);
+    # es regresión si supera 1 + umbral
+    filas = []
+    for nombre, r in nuevo["resultados"].items():
+        if nombre not in base["resultados"]:
+            continue
+        clave = metrica or r.get("metrica", "mediana_s")
+        razon = r[clave] / base["resultados"][nombre][clave]
+        filas.append({"caso": nombre, "metrica": clave, "base": base["resultados"][nombre][clave],
+                      "nuevo": r[clave], "razon": razon, "regresion": razon > 1 + umbral})
+    return filas
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del controlador difuso y del análisis")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_correr = sub.add_parser("correr", help="ejecuta los casos y guarda un JSON")
+    p_correr.add_argument("--casos", nargs="+", choices=list(CASOS), default=list(CASOS))
+    p_correr.add_argument("-o", "--salida", default=None,
+                          help="archivo JSON (por defecto, benchmarks/resultados/<fecha>_<commit>.json)")
+    p_correr.add_argument("--repeticiones", type=int, default=20)
+    p_correr.add_argument("--filas", type=int, default=2, help="filas de la cuadrícula (2×2 = 4 semáforos, como la red real)")
+    p_correr.add_argument("--columnas", type=int, default=2)
+    p_correr.add_argument("--vph", type=float, default=None,
+                          help="vehículos/hora por corredor (por defecto, la hora pico de generate_routes)")
+    p_correr.add_argument("--calentamiento", type=int, default=900, help="segundos simulados antes de medir")
+    p_correr.add_argument("--dias", type=int, default=7, help="días del perfil de demanda a generar")
+    p_correr.add_argument("--viajes", type=int, default=25000, help="viajes por controlador en calcular_estadisticas")
+    p_correr.add_argument("--no-compilado", dest="compilado", action="store_false",
+                          help="los casos sobre la red usan skfuzzy en lugar de la superficie")
+    p_correr.add_argument("--semilla", type=int, default=0)
+
+    p_comparar = sub.add_parser("comparar", help="marca regresiones entre dos JSON")
+    p_comparar.add_argument("base")
+    p_comparar.add_argument("nuevo")
+    p_comparar.add_argument("--umbral", type=float, default=UMBRAL_POR_DEFECTO,
+                            help="aumento relativo tolerado (0.10 = 10%%)")
+    p_comparar.add_argument("--metrica", choices=["mediana_s", "minimo_s", "media_s"], default=None,
+                            help="por defecto, la de cada caso (mediana salvo actualizar_controladores[_lote])")
+    args = parser.parse_args()
+
+    if args.comando == "correr":
+        parametros = {
+            "filas": args.filas, "columnas": args.columnas,
+            "vph": args.vph if args.vph is not None else vph_pico(args.filas, args.columnas),
+            "calentamiento": args.calentamiento, "dias": args.dias, "viajes": args.viajes,
+            "compilado": args.compilado, "semilla": args.semilla, "repeticiones": args.repeticiones,
+        }
+        print(f"▶️ {len(args.casos)} casos ({args.filas}x{args.columnas} semáforos, {parametros['vph']:.0f} veh/h por corredor)")
+        reporte = correr(args.casos, parametros)
+
+        salida = args.salida
+        if salida is None:
+            os.makedirs(DIRECTORIO_RESULTADOS, exist_ok=True)
+            marca = datetime.now().strftime("%Y%m%d_%H%M%S")
+            salida = os.path.join(DIRECTORIO_RESULTADOS, f"{marca}_{reporte['commit'] or 'sin_commit'}.json")
+        with open(salida, "w") as f:
+            json.dump(reporte, f, indent=2, ensure_ascii=False)
+        print(f"💾 {salida}")
+        return
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.nuevo) as f:
+        nuevo = json.load(f)
+    filas = comparar(base, nuevo, args.umbral, args.metrica)
+    for fila in filas:
+        marca = "❌" if fila["regresion"] else "✅"
+        print(f"{marca} {fila['caso']:<30} {1e3 * fila['base']:10.3f} ms → {1e3 * fila['nuevo']:10.3f} ms  "
+              f"(x{fila['razon']:.2f})")
+    regresiones = [fila["caso"] for fila in filas if fila["regresion"]]
+    if regresiones:
+        print(f"⚠️ {len(regresiones)} regresiones por encima de {100 * args.umbral:.0f}%: {', '.join(regresiones)}")
+        sys.exit(1)
+    print(f"Sin regresiones por encima de {100 * args.umbral:.0f}%")
+
+if __name__ == "__main__":
+    main()
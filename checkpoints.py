@@ -0,0 +1,78 @@
+import glob
+import os
+import pickle
+import shutil
+from sumo_backend import traci, OPCIONES_ESTADO
+
+# Checkpoints de corridas largas (Fuzzy_logic.py --checkpoint-intervalo / --resume).
+# Cada checkpoint es un directorio checkpoint_<t>/ con:
+#   - sumo.xml.gz: estado de SUMO (traci.simulation.saveState, con el estado de los RNG
+#     gracias a --save-state.rng y 17 decimales; la corrida reanudada arranca con --load-state)
+#   - controlador.pkl: lo que devuelve la función de captura del controlador (estado de
+#     los semáforos, registro de lanes, estadísticas, suscripciones pendientes y la marca
+#     de cada log: hasta dónde estaba escrito)
+# Se escribe en checkpoint_<t>.tmp/ y se renombra al terminar, así un corte a mitad de
+# camino nunca deja un checkpoint incompleto con el nombre final.
+PREFIJO = "checkpoint_"
+CONSERVAR = 2  # checkpoints completos que se dejan en disco
+OPCIONES_SUMO = ["--save-state.rng", "true"] + OPCIONES_ESTADO
+
+def agregar_argumentos_checkpoint(parser):
+    parser.add_argument("--checkpoint-intervalo", type=float, default=None, metavar="S",
+                        help="guardar un checkpoint cada S segundos de simulación")
+    parser.add_argument("--checkpoint-dir", default=None,
+                        help="directorio de los checkpoints (por defecto, <salida>/checkpoints)")
+    parser.add_argument("--resume", action="store_true",
+                        help="seguir desde el último checkpoint de --checkpoint-dir")
+
+def ruta_checkpoint(directorio, tiempo):
+    return os.path.join(directorio, f"{PREFIJO}{int(tiempo):09d}")
+
+def listar_checkpoints(directorio):
+    # Completos, del más viejo al más nuevo (el nombre lleva el tiempo con ceros a la izquierda)
+    return sorted(ruta for ruta in glob.glob(os.path.join(directorio, PREFIJO + "*"))
+                  if not ruta.endswith(".tmp") and os.path.exists(os.path.join(ruta, "controlador.pkl")))
+
+def ultimo_checkpoint(directorio):
+    completos = listar_checkpoints(directorio)
+    return completos[-1] if completos else None
+
+def cargar_checkpoint(ruta):
+    with open(os.path.join(ruta, "controlador.pkl"), "rb") as f:
+        guardado = pickle.load(f)
+    guardado["estado_sumo"] = os.path.join(ruta, "sumo.xml.gz")
+    return guardado
+
+def _escribir(ruta, datos):
+    with open(ruta, "wb") as f:
+        pickle.dump(datos, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+
+class PuntosControl:
+    def __init__(self, directorio, intervalo, capturar, proximo):
+        # capturar() -> dict con el estado del controlador en el instante actual
+        os.makedirs(directorio, exist_ok=True)
+        self.directorio = directorio
+        self.intervalo = intervalo
+        self.capturar = capturar
+        self.proximo = proximo
+
+    def guardar(self, tiempo):
+        final = ruta_checkpoint(self.directorio, tiempo)
+        temporal = final + ".tmp"
+        shutil.rmtree(temporal, ignore_errors=True)
+        os.makedirs(temporal)
+        while self.proximo <= tiempo:
+            self.proximo += self.intervalo
+        traci.simulation.saveState(os.path.join(temporal, "sumo.xml.gz"))
+        datos = self.capturar()
+        datos["tiempo"] = tiempo
+        datos["proximo_checkpoint"] = self.proximo  # la corrida reanudada sigue con el mismo calendario
+        _escribir(os.path.join(temporal, "controlador.pkl"), datos)
+        shutil.rmtree(final, ignore_errors=True)
+        os.replace(temporal, final)
+
+        for viejo in listar_checkpoints(self.directorio)[:-CONSERVAR]:
+            shutil.rmtree(viejo, ignore_errors=True)
+        return final
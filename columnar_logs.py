@@ -0,0 +1,189 @@
+import json
+import os
+import time
+import numpy as np
+
+# Salida columnar de los registros del controlador.
+#
+# Formato "columnar": un directorio por registro con un archivo binario por columna
+# (valores nativos de NumPy, solo se agregan bytes al final) y un esquema.json con los
+# tipos y los diccionarios de las columnas categóricas (IDs de lane / semáforo
+# codificados como enteros pequeños). Las columnas se leen con np.memmap sin copiar.
+#
+# Formato "parquet": un archivo .parquet con codificación por diccionario (requiere pyarrow).
+
+# Esquemas de los registros del controlador difuso: (columna, tipo); "cat" = categórica
+ESQUEMA_COLAS = [("tiempo", "f8"), ("lane_id", "cat"), ("vehiculos_en_cola", "i2")]
+ESQUEMA_SEMAFOROS = [("tiempo", "f8"), ("semaforo_id", "cat"), ("num_vehiculos", "i2"),
+                     ("fase", "i1"), ("duracion_verde", "i2")]
+
+TIPO_CODIGO = "u2"  # hasta 65535 valores distintos por columna categórica
+
+class RegistroColumnar:
+    # Misma interfaz que RegistroCSV: escribir / vaciar / marca / cerrar
+    def __init__(self, directorio, esquema, tamano_lote=65536, intervalo_s=5.0, reanudar=None):
+        os.makedirs(directorio, exist_ok=True)
+        self.directorio = directorio
+        self.esquema = esquema
+        self.tamano_lote = tamano_lote
+        self.intervalo_s = intervalo_s
+        self.filas = []
+        self.ultimo_vaciado = time.monotonic()
+        if reanudar is None:
+            self.diccionarios = {col: {} for col, tipo in esquema if tipo == "cat"}
+            self.archivos = {col: open(os.path.join(directorio, f"{col}.bin"), "wb") for col, _ in esquema}
+            self.n_filas = 0
+        else:
+            # Cada columna se corta en las filas de la marca y se sigue agregando
+            self.diccionarios = {col: {v: i for i, v in enumerate(valores)}
+                                 for col, valores in reanudar["diccionarios"].items()}
+            self.n_filas = reanudar["filas"]
+            self.archivos = {}
+            for col, tipo in esquema:
+                archivo = open(os.path.join(directorio, f"{col}.bin"), "r+b")
+                archivo.truncate(self.n_filas * np.dtype(TIPO_CODIGO if tipo == "cat" else tipo).itemsize)
+                archivo.seek(0, os.SEEK_END)
+                self.archivos[col] = archivo
+        self._guardar_esquema()
+
+    def _guardar_esquema(self):
+        esquema = {
+            "columnas": [{"nombre": col, "tipo": TIPO_CODIGO if tipo == "cat" else tipo, "categorica": tipo == "cat"}
+                         for col, tipo in self.esquema],
+            "diccionarios": {col: list(valores) for col, valores in self.diccionarios.items()},
+            "filas": self.n_filas
+        }
+        ruta = os.path.join(self.directorio, "esquema.json")
+        with open(ruta + ".tmp", "w") as f:
+            json.dump(esquema, f)
+        os.replace(ruta + ".tmp", ruta)
+
+    def escribir(self, fila):
+        self.filas.append(fila)
+        if len(self.filas) >= self.tamano_lote or time.monotonic() - self.ultimo_vaciado >= self.intervalo_s:
+            self.vaciar()
+
+    def vaciar(self):
+        if self.filas:
+            for i, (col, tipo) in enumerate(self.esquema):
+                valores = [fila[i] for fila in self.filas]
+                if tipo == "cat":
+                    codigos = self.diccionarios[col]
+                    valores = [codigos.setdefault(v, len(codigos)) for v in valores]
+                    tipo = TIPO_CODIGO
+                self.archivos[col].write(np.asarray(valores, dtype=tipo).tobytes())
+                self.archivos[col].flush()
+            self.n_filas += len(self.filas)
+            self.filas.clear()
+            self._guardar_esquema()
+        self.ultimo_vaciado = time.monotonic()
+
+    def marca(self):
+        self.vaciar()
+        return {"filas": self.n_filas, "diccionarios": {col: list(valores) for col, valores in self.diccionarios.items()}}
+
+    def cerrar(self):
+        if self.archivos:
+            self.vaciar()
+            for archivo in self.archivos.values():
+                archivo.close()
+            self.archivos = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+class RegistroParquet:
+    # Cada lote es un row group; las columnas categóricas usan codificación por diccionario
+    def __init__(self, ruta, esquema, tamano_lote=65536, intervalo_s=5.0):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("El formato parquet requiere pyarrow (pip install pyarrow)") from e
+
+        tipos = {"f8": pa.float64(), "i4": pa.int32(), "i2": pa.int16(), "i1": pa.int8(), "cat": pa.string()}
+        self.pa = pa
+        self.esquema = esquema
+        self.esquema_pa = pa.schema([(col, tipos[tipo]) for col, tipo in esquema])
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self.writer = pq.ParquetWriter(ruta, self.esquema_pa,
+                                       use_dictionary=[col for col, tipo in esquema if tipo == "cat"])
+        self.tamano_lote = tamano_lote
+        self.intervalo_s = intervalo_s
+        self.filas = []
+        self.ultimo_vaciado = time.monotonic()
+
+    def escribir(self, fila):
+        self.filas.append(fila)
+        if len(self.filas) >= self.tamano_lote or time.monotonic() - self.ultimo_vaciado >= self.intervalo_s:
+            self.vaciar()
+
+    def vaciar(self):
+        if self.filas:
+            columnas = [[fila[i] for fila in self.filas] for i in range(len(self.esquema))]
+            self.writer.write_table(self.pa.Table.from_arrays(
+                [self.pa.array(valores, type=campo.type) for valores, campo in zip(columnas, self.esquema_pa)],
+                schema=self.esquema_pa))
+            self.filas.clear()
+        self.ultimo_vaciado = time.monotonic()
+
+    def marca(self):
+        # Un .parquet cerrado no se puede reabrir para agregar row groups
+        raise ValueError("El formato parquet no admite checkpoints; use csv o columnar")
+
+    def cerrar(self):
+        if self.writer is not None:
+            self.vaciar()
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+# ========= Lectura =========
+def leer_columnar(directorio, como="dataframe", mmap=True):
+    # como="arrays": dict columna -> array (códigos enteros en las categóricas, memmap si mmap=True)
+    #                más "_diccionarios" con los valores de cada categórica
+    # como="dataframe": pandas.DataFrame con las categóricas como pd.Categorical
+    with open(os.path.join(directorio, "esquema.json")) as f:
+        esquema = json.load(f)
+
+    n = esquema["filas"]
+    arrays = {}
+    for columna in esquema["columnas"]:
+        ruta = os.path.join(directorio, f"{columna['nombre']}.bin")
+        if mmap and n > 0:
+            arrays[columna["nombre"]] = np.memmap(ruta, dtype=columna["tipo"], mode="r", shape=(n,))
+        else:
+            arrays[columna["nombre"]] = np.fromfile(ruta, dtype=columna["tipo"], count=n)
+
+    if como == "arrays":
+        arrays["_diccionarios"] = esquema["diccionarios"]
+        return arrays
+
+    import pandas as pd
+    datos = {}
+    for columna in esquema["columnas"]:
+        nombre = columna["nombre"]
+        if columna["categorica"]:
+            datos[nombre] = pd.Categorical.from_codes(np.asarray(arrays[nombre]), esquema["diccionarios"][nombre])
+        else:
+            datos[nombre] = np.asarray(arrays[nombre])
+    return pd.DataFrame(datos)
+
+def leer_log(ruta, **kwargs):
+    # Lee un registro en cualquiera de los formatos (directorio columnar, .parquet o .csv)
+    import pandas as pd
+    if os.path.isdir(ruta):
+        return leer_columnar(ruta, **kwargs)
+    if ruta.endswith(".parquet"):
+        return pd.read_parquet(ruta)
+    return pd.read_csv(ruta, **kwargs)
@@ -0,0 +1,181 @@
+import argparse
+import itertools
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from sumo_backend import BACKEND_POR_DEFECTO, BACKENDS, opciones_sumo
+from tripinfo_parser import parsear_tripinfo, guardar_tabla
+from warm_start import SUMO_CFG_CALENTAMIENTO, calentar, ruta_estado
+
+# Corre en paralelo la matriz controladores × semillas × demandas que run_P1.sh corría
+# de a una. Cada corrida es un proceso aparte con su directorio de salida, su puerto y
+# etiqueta TraCI y su --seed; al final se escribe manifiesto.json con todas.
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+CONTROLADORES = {
+    "static": {"cfg": "sumo_files/osm_static.sumocfg", "script": None},
+    "actuated": {"cfg": "sumo_files/osm_actuated.sumocfg", "script": "Actuated_logic.py"},
+    "fuzzy": {"cfg": "sumo_files/osm_fuzzy.sumocfg", "script": "Fuzzy_logic.py"},
+}
+DEMANDA_POR_DEFECTO = "sumo_files/generated_routes_hourly.rou.xml"
+PUERTO_BASE = 9000
+
+def nombre_corrida(controlador, demanda, semilla):
+    base = os.path.basename(demanda).split(".")[0]
+    return f"{controlador}_{base}_s{semilla}"
+
+def armar_corridas(controladores, semillas, demandas, salida, puerto_base=PUERTO_BASE, backend=BACKEND_POR_DEFECTO):
+    corridas = []
+    for i, (controlador, demanda, semilla) in enumerate(itertools.product(controladores, demandas, semillas)):
+        nombre = nombre_corrida(controlador, demanda, semilla)
+        corridas.append({
+            "nombre": nombre,
+            "controlador": controlador,
+            "demanda": os.path.abspath(demanda),
+            "semilla": semilla,
+            "directorio": os.path.abspath(os.path.join(salida, nombre)),
+            "puerto": puerto_base + i,
+            "etiqueta": nombre,
+            "backend": backend,
+        })
+    return corridas
+
+def preparar_estados(demandas, tiempo, directorio, procesos=None, backend=BACKEND_POR_DEFECTO):
+    # Un calentamiento por demanda, compartido por todos los controladores y semillas
+    os.makedirs(directorio, exist_ok=True)
+    estados = {}
+    with ProcessPoolExecutor(max_workers=procesos or os.cpu_count()) as pool:
+        futuros = {pool.submit(calentar, tiempo, ruta_estado(directorio, demanda, tiempo),
+                               os.path.abspath(demanda), None, os.path.join(RAIZ, SUMO_CFG_CALENTAMIENTO),
+                               backend): os.path.abspath(demanda)
+                   for demanda in demandas}
+        for futuro in as_completed(futuros):
+            estados[futuros[futuro]] = futuro.result()["estado"]
+    return estados
+
+def comando_corrida(corrida, extra=()):
+    datos = CONTROLADORES[corrida["controlador"]]
+    estado = corrida.get("estado_inicial")
+    if datos["script"] is None:
+        # Plan fijo: SUMO solo, sin TraCI
+        cfg = os.path.join(RAIZ, datos["cfg"])
+        return ["sumo", "-c", cfg] + opciones_sumo(cfg, corrida["semilla"], corrida["demanda"],
+                                                   corrida["directorio"], estado, corrida.get("fin"))
+    return [sys.executable, os.path.join(RAIZ, datos["script"]),
+            "--backend", corrida["backend"],
+            "--salida", corrida["directorio"],
+            "--salidas-sumo", corrida["directorio"],
+            "--seed", str(corrida["semilla"]),
+            "--rutas", corrida["demanda"],
+            "--puerto", str(corrida["puerto"]),
+            "--etiqueta", corrida["etiqueta"]] + (["--estado-inicial", estado] if estado else []) \
+        + (["--fin", str(corrida["fin"])] if corrida.get("fin") is not None else []) \
+        + (list(extra) if corrida["controlador"] == "fuzzy" else []) + corrida.get("extra", [])
+
+def resumir_tripinfo(ruta_xml, ruta_tabla):
+    tabla = parsear_tripinfo(ruta_xml, incluir_ids=False)
+    guardar_tabla(tabla, ruta_tabla)
+    columnas = tabla["columnas"]
+    vehiculos = len(columnas["tripinfo_duration"])
+    if vehiculos == 0:
+        return {"vehiculos": 0}
+    return {
+        "vehiculos": vehiculos,
+        "duracion_media": float(np.mean(columnas["tripinfo_duration"])),
+        "espera_media": float(np.mean(columnas["tripinfo_waitingTime"])),
+        "perdida_media": float(np.mean(columnas["tripinfo_timeLoss"])),
+    }
+
+def ejecutar_corrida(corrida, extra=()):
+    os.makedirs(corrida["directorio"], exist_ok=True)
+    cmd = comando_corrida(corrida, extra)
+    inicio = time.perf_counter()
+    # Los scripts usan rutas relativas a la raíz del repo (./sumo_files/...)
+    with open(os.path.join(corrida["directorio"], "salida.log"), "w") as log:
+        proceso = subprocess.run(cmd, cwd=RAIZ, stdout=log, stderr=subprocess.STDOUT)
+    resultado = dict(corrida, comando=cmd, codigo_salida=proceso.returncode,
+                     segundos=round(time.perf_counter() - inicio, 2))
+
+    tripinfos = [a for a in os.listdir(corrida["directorio"]) if a.startswith("tripinfo") and a.endswith(".xml")]
+    if proceso.returncode == 0 and tripinfos:
+        try:
+            resultado["resumen"] = resumir_tripinfo(os.path.join(corrida["directorio"], tripinfos[0]),
+                                                    os.path.join(corrida["directorio"], "tripinfo.npz"))
+        except Exception as e:
+            resultado["error"] = f"tripinfo ilegible: {e}"
+    resultado["archivos"] = sorted(os.listdir(corrida["directorio"]))
+    return resultado
+
+def ejecutar_matriz(corridas, procesos=None, extra=(), al_terminar=None):
+    resultados = []
+    with ProcessPoolExecutor(max_workers=procesos or os.cpu_count()) as pool:
+        futuros = [pool.submit(ejecutar_corrida, corrida, extra) for corrida in corridas]
+        for futuro in as_completed(futuros):
+            resultado = futuro.result()
+            resultados.append(resultado)
+            if al_terminar:
+                al_terminar(resultado)
+    orden = {corrida["nombre"]: i for i, corrida in enumerate(corridas)}
+    return sorted(resultados, key=lambda r: orden[r["nombre"]])
+
+def guardar_manifiesto(resultados, salida, segundos):
+    manifiesto = {
+        "creado": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "segundos_totales": round(segundos, 2),
+        "corridas": resultados,
+    }
+    ruta = os.path.join(salida, "manifiesto.json")
+    temporal = ruta + ".tmp"
+    with open(temporal, "w") as f:
+        json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+    os.replace(temporal, ruta)
+    return ruta
+
+def mostrar_resultado(resultado):
+    estado = "✅" if resultado["codigo_salida"] == 0 and "error" not in resultado else "❌"
+    resumen = resultado.get("resumen", {})
+    detalle = ""
+    if resumen.get("vehiculos"):
+        detalle = (f" | {resumen['vehiculos']} veh, espera {resumen['espera_media']:.1f}s,"
+                   f" pérdida {resumen['perdida_media']:.1f}s")
+    print(f"{estado} {resultado['nombre']} ({resultado['segundos']:.0f}s){detalle}", flush=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Corre en paralelo controladores × semillas × demandas")
+    parser.add_argument("--controladores", nargs="+", choices=list(CONTROLADORES), default=list(CONTROLADORES))
+    parser.add_argument("--semillas", nargs="+", type=int, default=[42])
+    parser.add_argument("--demandas", nargs="+", default=[DEMANDA_POR_DEFECTO], help="archivos .rou.xml")
+    parser.add_argument("--salida", default="./corridas", help="directorio raíz; una subcarpeta por corrida")
+    parser.add_argument("--procesos", type=int, default=None, help="corridas simultáneas (por defecto, núcleos)")
+    parser.add_argument("--puerto-base", type=int, default=PUERTO_BASE, help="puerto TraCI de la primera corrida")
+    parser.add_argument("--backend", choices=BACKENDS, default=BACKEND_POR_DEFECTO)
+    parser.add_argument("--calentar", type=float, default=None,
+                        help="simular una vez hasta este instante (s) y arrancar todas las corridas desde ahí")
+    parser.add_argument("extra", nargs=argparse.REMAINDER,
+                        help="tras '--', argumentos adicionales para Fuzzy_logic.py")
+    args = parser.parse_args()
+    extra = args.extra[1:] if args.extra[:1] == ["--"] else args.extra
+    if args.calentar and args.backend == "simulado":
+        parser.error("--calentar necesita SUMO: el backend simulado no guarda estados")
+
+    os.makedirs(args.salida, exist_ok=True)
+    corridas = armar_corridas(args.controladores, args.semillas, args.demandas, args.salida,
+                              args.puerto_base, args.backend)
+    print(f"▶️ {len(corridas)} corridas en {args.procesos or os.cpu_count()} procesos")
+
+    inicio = time.perf_counter()
+    if args.calentar:
+        estados = preparar_estados(args.demandas, args.calentar, os.path.join(args.salida, "estados"),
+                                   args.procesos, args.backend)
+        for corrida in corridas:
+            corrida["estado_inicial"] = estados[corrida["demanda"]]
+        print(f"💾 {len(estados)} estados en t={args.calentar:.0f}s")
+    resultados = ejecutar_matriz(corridas, args.procesos, extra, mostrar_resultado)
+    ruta = guardar_manifiesto(resultados, args.salida, time.perf_counter() - inicio)
+    print(f"\n📄 Manifiesto: {ruta}")
+    if any(r["codigo_salida"] != 0 for r in resultados):
+        sys.exit(1)
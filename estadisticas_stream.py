@@ -0,0 +1,214 @@
+import argparse
+import numpy as np
+
+# Estadísticas en flujo por serie (lane o semáforo/fase) y variable, sin guardar muestras:
+#   - cuantiles con un sketch logarítmico (tipo DDSketch): cubetas de ancho relativo fijo,
+#     error relativo <= ALFA en cualquier cuantil; los valores <= VALOR_MINIMO cuentan como 0
+#   - media y varianza en línea (Welford), mínimo y máximo exactos
+# Todo vive en arreglos (series × variables × cubetas). Cada muestra se anota en O(1) y se
+# vuelca por lotes; dos sketches con las mismas series se combinan sumando cuentas, así que
+# se pueden juntar corridas en paralelo o de varias semillas (ver "combinar" abajo).
+VARIABLES = ("vehiculos", "movimiento", "detenidos", "velocidad_promedio", "tasa_llegada")
+ENTERAS = ("vehiculos", "movimiento", "detenidos")  # cuantiles redondeados al entero
+ALFA = 0.02
+VALOR_MINIMO = 0.01
+VALOR_MAXIMO = 1000.0
+PERCENTILES = (50, 90, 99)
+
+GAMMA = (1 + ALFA) / (1 - ALFA)
+N_CUBETAS = 1 + int(np.ceil(np.log(VALOR_MAXIMO / VALOR_MINIMO) / np.log(GAMMA)))
+
+def _bordes():
+    # Cubeta k >= 1: (VALOR_MINIMO·γ^(k-1), VALOR_MINIMO·γ^k]; la 0 junta todo lo <= VALOR_MINIMO
+    # y la última lo que pase de VALOR_MAXIMO. El representante de cada cubeta es la media
+    # armónica de sus bordes, a distancia relativa <= ALFA de cualquier valor de la cubeta
+    bordes = VALOR_MINIMO * GAMMA ** np.arange(N_CUBETAS - 1)
+    bajo, alto = bordes[:-1], bordes[1:]
+    return bordes, np.concatenate([[0.0], 2 * bajo * alto / (bajo + alto), [bordes[-1]]])
+
+BORDES, REPRESENTANTES = _bordes()
+
+def _fusionar(momentos, n_b, media_b, m2_b):
+    # (n, media, m2) de dos conjuntos de muestras en uno (Welford en paralelo, Chan et al.)
+    n_a, media_a, m2_a = momentos[..., 0], momentos[..., 1], momentos[..., 2]
+    n = n_a + n_b
+    delta = media_b - media_a
+    peso = np.divide(n_b, n, out=np.zeros_like(n), where=n > 0)
+    return np.stack([n, media_a + delta * peso, m2_a + m2_b + delta ** 2 * n_a * peso], axis=-1)
+
+class EstadisticasStream:
+    def __init__(self, claves, variables=VARIABLES, tamano_lote=4096):
+        self.claves = list(claves)
+        self.posicion = {clave: i for i, clave in enumerate(self.claves)}
+        self.variables = tuple(variables)
+        forma = (len(self.claves), len(self.variables))
+        self.cuentas = np.zeros(forma + (N_CUBETAS,), dtype=np.uint32)
+        # n, media, m2, mínimo y máximo juntos; n, media, ... son vistas de sus columnas
+        self.momentos = np.zeros(forma + (5,))
+        self.momentos[..., 3] = np.inf
+        self.momentos[..., 4] = -np.inf
+        self.n, self.media, self.m2, self.minimo, self.maximo = (self.momentos[..., k] for k in range(5))
+        # Muestras sueltas en listas hasta completar un lote: con pocos lanes por decisión lo
+        # caro son las llamadas a NumPy, así que anotar no hace ninguna
+        self.tamano_lote = tamano_lote
+        self._series = []
+        self._valores = []
+
+    # Para los checkpoints: n, media, ... se rearman como vistas de momentos al cargar
+    def __getstate__(self):
+        estado = dict(self.__dict__)
+        for nombre in ("n", "media", "m2", "minimo", "maximo"):
+            del estado[nombre]
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self.n, self.media, self.m2, self.minimo, self.maximo = (self.momentos[..., k] for k in range(5))
+
+    def anotar(self, serie, valores):
+        self._series.append(serie)
+        self._valores.append(valores)
+        if len(self._series) >= self.tamano_lote:
+            self.volcar()
+
+    def anotar_lote(self, series, valores):
+        # Varias muestras seguidas; se vuelca en los mismos puntos que anotándolas de a una
+        while series:
+            cabe = self.tamano_lote - len(self._series)
+            self._series.extend(series[:cabe])
+            self._valores.extend(valores[:cabe])
+            series, valores = series[cabe:], valores[cabe:]
+            if len(self._series) >= self.tamano_lote:
+                self.volcar()
+
+    def volcar(self):
+        if self._series:
+            series, valores = self._series, self._valores
+            self._series, self._valores = [], []
+            self.agregar(np.array(series, dtype=np.intp), np.array(valores, dtype=np.float64))
+
+    def agregar(self, series, valores):
+        # series: (m,) índices, pueden repetirse; valores: (m, variables)
+        variables = len(self.variables)
+        plano = (series[:, None] * variables + np.arange(variables)).ravel()
+        x = valores.ravel()
+        np.add.at(self.cuentas.reshape(-1), plano * N_CUBETAS + np.searchsorted(BORDES, x), 1)
+
+        # Media y m2 del lote por (serie, variable), luego se fusionan con lo acumulado
+        momentos = self.momentos.reshape(-1, 5)
+        tamano = len(momentos)
+        n_lote = np.bincount(plano, minlength=tamano).astype(np.float64)
+        tocados = np.flatnonzero(n_lote)
+        media_lote = np.bincount(plano, weights=x, minlength=tamano)
+        media_lote[tocados] /= n_lote[tocados]
+        m2_lote = np.bincount(plano, weights=(x - media_lote[plano]) ** 2, minlength=tamano)
+        momentos[tocados, :3] = _fusionar(momentos[tocados, :3], n_lote[tocados], media_lote[tocados], m2_lote[tocados])
+        np.minimum.at(momentos[:, 3], plano, x)
+        np.maximum.at(momentos[:, 4], plano, x)
+
+    def combinar(self, otra):
+        if otra.claves != self.claves or otra.variables != self.variables:
+            raise ValueError("Solo se combinan estadísticas con las mismas series y variables")
+        self.volcar()
+        otra.volcar()
+        self.cuentas += otra.cuentas
+        self.momentos[..., :3] = _fusionar(self.momentos[..., :3], otra.n, otra.media, otra.m2)
+        np.minimum(self.minimo, otra.minimo, out=self.minimo)
+        np.maximum(self.maximo, otra.maximo, out=self.maximo)
+        return self
+
+    def total(self):
+        # Todas las series juntas en una sola (p. ej. todos los lanes de la red)
+        self.volcar()
+        total = EstadisticasStream(["total"], self.variables)
+        total.cuentas[0] = self.cuentas.sum(axis=0)
+        total.n[0] = self.n.sum(axis=0)
+        suma = (self.media * self.n).sum(axis=0)
+        total.media[0] = np.divide(suma, total.n[0], out=np.zeros_like(suma), where=total.n[0] > 0)
+        total.m2[0] = (self.m2 + self.n * (self.media - total.media[0]) ** 2).sum(axis=0)
+        total.minimo[0] = self.minimo.min(axis=0, initial=np.inf)
+        total.maximo[0] = self.maximo.max(axis=0, initial=-np.inf)
+        return total
+
+    def cuantiles(self, percentiles=PERCENTILES):
+        # (series, variables, percentiles), acotados al mínimo y máximo exactos
+        self.volcar()
+        acumuladas = np.cumsum(self.cuentas, axis=-1)
+        resultado = np.full(self.n.shape + (len(percentiles),), np.nan)
+        for j, p in enumerate(percentiles):
+            objetivo = np.ceil(p / 100 * self.n)
+            cubeta = np.argmax(acumuladas >= np.maximum(objetivo, 1)[..., None], axis=-1)
+            resultado[..., j] = np.clip(REPRESENTANTES[cubeta], self.minimo, self.maximo)
+        resultado[self.n == 0] = np.nan
+        for v, variable in enumerate(self.variables):
+            if variable in ENTERAS:
+                resultado[:, v] = np.round(resultado[:, v])
+        return resultado
+
+    def resumen(self, i):
+        # {variable: {n, media, desviacion, min, p50, p90, p99, max}} de la serie i
+        cuantiles = self.cuantiles()  # también vuelca lo pendiente
+        varianza = np.divide(self.m2, self.n - 1, out=np.zeros_like(self.m2), where=self.n > 1)
+        resumen = {}
+        for v, variable in enumerate(self.variables):
+            fila = {"n": int(self.n[i, v]), "media": self.media[i, v], "desviacion": float(np.sqrt(varianza[i, v])),
+                    "min": self.minimo[i, v], "max": self.maximo[i, v]}
+            fila.update({f"p{p}": cuantiles[i, v, j] for j, p in enumerate(PERCENTILES)})
+            resumen[variable] = fila
+        return resumen
+
+    def guardar(self, ruta):
+        self.volcar()
+        np.savez_compressed(ruta, claves=np.array(self.claves), variables=np.array(self.variables),
+                            alfa=ALFA, valor_minimo=VALOR_MINIMO, cuentas=self.cuentas, momentos=self.momentos)
+
+def cargar(ruta):
+    with np.load(ruta) as datos:
+        if float(datos["alfa"]) != ALFA or float(datos["valor_minimo"]) != VALOR_MINIMO:
+            raise ValueError(f"{ruta}: sketch con otros parámetros (alfa={float(datos['alfa'])})")
+        estadisticas = EstadisticasStream(datos["claves"].tolist(), datos["variables"].tolist())
+        estadisticas.cuentas[...] = datos["cuentas"]
+        estadisticas.momentos[...] = datos["momentos"]
+    return estadisticas
+
+# ========= Series del controlador =========
+def clave_fase(semaforo_id, fase):
+    return f"{semaforo_id}|{fase}"
+
+def inicializar_estadisticas(lane_ids, fases_lanes_dict):
+    # Una serie por lane (en el mismo orden que registro_all_lanes) y una por (semáforo, fase)
+    claves_fases = [clave_fase(s, f) for s, fases in fases_lanes_dict.items() for f in fases]
+    return {"lanes": EstadisticasStream(lane_ids), "fases": EstadisticasStream(claves_fases)}
+
+def guardar_estadisticas(estadisticas, prefijo):
+    for nombre, est in estadisticas.items():
+        est.guardar(f"{prefijo}_{nombre}.npz")
+
+def imprimir_resumen(titulo, resumen):
+    print(titulo)
+    for variable, fila in resumen.items():
+        if fila["n"] == 0:
+            print(f"    {variable:<19}: sin muestras")
+            continue
+        print(f"    {variable:<19}: media {fila['media']:7.2f} ± {fila['desviacion']:6.2f}  "
+              f"p50 {fila['p50']:7.2f}  p90 {fila['p90']:7.2f}  p99 {fila['p99']:7.2f}  "
+              f"[{fila['min']:.2f} → {fila['max']:.2f}]  (n={fila['n']})")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Combina y muestra estadísticas en flujo (.npz) de varias corridas")
+    parser.add_argument("archivos", nargs="+", help="estadisticas_*.npz con las mismas series")
+    parser.add_argument("-o", "--salida", default=None, help="guardar la combinación en este .npz")
+    parser.add_argument("--por-serie", action="store_true", help="mostrar cada serie además del total")
+    args = parser.parse_args()
+
+    combinada = cargar(args.archivos[0])
+    for ruta in args.archivos[1:]:
+        combinada.combinar(cargar(ruta))
+    if args.salida:
+        combinada.guardar(args.salida)
+
+    imprimir_resumen(f"=== TOTAL ({len(args.archivos)} archivos, {len(combinada.claves)} series) ===",
+                     combinada.total().resumen(0))
+    if args.por_serie:
+        for i, clave in enumerate(combinada.claves):
+            imprimir_resumen(f"\n📍 {clave}", combinada.resumen(i))
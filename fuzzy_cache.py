@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import numpy as np
+from fuzzy_utils import *
+
+# Caché en disco del sistema difuso compilado (motor vectorizado + superficie de decisión).
+# La clave es un hash de funciones, reglas_definidas, entradas y resolución: si cambian, se recompila.
+# Por defecto junto a este módulo, no en el directorio desde el que se lo importe
+DIRECTORIO_CACHE = os.environ.get("FUZZY_CACHE_DIR",
+                                  os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache_fuzzy"))
+VERSION_CACHE = 3  # 2: reglas con N entradas y antecedentes CUALQUIERA (-1); 3: reporte por muestreo denso
+
+def huella_definiciones(funciones, reglas_definidas, resolucion=None, entradas=ENTRADAS):
+    contenido = json.dumps({
+        "version": VERSION_CACHE,
+        "funciones": funciones,
+        "reglas": reglas_definidas,
+        "entradas": list(entradas),
+        "resolucion": resolucion
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+def guardar_sistema_compilado(ruta, clave, motor, superficie=None, reporte=None):
+    arrays = {
+        "clave": np.array(clave),
+        "variables": np.array(list(motor["universos"].keys())),
+        "entradas": np.array(motor["entradas"]),
+        "reglas": motor["reglas"],
+        "soportes": np.array(motor["soportes"], dtype=np.int64),
+        "pesos_area": motor["pesos_area"],
+        "pesos_momento": motor["pesos_momento"],
+    }
+    for nombre in motor["universos"]:
+        arrays[f"universo_{nombre}"] = motor["universos"][nombre]
+        arrays[f"membresias_{nombre}"] = motor["membresias"][nombre]
+
+    if superficie is not None:
+        arrays["superficie_vehiculos"] = superficie["vehiculos"]
+        arrays["superficie_llegada"] = superficie["llegada"]
+        arrays["superficie_verde"] = superficie["verde"]
+    if reporte is not None:
+        arrays["reporte"] = np.array(json.dumps(reporte))
+
+    # Escritura atómica: varias corridas en paralelo pueden compartir el directorio
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp.npz"
+    np.savez(temporal, **arrays)
+    os.replace(temporal, ruta)
+
+def cargar_sistema_compilado(ruta, clave):
+    with np.load(ruta, allow_pickle=False) as datos:
+        if str(datos["clave"]) != clave:
+            return None
+
+        variables = [str(v) for v in datos["variables"]]
+        motor = {
+            "entradas": [str(e) for e in datos["entradas"]],
+            "universos": {v: datos[f"universo_{v}"] for v in variables},
+            "membresias": {v: datos[f"membresias_{v}"] for v in variables},
+            "reglas": datos["reglas"],
+            "soportes": [tuple(int(x) for x in par) for par in datos["soportes"]],
+            "pesos_area": datos["pesos_area"],
+            "pesos_momento": datos["pesos_momento"],
+        }
+        indexar_reglas(motor)  # el índice disperso no se guarda: se rearma de la matriz de reglas
+
+        superficie = None
+        if "superficie_verde" in datos:
+            superficie = superficie_desde_malla(datos["superficie_vehiculos"],
+                                                datos["superficie_llegada"],
+                                                datos["superficie_verde"])
+
+        reporte = json.loads(str(datos["reporte"])) if "reporte" in datos else None
+
+    return {"motor": motor, "superficie": superficie, "reporte": reporte}
+
+def obtener_sistema_compilado(funciones, reglas_definidas, resolucion=None,
+                              crear_sistema_ctrl=None, directorio=DIRECTORIO_CACHE, entradas=ENTRADAS):
+    # resolucion: {"vehiculos": n, "llegada": m} para incluir la superficie de decisión (solo
+    # con las entradas vehiculos y llegada; con otras la superficie no se arma)
+    # crear_sistema_ctrl: si se indica, al compilar se verifica la superficie contra skfuzzy
+    if tuple(entradas) != ("vehiculos", "llegada"):
+        resolucion = None
+    clave = huella_definiciones(funciones, reglas_definidas, resolucion, entradas)
+    ruta = os.path.join(directorio, f"fuzzy_{clave[:16]}.npz")
+
+    if os.path.exists(ruta):
+        try:
+            compilado = cargar_sistema_compilado(ruta, clave)
+        except (OSError, ValueError, KeyError):
+            compilado = None  # archivo corrupto o de otra versión: se recompila
+        if compilado is not None:
+            compilado["desde_cache"] = True
+            if compilado["reporte"] is None and compilado["superficie"] is not None and crear_sistema_ctrl is not None:
+                # Superficie guardada sin verificar: se verifica ahora y se actualiza el archivo
+                compilado["reporte"] = desviacion_superficie(compilado["superficie"], crear_sistema_ctrl(),
+                                                             motor=compilado["motor"])
+                guardar_sistema_compilado(ruta, clave, compilado["motor"], compilado["superficie"], compilado["reporte"])
+            return compilado
+
+    motor = compilar_motor_fuzzy(funciones, reglas_definidas, entradas)
+    superficie = None
+    reporte = None
+    if resolucion is not None:
+        superficie = compilar_superficie(None, funciones, resolucion["vehiculos"], resolucion["llegada"], motor=motor)
+        if crear_sistema_ctrl is not None:
+            reporte = desviacion_superficie(superficie, crear_sistema_ctrl(), motor=motor)
+
+    guardar_sistema_compilado(ruta, clave, motor, superficie, reporte)
+    return {"motor": motor, "superficie": superficie, "reporte": reporte, "desde_cache": False}
@@ -1,5 +1,13 @@
 sumo_cfg = "./sumo_files/osm_fuzzy.sumocfg"
 
+# Modo compilado: calcular_verde consulta una superficie precalculada (vehiculos × llegada)
+# en lugar de ejecutar skfuzzy en cada decisión
+modo_compilado = False
+resolucion_superficie = {
+    "vehiculos": 31,   # paso de 1 vehículo
+    "llegada": 51      # paso de 0.02 veh/s
+}
+
 semaforos_ids = ["2496228891", 
                      "cluster_12013799525_12013799526_2496228894", 
                      "cluster_12013799527_12013799528_2190601967",
@@ -62,6 +70,18 @@ funciones = {
     }
 }
 
+# Entradas del sistema difuso, en el orden de las columnas de reglas_definidas (la última
+# columna es el nivel de "verde"). Además de vehiculos y llegada, el controlador mide sobre
+# los lanes de la fase "movimiento", "detenidos" y "velocidad_promedio"; cada entrada usada
+# necesita su definición en funciones. En una regla, "*" es "no importa": ese antecedente no
+# participa, así una base con varias entradas no necesita la tabla completa. Por ejemplo:
+#   entradas = ["vehiculos", "llegada", "detenidos"]
+#   funciones["detenidos"] = {"lmin": 0, "lmax": 20, "niveles": ["pocos", "normal", "muchos"]}
+#   ["muchos", "*", "muchos", "muy alto"]  # cola detenida larga, sin importar la llegada
+# Fuera del modo compilado se evalúa con skfuzzy; en modo compilado, con 2 entradas
+# (vehiculos, llegada) se usa la superficie y con otras el motor disperso (fuzzy_utils).
+entradas = ["vehiculos", "llegada"]
+
 reglas_definidas = [
     #   Vehiculos    Tasa         Verde
     ["muy pocos", "muy lenta", "muy corto"],
@@ -1,7 +1,42 @@
+import functools
+import json
+import operator
 import numpy as np
 import skfuzzy as fuzz
 from skfuzzy import control as ctrl
 
+# Entradas por defecto, en el orden de las columnas de reglas_definidas (la última es "verde").
+# Un antecedente CUALQUIERA ("no importa") no participa de la regla
+ENTRADAS = ("vehiculos", "llegada")
+CUALQUIERA = "*"
+
+def membresias_niveles(lmin, lmax, n, universo):
+    # Trapecios en los extremos y triángulos en los niveles intermedios
+    paso = (lmax - lmin) / (n - 1)
+    membresias = []
+
+    for i in range(n):
+        if i == 0:
+            a = lmin
+            b = lmin
+            c = lmin + paso
+            d = lmin + paso * 2
+            mf = fuzz.trapmf(universo, [a, b, c, d])
+        elif i == n - 1:
+            a = lmax - paso * 2
+            b = lmax - paso
+            c = lmax
+            d = lmax
+            mf = fuzz.trapmf(universo, [a, b, c, d])
+        else:
+            a = lmin + paso * (i - 1)
+            b = lmin + paso * i
+            c = lmin + paso * (i + 1)
+            mf = fuzz.trimf(universo, [a, b, c])
+        membresias.append(mf)
+
+    return membresias
+
 def generar_membresias_fuzzy(funciones):
     entradas_salidas = {}
 
@@ -9,32 +44,11 @@ def generar_membresias_fuzzy(funciones):
         lmin = definicion["lmin"]
         lmax = definicion["lmax"]
         niveles = definicion["niveles"]
-        n = len(niveles)
 
         universo = np.linspace(lmin, lmax, 1000)  # más suave que np.arange
         variable = ctrl.Antecedent(universo, nombre) if nombre != "verde" else ctrl.Consequent(universo, nombre)
 
-        paso = (lmax - lmin) / (n - 1)
-
-        for i, nivel in enumerate(niveles):
-            if i == 0:
-                a = lmin
-                b = lmin
-                c = lmin + paso
-                d = lmin + paso * 2
-                mf = fuzz.trapmf(universo, [a, b, c, d])
-            elif i == n - 1:
-                a = lmax - paso * 2
-                b = lmax - paso
-                c = lmax
-                d = lmax
-                mf = fuzz.trapmf(universo, [a, b, c, d])
-            else:
-                a = lmin + paso * (i - 1)
-                b = lmin + paso * i
-                c = lmin + paso * (i + 1)
-                mf = fuzz.trimf(universo, [a, b, c])
-
+        for nivel, mf in zip(niveles, membresias_niveles(lmin, lmax, len(niveles), universo)):
             variable[nivel] = mf
 
         entradas_salidas[nombre] = variable
@@ -57,9 +71,383 @@ def generar_reglas_automaticas(vehiculos_var, llegada_var, verde_var,
 
     return reglas
 
-def crear_reglas_desde_lista(reglas_definidas, vehiculos, llegada, verde):
+def crear_reglas_desde_lista(reglas_definidas, variables, entradas=ENTRADAS):
+    # variables: las de generar_membresias_fuzzy; el AND junta solo los antecedentes que no son CUALQUIERA
     reglas = []
-    for v, l, salida in reglas_definidas:
-        regla = ctrl.Rule(vehiculos[v] & llegada[l], verde[salida])
+    for *antecedentes, salida in reglas_definidas:
+        terminos = [variables[nombre][nivel] for nombre, nivel in zip(entradas, antecedentes) if nivel != CUALQUIERA]
+        regla = ctrl.Rule(functools.reduce(operator.and_, terminos), variables["verde"][salida])
         reglas.append(regla)
     return reglas
+
+# ========= Definiciones externas =========
+def combinar_definiciones(funciones, reglas_definidas, cambios, entradas=ENTRADAS):
+    # cambios: {"funciones": {...}, "reglas_definidas": [...], "entradas": [...]}; las funciones
+    # pueden ser parciales (p. ej. solo "lmax" de "vehiculos"). Devuelve copias, no toca las originales
+    nuevas_funciones = {nombre: dict(d) for nombre, d in funciones.items()}
+    for nombre, valores in cambios.get("funciones", {}).items():
+        if nombre not in nuevas_funciones:
+            # Variable nueva (p. ej. otra entrada): tiene que venir completa
+            if not {"lmin", "lmax", "niveles"} <= set(valores):
+                raise ValueError(f"Variable difusa desconocida: {nombre} (una nueva necesita lmin, lmax y niveles)")
+            nuevas_funciones[nombre] = {}
+        nuevas_funciones[nombre].update(valores)
+    nuevas_reglas = [list(r) for r in cambios.get("reglas_definidas", reglas_definidas)]
+    nuevas_entradas = list(cambios.get("entradas", entradas))
+
+    for nombre, d in nuevas_funciones.items():
+        if not d["lmin"] < d["lmax"]:
+            raise ValueError(f"{nombre}: lmin ({d['lmin']}) debe ser menor que lmax ({d['lmax']})")
+    for nombre in nuevas_entradas:
+        if nombre not in nuevas_funciones or nombre == "verde" or nuevas_entradas.count(nombre) > 1:
+            raise ValueError(f"Entrada inválida: {nombre} (sin definición en funciones, repetida o es la salida)")
+    columnas = nuevas_entradas + ["verde"]
+    for regla in nuevas_reglas:
+        if len(regla) != len(columnas):
+            raise ValueError(f"Regla {regla}: se esperaban {len(columnas)} niveles ({', '.join(columnas)})")
+        if all(nivel == CUALQUIERA for nivel in regla[:-1]):
+            raise ValueError(f"Regla {regla}: todos los antecedentes son '{CUALQUIERA}'")
+        for nombre, nivel in zip(columnas, regla):
+            if nivel == CUALQUIERA and nombre != "verde":
+                continue
+            if nivel not in nuevas_funciones[nombre]["niveles"]:
+                raise ValueError(f"Regla {regla}: '{nivel}' no es un nivel de {nombre}")
+    return nuevas_funciones, nuevas_reglas, nuevas_entradas
+
+def cargar_definiciones(ruta, funciones, reglas_definidas, entradas=ENTRADAS):
+    with open(ruta, encoding="utf-8") as f:
+        return combinar_definiciones(funciones, reglas_definidas, json.load(f), entradas)
+
+
+# ========= Motor Mamdani vectorizado (NumPy) =========
+def compilar_motor_fuzzy(funciones, reglas_definidas, entradas=ENTRADAS, puntos=1000):
+    # Mismas definiciones que generar_membresias_fuzzy/crear_reglas_desde_lista, pero como arrays
+    universos = {}
+    membresias = {}
+    for nombre, definicion in funciones.items():
+        universo = np.linspace(definicion["lmin"], definicion["lmax"], puntos)
+        universos[nombre] = universo
+        membresias[nombre] = np.array(membresias_niveles(definicion["lmin"], definicion["lmax"],
+                                                         len(definicion["niveles"]), universo))
+
+    # Matriz de reglas: [nivel de cada entrada..., nivel verde]; -1 = CUALQUIERA
+    indices = {nombre: {nivel: i for i, nivel in enumerate(d["niveles"])} for nombre, d in funciones.items()}
+    indices_entradas = [dict(indices[nombre], **{CUALQUIERA: -1}) for nombre in entradas]
+    matriz_reglas = np.array([
+        [indice[nivel] for indice, nivel in zip(indices_entradas, antecedentes)] + [indices["verde"][salida]]
+        for *antecedentes, salida in reglas_definidas
+    ], dtype=np.int64).reshape(-1, len(entradas) + 1)
+
+    # El centroide de una función lineal a tramos es lineal en sus valores:
+    # área = pesos_area · mf, momento = pesos_momento · mf
+    u = universos["verde"]
+    dx = np.diff(u)
+    pesos_area = np.zeros(puntos)
+    pesos_area[:-1] += 0.5 * dx
+    pesos_area[1:] += 0.5 * dx
+    pesos_momento = np.zeros(puntos)
+    pesos_momento[:-1] += dx * (u[:-1] / 2 + dx / 6)
+    pesos_momento[1:] += dx * (u[:-1] / 2 + dx / 3)
+
+    # Tramo del universo de salida donde cada término es distinto de cero
+    soportes = []
+    for mf in membresias["verde"]:
+        no_nulos = np.flatnonzero(mf)
+        soportes.append((int(no_nulos[0]), int(no_nulos[-1]) + 1) if no_nulos.size else (0, 0))
+
+    return indexar_reglas({
+        "entradas": list(entradas),
+        "universos": universos,
+        "membresias": membresias,
+        "reglas": matriz_reglas,
+        "soportes": soportes,
+        "pesos_area": pesos_area,
+        "pesos_momento": pesos_momento,
+    })
+
+def indexar_reglas(motor):
+    # Índice de términos activos -> reglas para inferir_disperso, en listas y enteros de Python
+    # (con una sola decisión pesan más las llamadas a NumPy que las cuentas):
+    #   - _mascaras[k][t]: bits de las reglas que pasan si el término t de la entrada k está
+    #     activo, es decir las que lo piden más las que no miran k (_comodines[k])
+    #   - _tablas[k]: universo uniforme, membresías y términos no nulos en cada celda
+    reglas = motor["reglas"].tolist()
+    motor["_comodines"] = []
+    motor["_mascaras"] = []
+    motor["_tablas"] = []
+    for k, nombre in enumerate(motor["entradas"]):
+        universo = motor["universos"][nombre]
+        mfs = motor["membresias"][nombre]
+        comodin = sum(1 << r for r, regla in enumerate(reglas) if regla[k] < 0)
+        motor["_comodines"].append(comodin)
+        motor["_mascaras"].append([comodin | sum(1 << r for r, regla in enumerate(reglas) if regla[k] == t)
+                                   for t in range(len(mfs))])
+        no_nulos = mfs > 0
+        activos = [np.flatnonzero(celda).tolist() for celda in (no_nulos[:, :-1] | no_nulos[:, 1:]).T]
+        motor["_tablas"].append((float(universo[0]), float(universo[1] - universo[0]), len(universo) - 1,
+                                 mfs.tolist(), activos))
+    motor["_antecedentes"] = [[(k, t) for k, t in enumerate(regla[:-1]) if t >= 0] for regla in reglas]
+    motor["_salidas"] = [regla[-1] for regla in reglas]
+    return motor
+
+def grados_membresia(motor, nombre, valores):
+    # (niveles, N): interpolación sobre el universo discreto, igual que skfuzzy.interp_membership
+    universo = motor["universos"][nombre]
+    valores = np.clip(valores, universo[0], universo[-1])
+    return np.array([np.interp(valores, universo, mf) for mf in motor["membresias"][nombre]])
+
+def activaciones_salida(motor, *valores):
+    # valores: un arreglo por entrada, en el orden de motor["entradas"]. Fuerza de cada regla
+    # (AND = min) y agregación por término de salida (OR = max); solo entran las reglas con
+    # todos sus antecedentes activos en alguna muestra del lote
+    reglas = motor["reglas"]
+    grados = []
+    candidatas = np.ones(len(reglas), dtype=bool)
+    for k, (nombre, x) in enumerate(zip(motor["entradas"], valores)):
+        mu = grados_membresia(motor, nombre, x)
+        # Fila de unos al final: la elige el índice -1 (CUALQUIERA) y no cambia el mínimo
+        mu = np.vstack([mu, np.ones(mu.shape[1])])
+        activos = mu.any(axis=1)
+        candidatas &= activos[reglas[:, k]]
+        grados.append(mu)
+    reglas = reglas[candidatas]
+
+    fuerzas = np.ones((len(reglas), grados[0].shape[1]))
+    for k, mu in enumerate(grados):
+        np.minimum(fuerzas, mu[reglas[:, k]], out=fuerzas)
+
+    n_salida = len(motor["membresias"]["verde"])
+    activaciones = np.zeros((n_salida, fuerzas.shape[1]))
+    np.maximum.at(activaciones, reglas[:, -1], fuerzas)
+    return activaciones
+
+def inferir_lote(motor, *valores, por_defecto=np.nan, bloque=512):
+    # valores: un arreglo (o escalar) por entrada, en el orden de motor["entradas"]
+    if len(valores) != len(motor["entradas"]):
+        raise ValueError(f"Se esperaban {len(motor['entradas'])} entradas ({', '.join(motor['entradas'])})")
+    valores = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype=np.float64)) for x in valores))
+    forma = valores[0].shape
+    valores = [x.ravel() for x in valores]
+
+    mf_salida = motor["membresias"]["verde"]
+    resultado = np.empty(valores[0].size)
+
+    # Por bloques para acotar la memoria de la agregación (bloque × puntos del universo)
+    for inicio in range(0, resultado.size, bloque):
+        fin = inicio + bloque
+        activaciones = activaciones_salida(motor, *(x[inicio:fin] for x in valores))
+
+        # Implicación (min) y agregación (max), solo sobre el soporte de cada término
+        agregada = np.zeros((activaciones.shape[1], mf_salida.shape[1]))
+        for t, (a, b) in enumerate(motor["soportes"]):
+            tramo = agregada[:, a:b]
+            np.maximum(tramo, np.minimum(activaciones[t][:, None], mf_salida[t, a:b]), out=tramo)
+
+        # Defuzzificación por centroide
+        area = agregada @ motor["pesos_area"]
+        momento = agregada @ motor["pesos_momento"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            resultado[inicio:fin] = np.where(area > 0, momento / area, por_defecto)
+
+    return resultado.reshape(forma)
+
+def inferir_disperso(motor, valores, por_defecto=None):
+    # Una decisión (valores en el orden de motor["entradas"]). Cada entrada activa unos pocos
+    # términos contiguos (2 o 3 con membresias_niveles) y sus máscaras dejan solo las reglas
+    # con todos los antecedentes activos: con N entradas se evalúan a lo sumo 3^N reglas de
+    # las 5^N de una tabla completa, y menos si la base usa "no importa"
+    grados = []
+    candidatas = -1
+    for (u0, du, celdas, mfs, activos), mascaras, comodin, x in zip(
+            motor["_tablas"], motor["_mascaras"], motor["_comodines"], valores):
+        # Interpolación lineal sobre el universo discreto, como grados_membresia
+        y = min(max((x - u0) / du, 0.0), celdas)
+        j = min(int(y), celdas - 1)
+        f = y - j
+        mu = {}
+        pasan = comodin
+        for t in activos[j]:
+            mf = mfs[t]
+            grado = mf[j] + (mf[j + 1] - mf[j]) * f
+            if grado > 0:
+                mu[t] = grado
+                pasan |= mascaras[t]
+        candidatas &= pasan
+        if not candidatas:
+            return por_defecto
+        grados.append(mu)
+
+    antecedentes = motor["_antecedentes"]
+    salidas = motor["_salidas"]
+    activaciones = {}
+    while candidatas:
+        bit = candidatas & -candidatas
+        candidatas ^= bit
+        r = bit.bit_length() - 1
+        fuerza = 1.0
+        for k, t in antecedentes[r]:
+            grado = grados[k][t]
+            if grado < fuerza:
+                fuerza = grado
+        if fuerza > activaciones.get(salidas[r], 0.0):
+            activaciones[salidas[r]] = fuerza
+    return defuzzificar(motor, activaciones, por_defecto)
+
+def defuzzificar(motor, activaciones, por_defecto=None):
+    # activaciones: {término de salida: grado}; misma agregación y centroide que inferir_lote
+    mf_salida = motor["membresias"]["verde"]
+    agregada = np.zeros(mf_salida.shape[1])
+    for t, grado in activaciones.items():
+        a, b = motor["soportes"][t]
+        tramo = agregada[a:b]
+        np.maximum(tramo, np.minimum(grado, mf_salida[t, a:b]), out=tramo)
+    area = agregada @ motor["pesos_area"]
+    return float(agregada @ motor["pesos_momento"] / area) if area > 0 else por_defecto
+
+def verificar_paridad(motor, sistema_ctrl, funciones, muestras=200, semilla=0):
+    # Compara el motor vectorizado (y el disperso) contra skfuzzy en entradas aleatorias del universo
+    rng = np.random.default_rng(semilla)
+    entradas = motor["entradas"]
+    valores = [rng.uniform(funciones[nombre]["lmin"], funciones[nombre]["lmax"], muestras) for nombre in entradas]
+
+    rapido = inferir_lote(motor, *valores, por_defecto=30)
+    disperso = np.array([inferir_disperso(motor, fila, por_defecto=30) for fila in zip(*valores)])
+    exacto = np.array([evaluar_entradas(sistema_ctrl, dict(zip(entradas, fila))) for fila in zip(*valores)])
+    errores = np.abs(rapido - exacto)
+
+    return {
+        "muestras": muestras,
+        "max_desviacion": float(errores.max()),
+        "desviacion_media": float(errores.mean()),
+        "max_desviacion_disperso": float(np.abs(disperso - rapido).max()),
+    }
+
+
+# ========= Superficie de decisión precalculada =========
+def evaluar_entradas(sistema_ctrl, valores, por_defecto=30):
+    # valores: {entrada: valor} con todas las entradas de las reglas
+    fuzzy_sim = ctrl.ControlSystemSimulation(sistema_ctrl)
+    try:
+        for nombre, valor in valores.items():
+            fuzzy_sim.input[nombre] = valor
+        fuzzy_sim.compute()
+        return float(fuzzy_sim.output['verde'])
+    except Exception:
+        return float(por_defecto)
+
+def evaluar_sistema_fuzzy(sistema_ctrl, num_vehiculos, tasa_llegada, por_defecto=30):
+    return evaluar_entradas(sistema_ctrl, {"vehiculos": num_vehiculos, "llegada": tasa_llegada}, por_defecto)
+
+def compilar_superficie(sistema_ctrl, funciones, resolucion_vehiculos=31, resolucion_llegada=51, motor=None):
+    # Muestrea una vez el espacio vehiculos × llegada: con el motor vectorizado si se
+    # proporciona, o con el sistema exacto de skfuzzy punto a punto
+    eje_vehiculos = np.linspace(funciones["vehiculos"]["lmin"], funciones["vehiculos"]["lmax"], resolucion_vehiculos)
+    eje_llegada = np.linspace(funciones["llegada"]["lmin"], funciones["llegada"]["lmax"], resolucion_llegada)
+
+    if motor is not None:
+        malla_v, malla_l = np.meshgrid(eje_vehiculos, eje_llegada, indexing="ij")
+        valores = inferir_lote(motor, malla_v, malla_l, por_defecto=30)
+    else:
+        valores = np.empty((resolucion_vehiculos, resolucion_llegada))
+        for i, v in enumerate(eje_vehiculos):
+            for j, l in enumerate(eje_llegada):
+                valores[i, j] = evaluar_sistema_fuzzy(sistema_ctrl, v, l)
+
+    return superficie_desde_malla(eje_vehiculos, eje_llegada, valores)
+
+def superficie_desde_malla(eje_vehiculos, eje_llegada, valores):
+    return {
+        "vehiculos": eje_vehiculos,
+        "llegada": eje_llegada,
+        "verde": valores,
+        # Copias en listas de Python: el acceso escalar es mucho más rápido que sobre arrays
+        "_v0": float(eje_vehiculos[0]),
+        "_dv": float(eje_vehiculos[1] - eje_vehiculos[0]),
+        "_l0": float(eje_llegada[0]),
+        "_dl": float(eje_llegada[1] - eje_llegada[0]),
+        "_tabla": valores.tolist(),
+    }
+
+def interpolar_superficie(superficie, num_vehiculos, tasa_llegada):
+    # Interpolación bilineal sobre la malla uniforme (entradas recortadas al universo, como skfuzzy)
+    tabla = superficie["_tabla"]
+    nv = len(tabla) - 1
+    nl = len(tabla[0]) - 1
+
+    x = (num_vehiculos - superficie["_v0"]) / superficie["_dv"]
+    y = (tasa_llegada - superficie["_l0"]) / superficie["_dl"]
+    x = min(max(x, 0.0), nv)
+    y = min(max(y, 0.0), nl)
+
+    i = min(int(x), nv - 1)
+    j = min(int(y), nl - 1)
+    fx = x - i
+    fy = y - j
+
+    fila0 = tabla[i]
+    fila1 = tabla[i + 1]
+    arriba = fila0[j] + (fila0[j + 1] - fila0[j]) * fy
+    abajo = fila1[j] + (fila1[j + 1] - fila1[j]) * fy
+    return arriba + (abajo - arriba) * fx
+
+def interpolar_superficie_lote(superficie, num_vehiculos, tasa_llegada):
+    # interpolar_superficie sobre arreglos: mismas operaciones en el mismo orden, así cada
+    # elemento da exactamente lo mismo que la versión escalar
+    tabla = superficie["verde"]
+    nv = tabla.shape[0] - 1
+    nl = tabla.shape[1] - 1
+
+    x = (np.asarray(num_vehiculos, dtype=np.float64) - superficie["_v0"]) / superficie["_dv"]
+    y = (np.asarray(tasa_llegada, dtype=np.float64) - superficie["_l0"]) / superficie["_dl"]
+    x = np.minimum(np.maximum(x, 0.0), nv)
+    y = np.minimum(np.maximum(y, 0.0), nl)
+
+    i = np.minimum(x.astype(np.intp), nv - 1)
+    j = np.minimum(y.astype(np.intp), nl - 1)
+    fx = x - i
+    fy = y - j
+
+    arriba = tabla[i, j] + (tabla[i, j + 1] - tabla[i, j]) * fy
+    abajo = tabla[i + 1, j] + (tabla[i + 1, j + 1] - tabla[i + 1, j]) * fy
+    return arriba + (abajo - arriba) * fx
+
+def desviacion_superficie(superficie, sistema_ctrl, subdivisiones=8, motor=None, muestras=200000,
+                          confirmar=50, semilla=0):
+    # Estimación por muestreo, no una cota: la salida Mamdani tiene quiebres dentro de las
+    # celdas (cruces de min/max entre reglas), así que el error bilineal no tiene un punto
+    # fijo donde sea máximo. Se muestrea una subdivisión regular de cada celda y puntos al
+    # azar. Con motor, la referencia es el motor vectorizado (equivalente a skfuzzy, ver
+    # verificar_paridad) y los peores puntos se recalculan con skfuzzy; sin motor, todo
+    # con skfuzzy (lento: conviene bajar subdivisiones y muestras)
+    ev = superficie["vehiculos"]
+    el = superficie["llegada"]
+    fracciones = np.arange(subdivisiones) / subdivisiones
+    puntos_v = np.append((ev[:-1, None] + np.diff(ev)[:, None] * fracciones).ravel(), ev[-1])
+    puntos_l = np.append((el[:-1, None] + np.diff(el)[:, None] * fracciones).ravel(), el[-1])
+    malla_v, malla_l = np.meshgrid(puntos_v, puntos_l, indexing="ij")
+
+    rng = np.random.default_rng(semilla)
+    v = np.concatenate([malla_v.ravel(), rng.uniform(ev[0], ev[-1], muestras)])
+    l = np.concatenate([malla_l.ravel(), rng.uniform(el[0], el[-1], muestras)])
+    aproximado = interpolar_superficie_lote(superficie, v, l)
+
+    if motor is not None:
+        exacto = inferir_lote(motor, v, l, por_defecto=30)
+        # skfuzzy en los peores puntos, continuos y enteros (cerca de un entero el motor
+        # puede truncar distinto que skfuzzy)
+        errores = np.abs(aproximado - exacto)
+        enteros = np.abs(np.trunc(aproximado) - np.trunc(exacto))
+        peores = np.unique(np.concatenate([np.argsort(errores)[-confirmar:],
+                                           np.flatnonzero(enteros == enteros.max())[:confirmar]]))
+        exacto[peores] = [evaluar_sistema_fuzzy(sistema_ctrl, v[k], l[k]) for k in peores]
+    else:
+        exacto = np.array([evaluar_sistema_fuzzy(sistema_ctrl, a, b) for a, b in zip(v.tolist(), l.tolist())])
+
+    errores = np.abs(aproximado - exacto)
+    peor = int(np.argmax(errores))
+    return {
+        "max_desviacion": float(errores[peor]),
+        "max_desviacion_entera": int(np.abs(np.trunc(aproximado) - np.trunc(exacto)).max()),
+        "peor_punto": (float(v[peor]), float(l[peor])),
+        "puntos": int(v.size),
+    }
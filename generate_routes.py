@@ -1,3 +1,10 @@
+import argparse
+import csv
+import gzip
+import hashlib
+import json
+import os
+
 # Lista de rutas (origen, destino)
 routes = [
     ("40668087#1", "542428845#0", 1),
@@ -104,37 +111,145 @@ hourly_intervals = [
 ]
 
 
+# Ventanas de hora pico (inicio, fin) dentro de hourly_intervals: 06–07, 12–13 y 18–19
+horas_pico = [
+    (21600, 25200),
+    (43200, 46800),
+    (64800, 68400),
+]
+
 routes = routes
 
-# Generar todas las entradas y ordenarlas por tiempo
-all_flows = []
-flow_id = 1
-for begin, end, vph in hourly_intervals:
-    for route_from, route_to, density in routes:
-        all_flows.append({
-            "id": f"f{flow_id}",
-            "from": route_from,
-            "to": route_to,
-            "begin": begin,
-            "end": end,
-            "vph": int((vph // len(routes))*density)
-        })
-        flow_id += 1
-
-# Ordenar flujos por tiempo de inicio
-all_flows.sort(key=lambda x: x["begin"])
-
-# Escribir archivo XML
-output_lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<routes>']
-output_lines.append('    <vType id="car" accel="1.2" decel="3.0" sigma="0.5" length="4.2" maxSpeed="13.9" />')
-
-for flow in all_flows:
-    output_lines.append(
-        f'    <flow id="{flow["id"]}" from="{flow["from"]}" to="{flow["to"]}" type="car" begin="{flow["begin"]}" end="{flow["end"]}" vehsPerHour="{flow["vph"]}"/>'
-    )
-
-output_lines.append('</routes>')
-
-# Guardar archivo
-with open("./sumo_files/generated_routes_hourly.rou.xml", "w") as f:
-    f.write("\n".join(output_lines))
+# ========= Generador =========
+# Tipo de vehículo por defecto (el único que usaban las rutas generadas)
+vtypes = [
+    {"id": "car", "accel": "1.2", "decel": "3.0", "sigma": "0.5", "length": "4.2", "maxSpeed": "13.9"},
+]
+VERSION_GENERADOR = 1
+RUTA_SALIDA = "./sumo_files/generated_routes_hourly.rou.xml"
+
+def leer_tabla_od(ruta):
+    # CSV con columnas origen,destino[,peso]
+    with open(ruta, newline="") as f:
+        return [(fila["origen"], fila["destino"], float(fila.get("peso") or 1)) for fila in csv.DictReader(f)]
+
+def leer_perfil(ruta):
+    # CSV con columnas inicio,fin,vehiculos (veh/h repartidos entre todas las rutas)
+    with open(ruta, newline="") as f:
+        return [(int(fila["inicio"]), int(fila["fin"]), int(fila["vehiculos"])) for fila in csv.DictReader(f)]
+
+def repetir_perfil(perfil, dias, escalas_dia=None):
+    # Perfil diario -> varios días seguidos (p. ej. una semana), con escala opcional por día
+    repetido = []
+    for dia in range(dias):
+        escala = escalas_dia[dia] if escalas_dia else 1
+        for inicio, fin, vph in perfil:
+            repetido.append((inicio + dia * 86400, fin + dia * 86400, int(vph * escala)))
+    return repetido
+
+def generar_flujos(hourly_intervals, routes, escala=1, tipo="car"):
+    # Flujos en orden de inicio, sin armar la lista completa. Los id se numeran en el orden
+    # del perfil (como antes de ordenar) para que el archivo no cambie con la misma entrada
+    n_rutas = len(routes)
+    orden = sorted(range(len(hourly_intervals)), key=lambda k: hourly_intervals[k][0])
+    for k in orden:
+        begin, end, vph = hourly_intervals[k]
+        por_ruta = (vph * escala) // n_rutas
+        for j, (route_from, route_to, density) in enumerate(routes):
+            flujo_vph = int(por_ruta * density)
+            if flujo_vph <= 0:
+                continue
+            yield {
+                "id": f"f{k * n_rutas + j + 1}",
+                "from": route_from,
+                "to": route_to,
+                "type": tipo,
+                "begin": begin,
+                "end": end,
+                "vph": flujo_vph
+            }
+
+def huella_demanda(routes, hourly_intervals, tipos=vtypes, mezcla=None, escala=1):
+    contenido = json.dumps({
+        "version": VERSION_GENERADOR,
+        "rutas": routes,
+        "perfil": hourly_intervals,
+        "tipos": tipos,
+        "mezcla": mezcla,
+        "escala": escala
+    }, sort_keys=True)
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()
+
+def _abrir(ruta, modo):
+    if ruta.endswith(".gz"):
+        # Nivel bajo: el tamaño casi no cambia y la escritura es varias veces más rápida
+        return gzip.open(ruta, modo, compresslevel=3, encoding="utf-8")
+    return open(ruta, modo, encoding="utf-8")
+
+def huella_archivo(ruta):
+    # Lee solo la cabecera: la huella va en un comentario en la segunda línea
+    if not os.path.exists(ruta):
+        return None
+    try:
+        with _abrir(ruta, "rt") as f:
+            for _, linea in zip(range(3), f):
+                if linea.startswith("<!-- huella: "):
+                    return linea.split()[2]
+    except (OSError, EOFError):
+        return None
+    return None
+
+def generar_demanda(ruta=RUTA_SALIDA, routes=routes, hourly_intervals=hourly_intervals,
+                    tipos=vtypes, mezcla=None, escala=1, forzar=False):
+    # tipos: vType a declarar; mezcla: {id_tipo: proporción} -> vTypeDistribution "mezcla".
+    # Devuelve False si el archivo ya corresponde a estas entradas y no se reescribe.
+    huella = huella_demanda(routes, hourly_intervals, tipos, mezcla, escala)
+    if not forzar and huella_archivo(ruta) == huella:
+        return False
+
+    temporal = ruta.replace(".rou.xml", f".{os.getpid()}.tmp.rou.xml")
+    if temporal == ruta:
+        temporal = ruta + f".{os.getpid()}.tmp"
+    with _abrir(temporal, "wt") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write(f'<!-- huella: {huella} -->\n')
+        f.write('<routes>\n')
+        for tipo in tipos:
+            atributos = " ".join(f'{k}="{v}"' for k, v in tipo.items())
+            f.write(f'    <vType {atributos} />\n')
+
+        tipo_flujos = tipos[0]["id"]
+        if mezcla:
+            desconocidos = set(mezcla) - {t["id"] for t in tipos}
+            if desconocidos:
+                raise ValueError(f"Tipos de la mezcla sin vType: {sorted(desconocidos)}")
+            f.write(f'    <vTypeDistribution id="mezcla" vTypes="{" ".join(mezcla)}" '
+                    f'probabilities="{" ".join(str(p) for p in mezcla.values())}"/>\n')
+            tipo_flujos = "mezcla"
+
+        linea = '    <flow id="{id}" from="{from}" to="{to}" type="{type}" begin="{begin}" end="{end}" vehsPerHour="{vph}"/>\n'
+        f.writelines(linea.format_map(flujo) for flujo in generar_flujos(hourly_intervals, routes, escala, tipo_flujos))
+        f.write('</routes>')
+    os.replace(temporal, ruta)
+    return True
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera los flujos de demanda para SUMO")
+    parser.add_argument("-o", "--salida", default=RUTA_SALIDA, help="archivo .rou.xml (o .rou.xml.gz)")
+    parser.add_argument("--od", default=None, help="CSV origen,destino,peso en lugar de routes")
+    parser.add_argument("--perfil", default=None, help="CSV inicio,fin,vehiculos en lugar de hourly_intervals")
+    parser.add_argument("--dias", type=int, default=1, help="repetir el perfil diario N días")
+    parser.add_argument("--escala", type=float, default=1, help="factor sobre los vehículos por hora")
+    parser.add_argument("--forzar", action="store_true", help="regenerar aunque la huella coincida")
+    args = parser.parse_args()
+
+    rutas = leer_tabla_od(args.od) if args.od else routes
+    perfil = leer_perfil(args.perfil) if args.perfil else hourly_intervals
+    if args.dias > 1:
+        perfil = repetir_perfil(perfil, args.dias)
+    escala = int(args.escala) if args.escala == int(args.escala) else args.escala
+
+    if generar_demanda(args.salida, rutas, perfil, escala=escala, forzar=args.forzar):
+        print(f"✅ Demanda generada: {args.salida}")
+    else:
+        print(f"⏭️ {args.salida} ya está al día (misma huella), no se regenera")
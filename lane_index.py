@@ -0,0 +1,31 @@
+# Índice de lanes compartido por todos los semáforos: cada lane aparece una sola vez
+# aunque varios controladores/fases lo usen (o una fase lo liste repetido).
+
+def construir_indice_lanes(fases_lanes_dict):
+    lanes = []        # lanes únicos, en orden de aparición
+    posicion = {}     # lane_id -> índice en lanes
+    usos = {}         # lane_id -> [(semaforo_id, fase), ...]
+    fases = {}        # semaforo_id -> {fase: [lanes únicos de la fase]}
+
+    for semaforo_id, fases_semaforo in fases_lanes_dict.items():
+        fases[semaforo_id] = {}
+        for fase, lanes_fase in fases_semaforo.items():
+            unicos = list(dict.fromkeys(lanes_fase))
+            fases[semaforo_id][fase] = unicos
+            for lane_id in unicos:
+                if lane_id not in posicion:
+                    posicion[lane_id] = len(lanes)
+                    lanes.append(lane_id)
+                    usos[lane_id] = []
+                usos[lane_id].append((semaforo_id, fase))
+
+    return {
+        "lanes": lanes,
+        "posicion": posicion,
+        "usos": usos,
+        "fases": fases
+    }
+
+def lanes_compartidos(indice):
+    # Lanes usados por más de un (semáforo, fase)
+    return {lane_id: usos for lane_id, usos in indice["usos"].items() if len(usos) > 1}
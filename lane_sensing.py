@@ -0,0 +1,60 @@
+from sumo_backend import traci
+
+# Sensado de carriles por suscripciones: los IDs de vehículos de cada lane y sus
+# velocidades llegan en la respuesta de simulationStep, sin una consulta por vehículo.
+#
+# Suscribir todos los lanes de forma permanente obliga a transferir y decodificar sus
+# datos en cada paso, aunque solo se lean en las decisiones (cada 15-50 s por semáforo).
+# Por eso cada suscripción se limita al instante de la decisión que la necesita
+# (begin = end = tiempo de decisión) y SUMO la descarta sola al pasar ese instante.
+#
+# Una suscripción cuesta dos llamadas (lane + contexto) frente a 1 + n de la consulta
+# directa, así que solo compensa en lanes con cola: se usa la última muestra del lane
+# como predicción y se suscriben los que tenían al menos MIN_VEHICULOS_SUSCRIPCION.
+MIN_VEHICULOS_SUSCRIPCION = 2
+
+suscripciones = {}  # lane_id -> tiempo de simulación para el que está suscrito
+
+def preparar_sensado(lane_ids, tiempo_decision, registro_all_lanes=None):
+    tc = traci.constants  # del backend activo (traci, libsumo o el simulador)
+    for lane_id in lane_ids:
+        if registro_all_lanes is not None:
+            if lane_id in registro_all_lanes and registro_all_lanes.vehiculos(lane_id) < MIN_VEHICULOS_SUSCRIPCION:
+                continue
+        if suscripciones.get(lane_id) == tiempo_decision:
+            continue  # ya pedido por otro semáforo que decide en el mismo paso
+        traci.lane.subscribe(lane_id, [tc.LAST_STEP_VEHICLE_ID_LIST], tiempo_decision, tiempo_decision)
+        # Suscripción de contexto: velocidad de los vehículos sobre el propio lane (rango 0 m)
+        traci.lane.subscribeContext(lane_id, tc.CMD_GET_VEHICLE_VARIABLE, 0.0, [tc.VAR_SPEED],
+                                    tiempo_decision, tiempo_decision)
+        suscripciones[lane_id] = tiempo_decision
+
+def leer_lane(lane_id):
+    # Devuelve (ids, velocidades) del último paso de simulación
+    resultados = traci.lane.getSubscriptionResults(lane_id) if lane_id in suscripciones else None
+    if not resultados:
+        # Sin suscripción vigente en este paso: consulta directa
+        ids = traci.lane.getLastStepVehicleIDs(lane_id)
+        return ids, [traci.vehicle.getSpeed(veh_id) for veh_id in ids]
+
+    tc = traci.constants
+    ids = resultados[tc.LAST_STEP_VEHICLE_ID_LIST]
+    # El contexto de rango 0 puede omitir vehículos en el borde del lane: se consultan aparte
+    contexto = traci.lane.getContextSubscriptionResults(lane_id) or {}
+    velocidades = []
+    for veh_id in ids:
+        datos = contexto.get(veh_id)
+        velocidades.append(datos[tc.VAR_SPEED] if datos is not None else traci.vehicle.getSpeed(veh_id))
+    return ids, velocidades
+
+def restaurar_suscripciones(guardadas, tiempo_actual):
+    # Al reanudar desde un checkpoint: SUMO no guarda las suscripciones en su estado, así
+    # que se vuelven a pedir las de decisiones todavía pendientes
+    tc = traci.constants
+    suscripciones.clear()
+    suscripciones.update(guardadas)
+    for lane_id, tiempo_decision in guardadas.items():
+        if tiempo_decision > tiempo_actual:
+            traci.lane.subscribe(lane_id, [tc.LAST_STEP_VEHICLE_ID_LIST], tiempo_decision, tiempo_decision)
+            traci.lane.subscribeContext(lane_id, tc.CMD_GET_VEHICLE_VARIABLE, 0.0, [tc.VAR_SPEED],
+                                        tiempo_decision, tiempo_decision)
@@ -1,75 +1,78 @@
+import csv
+import os
+import time
+from estadisticas_stream import clave_fase, imprimir_resumen
 
-def imprimir_limites_por_semaforo_y_fase(fases_lanes_dict, limites_globales_lanes):
-    print("=== LÍMITES POR SEMÁFORO Y FASE (sumando cantidades, promediando velocidad y tasa) ===")
 
-    for semaforo_id, fases in fases_lanes_dict.items():
-        print(f"\n📍 Semáforo: {semaforo_id}")
-        
-        for fase_id in [0, 2]:  # Solo fase 0 y fase 2
-            lanes = fases.get(fase_id, [])
-            if not lanes:
-                print(f"  Fase {fase_id}: Sin carriles definidos.")
-                continue
+# ========= Registro CSV con buffer =========
+class RegistroCSV:
+    # Archivo abierto una sola vez por corrida; las filas se acumulan en memoria y se
+    # escriben por lotes (al llegar a tamano_lote filas o pasados intervalo_s segundos).
+    # Con reanudar (una marca de un checkpoint) se corta el archivo en esa marca y se sigue
+    # agregando al final, sin repetir el encabezado
+    def __init__(self, ruta, encabezados, tamano_lote=1000, intervalo_s=5.0, reanudar=None):
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self.ruta = ruta
+        self.tamano_lote = tamano_lote
+        self.intervalo_s = intervalo_s
+        self.filas = []
+        self.ultimo_vaciado = time.monotonic()
+        if reanudar is None:
+            self.archivo = open(ruta, mode='w', newline='')
+            self.writer = csv.writer(self.archivo)
+            self.writer.writerow(encabezados)
+        else:
+            self.archivo = open(ruta, mode='r+', newline='')
+            self.archivo.truncate(reanudar["bytes"])
+            self.archivo.seek(reanudar["bytes"])
+            self.writer = csv.writer(self.archivo)
+
+    def escribir(self, fila):
+        self.filas.append(fila)
+        if len(self.filas) >= self.tamano_lote or time.monotonic() - self.ultimo_vaciado >= self.intervalo_s:
+            self.vaciar()
+
+    def vaciar(self):
+        if self.filas:
+            self.writer.writerows(self.filas)
+            self.filas.clear()
+        self.archivo.flush()
+        self.ultimo_vaciado = time.monotonic()
 
-            suma = {
-                "vehiculos": 0,
-                "movimiento": 0,
-                "detenidos": 0,
-                "velocidad_prom_sum": 0.0,
-                "tasa_llegada_sum": 0.0,
-                "n": 0  # Número de carriles con datos válidos
-            }
+    def marca(self):
+        # Todo lo escrito hasta ahora queda en disco; la marca dice hasta dónde
+        self.vaciar()
+        return {"bytes": self.archivo.tell()}
 
-            for lane_id in lanes:
-                if lane_id in limites_globales_lanes:
-                    lim = limites_globales_lanes[lane_id]
-                    suma["vehiculos"] += lim["vehiculos_max"]
-                    suma["movimiento"] += lim["movimiento_max"]
-                    suma["detenidos"] += lim["detenidos_max"]
-                    suma["velocidad_prom_sum"] += lim["velocidad_prom_max"]
-                    suma["tasa_llegada_sum"] += lim["tasa_llegada_max"]
-                    suma["n"] += 1
+    def cerrar(self):
+        if not self.archivo.closed:
+            self.vaciar()
+            self.archivo.close()
 
-            if suma["n"] > 0:
-                vel_prom = suma["velocidad_prom_sum"] / suma["n"]
-                tasa_prom = suma["tasa_llegada_sum"] / suma["n"]
-            else:
-                vel_prom = 0.0
-                tasa_prom = 0.0
+    def __enter__(self):
+        return self
 
-            print(f"  Fase {fase_id}:")
-            print(f"    Vehículos    : {suma['vehiculos']}")
-            print(f"    Movimiento   : {suma['movimiento']}")
-            print(f"    Detenidos    : {suma['detenidos']}")
-            print(f"    Vel. Promedio: {vel_prom:.2f} m/s")
-            print(f"    Tasa Llegada : {tasa_prom:.3f} veh/s")
+    def __exit__(self, *exc):
+        self.cerrar()
 
 
-def imprimir_limites_globales(limites_globales_lanes):
-    globales = {
-        "vehiculos_min": float('inf'),
-        "vehiculos_max": float('-inf'),
-        "movimiento_min": float('inf'),
-        "movimiento_max": float('-inf'),
-        "detenidos_min": float('inf'),
-        "detenidos_max": float('-inf'),
-        "velocidad_prom_min": float('inf'),
-        "velocidad_prom_max": float('-inf'),
-        "tasa_llegada_min": float('inf'),
-        "tasa_llegada_max": float('-inf')
-    }
 
-    for lim in limites_globales_lanes.values():
-        for k in globales:
-            if "min" in k:
-                globales[k] = min(globales[k], lim[k])
-            else:
-                globales[k] = max(globales[k], lim[k])
+def imprimir_estadisticas_por_semaforo_y_fase(fases_lanes_dict, estadisticas):
+    print("=== ESTADÍSTICAS POR SEMÁFORO Y FASE (por decisión: sumando cantidades, promediando velocidad) ===")
+    fases_stream = estadisticas["fases"]
+
+    for semaforo_id, fases in fases_lanes_dict.items():
+        print(f"\n📍 Semáforo: {semaforo_id}")
+
+        for fase_id in [0, 2]:  # Solo fase 0 y fase 2
+            if not fases.get(fase_id):
+                print(f"  Fase {fase_id}: Sin carriles definidos.")
+                continue
+            imprimir_resumen(f"  Fase {fase_id}:", fases_stream.resumen(fases_stream.posicion[clave_fase(semaforo_id, fase_id)]))
 
-    print("=== LÍMITES GENERALES ===")
-    print(f"  Vehículos    : {globales['vehiculos_min']} → {globales['vehiculos_max']}")
-    print(f"  Movimiento   : {globales['movimiento_min']} → {globales['movimiento_max']}")
-    print(f"  Detenidos    : {globales['detenidos_min']} → {globales['detenidos_max']}")
-    print(f"  Vel. Promedio: {globales['velocidad_prom_min']:.2f} → {globales['velocidad_prom_max']:.2f}")
-    print(f"  Tasa Llegada : {globales['tasa_llegada_min']:.3f} → {globales['tasa_llegada_max']:.3f}")
 
+def imprimir_estadisticas_globales(estadisticas):
+    # Todos los lanes combinados en un solo sketch
+    imprimir_resumen("=== ESTADÍSTICAS GENERALES (todos los lanes) ===", estadisticas["lanes"].total().resumen(0))
@@ -0,0 +1,183 @@
+import collections
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Métricas en vivo de una corrida larga (Fuzzy_logic.py --metricas-puerto), en formato de
+# texto de Prometheus y servidas por un hilo aparte:  curl http://127.0.0.1:PUERTO/metrics
+#
+# El hilo HTTP nunca llama a TraCI (no es seguro entre hilos): lo que necesita a SUMO
+# (tiempo, vehículos en red) lo toma el bucle de control tras simulationStep, a lo sumo una
+# vez por intervalo_s. Fases, verdes y colas se leen de estado / registro_all_lanes al
+# responder; el bucle solo agrega una lectura del reloj por paso y otra por decisión.
+CUANTILES = (0.5, 0.9, 0.99)
+
+def _etiqueta(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class Metricas:
+    def __init__(self, modulo, estado, registro_all_lanes, intervalo_s=1.0, ventana_decisiones=1000):
+        self.modulo = modulo
+        self.estado = estado
+        self.registro = registro_all_lanes
+        self.intervalo_s = intervalo_s
+        self.originales = []
+        self.servidor = None
+
+        # Escrito por el bucle de control
+        self.tiempo_simulacion = 0.0
+        self.vehiculos = 0
+        self.pasos = 0
+        self.pasos_por_segundo = 0.0
+        self.decisiones = 0
+        self.suma_latencia = 0.0
+        self.latencias = collections.deque(maxlen=ventana_decisiones)  # últimas decisiones (s)
+        self._muestra = (time.monotonic(), 0.0)
+        self._proxima = 0.0
+
+    # ========= Lado del bucle de control =========
+    def _reemplazar(self, objeto, nombre, nueva):
+        self.originales.append((objeto, nombre, getattr(objeto, nombre)))
+        setattr(objeto, nombre, nueva)
+
+    def _refrescar(self, ahora):
+        traci = self.modulo.traci
+        tiempo = traci.simulation.getTime()
+        pared_anterior, tiempo_anterior = self._muestra
+        if ahora > pared_anterior:
+            # Segundos simulados por segundo de pared (en modo por eventos un paso salta varios)
+            self.pasos_por_segundo = (tiempo - tiempo_anterior) / (ahora - pared_anterior)
+        self._muestra = (ahora, tiempo)
+        self.tiempo_simulacion = tiempo
+        self.vehiculos = traci.vehicle.getIDCount()
+        self._proxima = ahora + self.intervalo_s
+
+    def activar(self):
+        traci = self.modulo.traci
+        paso_original = traci.simulationStep
+        reloj = time.monotonic
+
+        def simulationStep(*args, **kwargs):
+            resultado = paso_original(*args, **kwargs)
+            self.pasos += 1
+            ahora = reloj()
+            if ahora >= self._proxima:
+                self._refrescar(ahora)
+            return resultado
+        self._reemplazar(traci, "simulationStep", simulationStep)
+
+        cambiar_fase = self.modulo.cambiar_fase
+        decidir_lote = self.modulo.decidir_lote
+        contador = time.perf_counter
+        latencias = self.latencias
+
+        def decision(semaforo_id, datos, *args, **kwargs):
+            if datos["modo"] != "amarillo":
+                return cambiar_fase(semaforo_id, datos, *args, **kwargs)
+            inicio = contador()
+            resultado = cambiar_fase(semaforo_id, datos, *args, **kwargs)
+            latencia = contador() - inicio
+            latencias.append(latencia)
+            self.suma_latencia += latencia
+            self.decisiones += 1
+            return resultado
+
+        def lote(decisiones, *args, **kwargs):
+            # Cada decisión del lote cuenta con su parte del tiempo total
+            inicio = contador()
+            resultado = decidir_lote(decisiones, *args, **kwargs)
+            total = contador() - inicio
+            latencias.extend([total / len(decisiones)] * len(decisiones))
+            self.suma_latencia += total
+            self.decisiones += len(decisiones)
+            return resultado
+        self._reemplazar(self.modulo, "cambiar_fase", decision)
+        self._reemplazar(self.modulo, "decidir_lote", lote)
+
+        self._refrescar(reloj())
+        return self
+
+    def desactivar(self):
+        for objeto, nombre, original in reversed(self.originales):
+            setattr(objeto, nombre, original)
+        self.originales.clear()
+
+    # ========= Lado del servidor =========
+    def texto(self):
+        lineas = []
+
+        def metrica(nombre, tipo, ayuda, valores):
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for etiquetas, valor in valores:
+                if etiquetas:
+                    texto = ",".join(f'{k}="{_etiqueta(v)}"' for k, v in etiquetas.items())
+                    lineas.append(f"{nombre}{{{texto}}} {valor}")
+                else:
+                    lineas.append(f"{nombre} {valor}")
+
+        metrica("fuzzy_tiempo_simulacion_segundos", "gauge", "Tiempo de simulación de SUMO",
+                [({}, self.tiempo_simulacion)])
+        metrica("fuzzy_pasos_total", "counter", "Llamadas a simulationStep", [({}, self.pasos)])
+        metrica("fuzzy_segundos_simulados_por_segundo", "gauge",
+                "Segundos simulados por segundo de pared en el último intervalo", [({}, self.pasos_por_segundo)])
+        metrica("fuzzy_vehiculos_en_red", "gauge", "Vehículos en la red", [({}, self.vehiculos)])
+
+        # Cuantiles sobre las últimas decisiones; suma y cantidad desde el inicio
+        latencias = sorted(list(self.latencias))
+        cuantiles = [({"quantile": q}, latencias[min(len(latencias) - 1, int(q * len(latencias)))])
+                     for q in CUANTILES] if latencias else []
+        metrica("fuzzy_latencia_decision_segundos", "summary",
+                "Duración de cambiar_fase al decidir un verde (con --lote, su parte de decidir_lote)", cuantiles)
+        lineas.append(f"fuzzy_latencia_decision_segundos_sum {self.suma_latencia}")
+        lineas.append(f"fuzzy_latencia_decision_segundos_count {self.decisiones}")
+
+        semaforos = list(self.estado.items())
+        metrica("fuzzy_fase_actual", "gauge", "Fase actual de cada semáforo",
+                [({"semaforo": s}, datos["fase"]) for s, datos in semaforos])
+        metrica("fuzzy_verde_asignado_segundos", "gauge", "Último verde asignado por el controlador",
+                [({"semaforo": s}, datos["tiempo_verde_asignado"]) for s, datos in semaforos])
+
+        # Copia de las columnas: el bucle puede estar escribiendo la próxima muestra
+        vehiculos = self.registro.datos["vehiculos"].tolist()
+        detenidos = self.registro.datos["detenidos"].tolist()
+        metrica("fuzzy_vehiculos_lane", "gauge", "Vehículos en el lane en su última muestra",
+                [({"lane": l}, v) for l, v in zip(self.registro.lanes, vehiculos)])
+        metrica("fuzzy_detenidos_lane", "gauge", "Vehículos detenidos en el lane en su última muestra",
+                [({"lane": l}, d) for l, d in zip(self.registro.lanes, detenidos)])
+        return "\n".join(lineas) + "\n"
+
+    def servir(self, puerto, host="127.0.0.1"):
+        metricas = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                cuerpo = metricas.texto().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass  # sin una línea por consulta en la salida de la corrida
+
+        self.servidor = ThreadingHTTPServer((host, puerto), Manejador)
+        self.servidor.daemon_threads = True
+        threading.Thread(target=self.servidor.serve_forever, name="metricas", daemon=True).start()
+        return self.servidor.server_address
+
+    def cerrar(self):
+        if self.servidor is not None:
+            self.servidor.shutdown()
+            self.servidor.server_close()
+            self.servidor = None
+        self.desactivar()
+
+def iniciar(modulo, estado, registro_all_lanes, puerto, host="127.0.0.1", intervalo_s=1.0):
+    metricas = Metricas(modulo, estado, registro_all_lanes, intervalo_s).activar()
+    metricas.servir(puerto, host)
+    return metricas
@@ -0,0 +1,271 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+import numpy as np
+from fuzzy_defs import funciones, reglas_definidas, entradas
+from fuzzy_utils import combinar_definiciones
+from sumo_backend import BACKEND_POR_DEFECTO, BACKENDS
+from escenarios import DEMANDA_POR_DEFECTO, PUERTO_BASE, ejecutar_matriz, preparar_estados
+
+# Barrido / optimización de las funciones de membresía (lmin, lmax) y de la tabla de
+# reglas. Cada candidato se escribe como JSON y se pasa a Fuzzy_logic.py con
+# --definiciones, así fuzzy_defs.py no se toca. Los candidatos se evalúan en corridas
+# SUMO paralelas (escenarios.py) por etapas de horizonte creciente: en cada etapa solo
+# sigue la fracción mejor puntuada, así los malos no llegan a la simulación completa.
+
+# ========= Espacio de búsqueda =========
+RANGOS = {
+    "llegada": {"lmin": (0.0, 0.3), "lmax": (0.5, 2.0)},
+    "vehiculos": {"lmin": (0, 5), "lmax": (15, 60)},
+    "verde": {"lmin": (5, 20), "lmax": (35, 90)},
+}
+ENTEROS = {"vehiculos", "verde"}
+
+def candidato_base():
+    return {
+        # Solo las variables con rango de búsqueda; las demás quedan como en fuzzy_defs.py
+        "funciones": {nombre: {"lmin": d["lmin"], "lmax": d["lmax"]} for nombre, d in funciones.items()
+                      if nombre in RANGOS},
+        "reglas_definidas": [list(r) for r in reglas_definidas],
+    }
+
+def _redondear(nombre, valor):
+    return int(round(valor)) if nombre in ENTEROS else round(float(valor), 3)
+
+def _corregir_limites(candidato):
+    # Recorta a RANGOS y garantiza lmin < lmax
+    for nombre, limites in candidato["funciones"].items():
+        for clave in ("lmin", "lmax"):
+            bajo, alto = RANGOS[nombre][clave]
+            limites[clave] = _redondear(nombre, np.clip(limites[clave], bajo, alto))
+        if limites["lmin"] >= limites["lmax"]:
+            limites["lmax"] = limites["lmin"] + (1 if nombre in ENTEROS else 0.05)
+    return candidato
+
+def _desplazar_reglas(reglas, rng, probabilidad):
+    # Cada regla puede subir o bajar un nivel de verde
+    niveles = funciones["verde"]["niveles"]
+    nuevas = []
+    for *antecedentes, salida in reglas:
+        if rng.random() < probabilidad:
+            i = niveles.index(salida) + rng.choice([-1, 1])
+            salida = niveles[min(max(i, 0), len(niveles) - 1)]
+        nuevas.append([*antecedentes, salida])
+    return nuevas
+
+def generar_malla(malla):
+    # malla: {"vehiculos.lmax": [20, 30, 40], ...} -> producto cartesiano sobre el candidato base
+    claves = list(malla)
+    for valores in itertools.product(*(malla[c] for c in claves)):
+        candidato = candidato_base()
+        for clave, valor in zip(claves, valores):
+            nombre, limite = clave.split(".")
+            candidato["funciones"][nombre][limite] = _redondear(nombre, valor)
+        yield candidato
+
+def muestrear_aleatorio(rng, cantidad, prob_regla=0.2):
+    for _ in range(cantidad):
+        candidato = candidato_base()
+        for nombre, limites in candidato["funciones"].items():
+            for clave in ("lmin", "lmax"):
+                limites[clave] = rng.uniform(*RANGOS[nombre][clave])
+        candidato["reglas_definidas"] = _desplazar_reglas(candidato["reglas_definidas"], rng, prob_regla)
+        yield _corregir_limites(candidato)
+
+def mutar(candidato, rng, sigma=0.1, prob_regla=0.1):
+    hijo = json.loads(json.dumps(candidato))
+    for nombre, limites in hijo["funciones"].items():
+        for clave in ("lmin", "lmax"):
+            bajo, alto = RANGOS[nombre][clave]
+            limites[clave] += rng.normal(0, sigma * (alto - bajo))
+    hijo["reglas_definidas"] = _desplazar_reglas(hijo["reglas_definidas"], rng, prob_regla)
+    return _corregir_limites(hijo)
+
+def parsear_malla(especificaciones):
+    # ["vehiculos.lmax=20,30,40", ...]
+    malla = {}
+    for espec in especificaciones:
+        clave, valores = espec.split("=")
+        nombre, limite = clave.split(".")
+        if nombre not in RANGOS or limite not in ("lmin", "lmax"):
+            raise ValueError(f"Parámetro de malla desconocido: {clave}")
+        malla[clave] = [float(v) for v in valores.split(",")]
+    return malla
+
+# ========= Evaluación por etapas =========
+def puntaje(resumenes, peso_espera=1.0, peso_perdida=1.0):
+    if not resumenes or any(r is None or not r.get("vehiculos") for r in resumenes):
+        return float("inf")
+    return float(np.mean([peso_espera * r["espera_media"] + peso_perdida * r["perdida_media"] for r in resumenes]))
+
+class Evaluador:
+    def __init__(self, salida, etapas, conservar=0.5, semillas=(42,), demanda=DEMANDA_POR_DEFECTO,
+                 procesos=None, backend=BACKEND_POR_DEFECTO, exacto=False,
+                 peso_espera=1.0, peso_perdida=1.0, estado_inicial=None, puerto_base=PUERTO_BASE):
+        self.salida = os.path.abspath(salida)
+        self.etapas = list(etapas)
+        self.conservar = conservar
+        self.semillas = list(semillas)
+        self.demanda = os.path.abspath(demanda)
+        self.procesos = procesos
+        self.backend = backend
+        self.exacto = exacto
+        self.pesos = (peso_espera, peso_perdida)
+        self.estado_inicial = estado_inicial
+        self.puerto_base = puerto_base
+        self.resultados = {}
+        os.makedirs(os.path.join(self.salida, "candidatos"), exist_ok=True)
+
+    def _registrar(self, candidato, origen):
+        cid = f"c{len(self.resultados) + 1:04d}"
+        # Validar antes de gastar una corrida (niveles inexistentes, lmin >= lmax, ...)
+        combinar_definiciones(funciones, reglas_definidas, candidato, entradas)
+        ruta = os.path.join(self.salida, "candidatos", cid + ".json")
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(candidato, f, indent=2, ensure_ascii=False)
+        self.resultados[cid] = {"candidato": cid, "origen": origen, "definiciones": ruta,
+                                "definicion": candidato, "etapa": 0, "puntaje": float("inf")}
+        return cid
+
+    def _corridas(self, cids, etapa):
+        fin = self.etapas[etapa]
+        corridas = []
+        for i, (cid, semilla) in enumerate(itertools.product(cids, self.semillas)):
+            nombre = f"{cid}_e{etapa + 1}_s{semilla}"
+            extra = ["--definiciones", self.resultados[cid]["definiciones"], "--formato-logs", "columnar"]
+            if not self.exacto:
+                extra += ["--compilado", "--sin-verificar"]
+            corridas.append({
+                "nombre": nombre, "controlador": "fuzzy", "demanda": self.demanda, "semilla": semilla,
+                "directorio": os.path.join(self.salida, f"etapa{etapa + 1}", nombre),
+                "puerto": self.puerto_base + i, "etiqueta": nombre, "backend": self.backend,
+                "candidato": cid, "extra": extra, "estado_inicial": self.estado_inicial, "fin": fin,
+            })
+        return corridas
+
+    def evaluar(self, candidatos, origen="base"):
+        vivos = [self._registrar(c, origen) for c in candidatos]
+        for etapa, fin in enumerate(self.etapas):
+            if not vivos:
+                break
+            corridas = self._corridas(vivos, etapa)
+            por_candidato = {cid: [] for cid in vivos}
+            for resultado, corrida in zip(ejecutar_matriz(corridas, self.procesos), corridas):
+                ok = resultado["codigo_salida"] == 0 and "error" not in resultado
+                por_candidato[corrida["candidato"]].append(resultado.get("resumen") if ok else None)
+
+            for cid, resumenes in por_candidato.items():
+                r = self.resultados[cid]
+                r["etapa"] = etapa + 1
+                r["fin"] = fin
+                r["puntaje"] = puntaje(resumenes, *self.pesos)
+                validos = [x for x in resumenes if x and x.get("vehiculos")]
+                for clave in ("espera_media", "perdida_media", "vehiculos"):
+                    r[clave] = float(np.mean([x[clave] for x in validos])) if validos else None
+
+            vivos.sort(key=lambda cid: self.resultados[cid]["puntaje"])
+            mejor = self.resultados[vivos[0]]["puntaje"]
+            print(f"🔎 Etapa {etapa + 1}/{len(self.etapas)} (fin={fin or 'completa'}): "
+                  f"{len(vivos)} candidatos, mejor puntaje {mejor:.2f}", flush=True)
+            if etapa < len(self.etapas) - 1:
+                vivos = [cid for cid in vivos[:max(1, int(np.ceil(len(vivos) * self.conservar)))]
+                         if np.isfinite(self.resultados[cid]["puntaje"])]
+        return [self.resultados[cid] for cid in self.resultados]
+
+    def ranking(self):
+        # Primero los que llegaron a la última etapa; dentro de cada etapa, por puntaje
+        return sorted(self.resultados.values(), key=lambda r: (-r["etapa"], r["puntaje"]))
+
+    def mejores(self, cantidad):
+        completos = [r for r in self.ranking() if r["etapa"] == len(self.etapas) and np.isfinite(r["puntaje"])]
+        return completos[:cantidad]
+
+    def guardar_tabla(self):
+        ruta = os.path.join(self.salida, "resultados.csv")
+        niveles_verde = funciones["verde"]["niveles"]
+        with open(ruta, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            encabezado = ["rango", "candidato", "origen", "etapa", "fin", "puntaje",
+                          "espera_media", "perdida_media", "vehiculos"]
+            encabezado += [f"{n}_{c}" for n in RANGOS for c in ("lmin", "lmax")] + ["reglas", "definiciones"]
+            writer.writerow(encabezado)
+            for rango, r in enumerate(self.ranking(), 1):
+                d = r["definicion"]
+                reglas = "".join(str(niveles_verde.index(salida)) for *_, salida in d["reglas_definidas"])
+                writer.writerow([rango, r["candidato"], r["origen"], r["etapa"], r.get("fin") or "",
+                                 r["puntaje"], r.get("espera_media"), r.get("perdida_media"), r.get("vehiculos")]
+                                + [d["funciones"][n][c] for n in RANGOS for c in ("lmin", "lmax")]
+                                + [reglas, r["definiciones"]])
+        return ruta
+
+# ========= Estrategias =========
+def evolucionar(evaluador, rng, generaciones, padres, hijos, sigma=0.1, prob_regla=0.1):
+    # (μ + λ): los mejores de todo lo evaluado son padres de la generación siguiente
+    evaluador.evaluar([candidato_base()], "base")
+    for generacion in range(1, generaciones + 1):
+        seleccion = evaluador.mejores(padres) or evaluador.ranking()[:padres]
+        nuevos = [mutar(seleccion[i % len(seleccion)]["definicion"], rng, sigma, prob_regla)
+                  for i in range(hijos)]
+        evaluador.evaluar(nuevos, f"gen{generacion}")
+        mejor = evaluador.mejores(1)
+        if mejor:
+            print(f"🧬 Generación {generacion}: mejor {mejor[0]['candidato']} ({mejor[0]['puntaje']:.2f})", flush=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Barrido y optimización de funciones/reglas difusas")
+    parser.add_argument("estrategia", choices=["malla", "aleatoria", "evolutiva"])
+    parser.add_argument("--malla", nargs="+", default=["vehiculos.lmax=20,30,40", "verde.lmax=40,50,60"],
+                        help="parámetros de la malla, p. ej. vehiculos.lmax=20,30,40")
+    parser.add_argument("--candidatos", type=int, default=16, help="candidatos de la búsqueda aleatoria")
+    parser.add_argument("--generaciones", type=int, default=5)
+    parser.add_argument("--padres", type=int, default=4)
+    parser.add_argument("--hijos", type=int, default=8)
+    parser.add_argument("--sigma", type=float, default=0.1, help="mutación relativa al ancho de cada rango")
+    parser.add_argument("--prob-regla", type=float, default=0.1, help="probabilidad de mover cada regla un nivel")
+    parser.add_argument("--etapas", nargs="+", default=["21600", "completa"],
+                        help="horizontes (s) de cada etapa; 'completa' = simulación entera")
+    parser.add_argument("--conservar", type=float, default=0.5, help="fracción que pasa a la etapa siguiente")
+    parser.add_argument("--semillas", nargs="+", type=int, default=[42])
+    parser.add_argument("--demanda", default=DEMANDA_POR_DEFECTO)
+    parser.add_argument("--peso-espera", type=float, default=1.0)
+    parser.add_argument("--peso-perdida", type=float, default=1.0)
+    parser.add_argument("--exacto", action="store_true", help="inferencia skfuzzy en vez de la superficie compilada")
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--backend", choices=BACKENDS, default=BACKEND_POR_DEFECTO)
+    parser.add_argument("--puerto-base", type=int, default=PUERTO_BASE,
+                        help="puerto TraCI de la primera corrida de cada etapa (uno distinto por búsqueda en paralelo)")
+    parser.add_argument("--calentar", type=float, default=None,
+                        help="arrancar todos los candidatos desde el estado en este instante (s)")
+    parser.add_argument("--semilla-busqueda", type=int, default=0)
+    parser.add_argument("--salida", default="./optimizacion")
+    args = parser.parse_args()
+    if args.calentar and args.backend == "simulado":
+        parser.error("--calentar necesita SUMO: el backend simulado no guarda estados")
+
+    etapas = [None if e == "completa" else float(e) for e in args.etapas]
+    estado_inicial = None
+    if args.calentar:
+        estado_inicial = preparar_estados([args.demanda], args.calentar, os.path.join(args.salida, "estados"),
+                                          backend=args.backend)[os.path.abspath(args.demanda)]
+    evaluador = Evaluador(args.salida, etapas, args.conservar, args.semillas, args.demanda,
+                          args.procesos, args.backend, args.exacto, args.peso_espera, args.peso_perdida,
+                          estado_inicial, args.puerto_base)
+    rng = np.random.default_rng(args.semilla_busqueda)
+
+    inicio = time.perf_counter()
+    if args.estrategia == "malla":
+        evaluador.evaluar(list(generar_malla(parsear_malla(args.malla))), "malla")
+    elif args.estrategia == "aleatoria":
+        evaluador.evaluar([candidato_base()] + list(muestrear_aleatorio(rng, args.candidatos, args.prob_regla)),
+                          "aleatoria")
+    else:
+        evolucionar(evaluador, rng, args.generaciones, args.padres, args.hijos, args.sigma, args.prob_regla)
+
+    ruta = evaluador.guardar_tabla()
+    print(f"\n🏁 {len(evaluador.resultados)} candidatos en {time.perf_counter() - inicio:.0f}s")
+    for rango, r in enumerate(evaluador.ranking()[:10], 1):
+        print(f"{rango:>3}. {r['candidato']} [{r['origen']}] etapa {r['etapa']} puntaje {r['puntaje']:.2f}")
+    print(f"📄 Tabla: {ruta}")
@@ -0,0 +1,247 @@
+import json
+import os
+import time
+
+# Perfilado opcional del bucle de control (Fuzzy_logic.py --perfil). Al activarlo se
+# envuelven, en el módulo del controlador, las funciones de cada categoría y
+# traci.simulationStep; sin --perfil nada cambia y el bucle no paga ningún costo.
+#
+# Cada llamada medida va a un histograma logarítmico (agregar es O(1) y no asigna memoria)
+# y se acumula por categoría para armar además la distribución por paso de simulación
+# (de un simulationStep al siguiente) y por decisión (cambiar_fase al salir del amarillo;
+# con --lote, decidir_lote reparte su tiempo en partes iguales entre sus decisiones).
+# Leer el reloj es lo más caro de medir: se lee dos veces por llamada y por paso.
+CATEGORIAS = ("simulationStep", "sensado", "inferencia", "registro")
+FUNCIONES_POR_CATEGORIA = {
+    "sensado": ("update_parameters_fuzzy", "preparar_sensado"),
+    "inferencia": ("calcular_verde", "calcular_verde_lote"),
+    "registro": ("contar_vehiculos", "guardar_datos_semaforo", "registrar_colas_lote"),
+}
+PERCENTILES = (50, 90, 99)
+
+reloj = time.perf_counter_ns
+
+def limites_cubeta(indice):
+    # 4 cubetas por potencia de 2 (~19 % de ancho); las 4 primeras son 0, 1, 2 y 3 ns
+    if indice < 4:
+        return indice, indice + 1
+    bits, sub = (indice >> 2) + 1, indice & 3
+    return (4 + sub) << (bits - 3), (5 + sub) << (bits - 3)
+
+class Histograma:
+    def __init__(self):
+        self.cuentas = [0] * 256
+        self.suma = 0
+
+    def agregar(self, ns):
+        # Los 2 bits siguientes al más alto eligen la cubeta dentro de la octava
+        bits = ns.bit_length()
+        self.cuentas[(bits << 2) - 4 + ((ns >> (bits - 3)) & 3) if bits > 2 else ns] += 1
+        self.suma += ns
+
+    @property
+    def n(self):
+        return sum(self.cuentas)
+
+    def percentil(self, p):
+        objetivo = p / 100 * self.n
+        acumulado = 0
+        for indice, cuenta in enumerate(self.cuentas):
+            acumulado += cuenta
+            if cuenta and acumulado >= objetivo:
+                return sum(limites_cubeta(indice)) / 2
+        return 0.0
+
+    def resumen(self):
+        n = self.n
+        ultima = max((i for i, c in enumerate(self.cuentas) if c), default=0)
+        return {
+            "n": n,
+            "total_s": self.suma / 1e9,
+            "media_us": self.suma / n / 1e3 if n else 0.0,
+            **{f"p{p}_us": self.percentil(p) / 1e3 for p in PERCENTILES},
+            "max_us": limites_cubeta(ultima)[1] / 1e3 if n else 0.0,  # cota superior de la cubeta
+        }
+
+    def a_dict(self):
+        # Solo las cubetas usadas: [inicio_ns, fin_ns, cuenta]
+        return dict(self.resumen(), cubetas=[[*limites_cubeta(i), c] for i, c in enumerate(self.cuentas) if c])
+
+class Perfil:
+    def __init__(self, modulo):
+        self.modulo = modulo
+        self.por_llamada = {c: Histograma() for c in CATEGORIAS}
+        self.por_paso = {c: Histograma() for c in CATEGORIAS + ("otros", "total")}
+        self.por_decision = {c: Histograma() for c in ("sensado", "inferencia", "registro", "otros", "total")}
+        self.acumulado = dict.fromkeys(CATEGORIAS, 0)  # ns por categoría desde el inicio del paso
+        self.inicio_paso = None
+        self.pasos = 0
+        self.agregados = 0  # agregados a histogramas fuera de las mediciones (para el sobrecosto)
+        self.originales = []
+        self.costos = _calibrar()
+        self.inicio = reloj()
+        self.fin = None
+
+    def _reemplazar(self, objeto, nombre, nueva):
+        self.originales.append((objeto, nombre, getattr(objeto, nombre)))
+        setattr(objeto, nombre, nueva)
+
+    def _medida(self, funcion, categoria):
+        histograma = self.por_llamada[categoria]
+        cuentas = histograma.cuentas
+        acumulado = self.acumulado
+
+        def medida(*args, **kwargs):
+            inicio = reloj()
+            resultado = funcion(*args, **kwargs)
+            ns = reloj() - inicio
+            # Histograma.agregar en línea (una llamada menos por medición)
+            bits = ns.bit_length()
+            cuentas[(bits << 2) - 4 + ((ns >> (bits - 3)) & 3) if bits > 2 else ns] += 1
+            histograma.suma += ns
+            acumulado[categoria] += ns
+            return resultado
+        return medida
+
+    def _cerrar_paso(self, ahora):
+        # Las categorías sin tiempo en el paso no se agregan: sus ceros se cuentan al final
+        total = ahora - self.inicio_paso
+        medido = 0
+        for categoria, ns in self.acumulado.items():
+            if ns:
+                self.por_paso[categoria].agregar(ns)
+                self.agregados += 1
+                medido += ns
+                self.acumulado[categoria] = 0
+        self.por_paso["otros"].agregar(max(0, total - medido))
+        self.por_paso["total"].agregar(total)
+        self.agregados += 2
+        self.pasos += 1
+
+    def activar(self):
+        for categoria, nombres in FUNCIONES_POR_CATEGORIA.items():
+            for nombre in nombres:
+                self._reemplazar(self.modulo, nombre, self._medida(getattr(self.modulo, nombre), categoria))
+
+        traci = self.modulo.traci
+        paso_original = traci.simulationStep
+        histograma_paso = self.por_llamada["simulationStep"]
+        acumulado = self.acumulado
+
+        def simulationStep(*args, **kwargs):
+            # La misma lectura del reloj cierra el paso anterior y abre este
+            inicio = reloj()
+            if self.inicio_paso is not None:
+                self._cerrar_paso(inicio)
+            self.inicio_paso = inicio
+            resultado = paso_original(*args, **kwargs)
+            ns = reloj() - inicio
+            histograma_paso.agregar(ns)
+            acumulado["simulationStep"] += ns
+            return resultado
+        self._reemplazar(traci, "simulationStep", simulationStep)
+
+        cambiar_fase = self.modulo.cambiar_fase
+        decidir_lote = self.modulo.decidir_lote
+        por_decision = self.por_decision
+
+        def medir_decisiones(funcion, cantidad, *args, **kwargs):
+            antes = (acumulado["sensado"], acumulado["inferencia"], acumulado["registro"])
+            inicio = reloj()
+            resultado = funcion(*args, **kwargs)
+            total = (reloj() - inicio) // cantidad
+            medido = 0
+            for categoria, previo in zip(("sensado", "inferencia", "registro"), antes):
+                ns = (acumulado[categoria] - previo) // cantidad
+                medido += ns
+                for _ in range(cantidad):
+                    por_decision[categoria].agregar(ns)
+            for _ in range(cantidad):
+                por_decision["otros"].agregar(max(0, total - medido))
+                por_decision["total"].agregar(total)
+            self.agregados += 4 * cantidad
+            return resultado
+
+        def decision(semaforo_id, datos, *args, **kwargs):
+            if datos["modo"] != "amarillo":
+                return cambiar_fase(semaforo_id, datos, *args, **kwargs)
+            return medir_decisiones(cambiar_fase, 1, semaforo_id, datos, *args, **kwargs)
+
+        def lote(decisiones, *args, **kwargs):
+            return medir_decisiones(decidir_lote, len(decisiones), decisiones, *args, **kwargs)
+        self._reemplazar(self.modulo, "cambiar_fase", decision)
+        self._reemplazar(self.modulo, "decidir_lote", lote)
+        return self
+
+    def desactivar(self):
+        if self.inicio_paso is not None:
+            self._cerrar_paso(reloj())
+            self.inicio_paso = None
+        for categoria in CATEGORIAS:
+            self.por_paso[categoria].cuentas[0] += self.pasos - self.por_paso[categoria].n
+        self.fin = reloj()
+        for objeto, nombre, original in reversed(self.originales):
+            setattr(objeto, nombre, original)
+        self.originales.clear()
+
+    def resumen(self):
+        pared = ((self.fin or reloj()) - self.inicio) / 1e9
+        mediciones = sum(h.n for h in self.por_llamada.values()) + self.por_decision["total"].n
+        sobrecosto = (mediciones * self.costos["medicion_ns"] + self.agregados * self.costos["agregado_ns"]) / 1e9
+        return {
+            "segundos_pared": pared,
+            "pasos": self.pasos,
+            "decisiones": self.por_decision["total"].n,
+            "sobrecosto_estimado_s": sobrecosto,
+            "sobrecosto_estimado_pct": 100 * sobrecosto / pared if pared else 0.0,
+            "costos_ns": self.costos,
+            "por_llamada": {c: h.a_dict() for c, h in self.por_llamada.items()},
+            "por_paso": {c: h.a_dict() for c, h in self.por_paso.items()},
+            "por_decision": {c: h.a_dict() for c, h in self.por_decision.items()},
+        }
+
+    def tabla(self):
+        r = self.resumen()
+        lineas = [f"⏱️ Perfil: {r['segundos_pared']:.1f}s de pared, {r['pasos']} pasos, {r['decisiones']} decisiones "
+                  f"(sobrecosto estimado {r['sobrecosto_estimado_pct']:.2f}%)"]
+        encabezado = f"  {'':<16}{'n':>10}{'total s':>10}{'% pared':>9}{'media µs':>11}" \
+                     + "".join(f"{f'p{p} µs':>10}" for p in PERCENTILES) + f"{'max µs':>11}"
+        for titulo, grupo in (("Por llamada", "por_llamada"), ("Por paso", "por_paso"), ("Por decisión", "por_decision")):
+            lineas += [f"\n{titulo}", encabezado]
+            for categoria, h in r[grupo].items():
+                pct = 100 * h["total_s"] / r["segundos_pared"] if r["segundos_pared"] else 0.0
+                lineas.append(f"  {categoria:<16}{h['n']:>10}{h['total_s']:>10.2f}{pct:>8.1f}%{h['media_us']:>11.1f}"
+                              + "".join(f"{h[f'p{p}_us']:>10.1f}" for p in PERCENTILES) + f"{h['max_us']:>11.1f}")
+        return "\n".join(lineas)
+
+    def guardar(self, ruta):
+        with open(ruta + ".tmp", "w") as f:
+            json.dump(self.resumen(), f, indent=2)
+        os.replace(ruta + ".tmp", ruta)
+
+def _calibrar(llamadas=20000):
+    # Costo de una medición (envoltura + dos lecturas del reloj) y de un agregado a un
+    # histograma, para estimar el sobrecosto del perfil en la corrida
+    perfil = Perfil.__new__(Perfil)
+    perfil.por_llamada = {"x": Histograma()}
+    perfil.acumulado = {"x": 0}
+    nada = lambda: None
+    medida = Perfil._medida(perfil, nada, "x")
+    histograma = Histograma()
+
+    inicio = reloj()
+    for _ in range(llamadas):
+        nada()
+    directo = reloj() - inicio
+    inicio = reloj()
+    for _ in range(llamadas):
+        medida()
+    medido = reloj() - inicio
+    inicio = reloj()
+    for _ in range(llamadas):
+        histograma.agregar(1000)
+    agregado = reloj() - inicio
+    return {"medicion_ns": max(0, medido - directo) / llamadas, "agregado_ns": agregado / llamadas}
+
+def activar(modulo):
+    return Perfil(modulo).activar()
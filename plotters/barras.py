@@ -1,17 +1,16 @@
 import os
-import pandas as pd
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
 from scipy import stats
 
-# Crear carpeta de salida si no existe
-os.makedirs('../resultados', exist_ok=True)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tripinfo_parser import cargar_tabla
 
 # Archivos CSV y etiquetas
 archivos = {
-    'Estático': './tripinfo_static.csv',
-    'Lógica Difusa': './tripinfo_fuzzy.csv',
-    'Actuated (SUMO)': './tripinfo_actuated.csv'
+    'Estático': './tripinfo_static.npz',
+    'Lógica Difusa': './tripinfo_fuzzy.npz',
+    'Actuated (SUMO)': './tripinfo_actuated.npz'
 }
 
 # Métricas a graficar
@@ -23,16 +22,11 @@ metricas = [
     "tripinfo_waitingTime"
 ]
 
-# Leer datos
-datos = {}
-for etiqueta, archivo in archivos.items():
-    datos[etiqueta] = pd.read_csv(archivo)
-
-# Función para calcular media e intervalo de confianza
-def calcular_estadisticas(columna):
+# Función para calcular media e intervalo de confianza (datos: etiqueta -> DataFrame)
+def calcular_estadisticas(datos, columna):
     medias = []
     errores = []
-    for etiqueta in archivos:
+    for etiqueta in datos:
         serie = datos[etiqueta][columna].dropna()
         media = np.mean(serie)
         sem = stats.sem(serie)  # error estándar de la media
@@ -42,24 +36,36 @@ def calcular_estadisticas(columna):
         errores.append(error)
     return medias, errores
 
-# Graficar
-for metrica in metricas:
-    medias, errores = calcular_estadisticas(metrica)
-    
-    fig, ax = plt.subplots()
-    etiquetas = list(archivos.keys())
-    x = np.arange(len(etiquetas))
-    ax.bar(x, medias, yerr=errores, capsize=10, color=['skyblue', 'salmon', 'lightgreen'])
-    ax.set_xticks(x)
-    ax.set_xticklabels(etiquetas)
-    ax.set_ylabel(metrica)
-    ax.set_title(f'{metrica} con Intervalos de Confianza al 95%')
-    ax.grid(True, linestyle='--', alpha=0.6)
+if __name__ == "__main__":
+    # matplotlib solo para graficar: las funciones de arriba se importan sin él
+    import matplotlib.pyplot as plt
+
+    # Crear carpeta de salida si no existe
+    os.makedirs('../resultados', exist_ok=True)
+
+    # Leer datos
+    datos = {}
+    for etiqueta, archivo in archivos.items():
+        datos[etiqueta] = cargar_tabla(archivo)
+
+    # Graficar
+    for metrica in metricas:
+        medias, errores = calcular_estadisticas(datos, metrica)
+
+        fig, ax = plt.subplots()
+        etiquetas = list(archivos.keys())
+        x = np.arange(len(etiquetas))
+        ax.bar(x, medias, yerr=errores, capsize=10, color=['skyblue', 'salmon', 'lightgreen'])
+        ax.set_xticks(x)
+        ax.set_xticklabels(etiquetas)
+        ax.set_ylabel(metrica)
+        ax.set_title(f'{metrica} con Intervalos de Confianza al 95%')
+        ax.grid(True, linestyle='--', alpha=0.6)
 
-    # Guardar gráfica
-    ruta = f'./results/{metrica}.png'
-    plt.tight_layout()
-    plt.savefig(ruta)
-    plt.close()
+        # Guardar gráfica
+        ruta = f'./results/{metrica}.png'
+        plt.tight_layout()
+        plt.savefig(ruta)
+        plt.close()
 
-print("✅ Gráficas guardadas en ../resultados")
+    print("✅ Gráficas guardadas en ../resultados")
@@ -1,5 +1,4 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 
 # === CONFIGURACIÓN GENERAL ===
 semaforo_objetivo = "2496228891"
@@ -77,47 +76,50 @@ def construir_onda_estatica(duracion_verde, duracion_amarillo, minuto_inicio, mi
         fase = 2 if fase == 0 else 0
     return onda
 
-# === CONSTRUCCIÓN DE ONDAS ===
-ondas = {}
-
-# Static
-ondas["Static"] = construir_onda_estatica(duracion_verde_static, duracion_amarillo, minuto_inicio, minuto_fin)
-
-# Actuated y Fuzzy
-for nombre, (archivo, col_duracion, col_fase) in fuentes.items():
-    df = extraer_fases_csv(archivo, semaforo_objetivo, col_duracion, col_fase)
-    onda = construir_onda_fases(df, minuto_inicio, minuto_fin, col_duracion, col_fase)
-    ondas[nombre] = onda
-
-# === GRAFICADO ===
-plt.figure(figsize=(14, 5))
-x = range((minuto_fin - minuto_inicio) * segundos_por_minuto)
-
-# Para evitar superposición de curvas
-desplazamientos = {"Static": 0, "Actuated": 5, "Fuzzy": 10}
-for nombre, onda in ondas.items():
-    shift = desplazamientos[nombre]
-    onda_shifted = [f + shift if f >= 0 else None for f in onda]
-    estilo = '--' if nombre == "Static" else 'solid'
-    plt.step(x, onda_shifted, where='post', label=nombre, linewidth=2, linestyle=estilo)
-
-# Ejes y etiquetas
-yticks = []
-yticklabels = []
-for base in [0, 5, 10]:
-    yticks += [base, base + 1, base + 2, base + 3]
-    yticklabels += [f"Fase 0", "Fase 1", "Fase 2", "Fase 3"]
-
-plt.yticks(yticks, yticklabels)
-plt.ylim(-1, max(yticks) + 1)
-plt.xlabel(f"Tiempo (segundos desde el minuto {minuto_inicio})")
-plt.ylabel("Fase activa")
-plt.title(f"Comparación de Secuencias de Fases - Semáforo {semaforo_objetivo}")
-plt.grid(True, linestyle='--', alpha=0.6)
-plt.legend()
-plt.tight_layout()
-
-# Guardar imagen ANTES de mostrarla
-plt.savefig("./results/phases.png", dpi=300)
-plt.show()
-
+if __name__ == "__main__":
+    # matplotlib solo para graficar: las funciones de arriba se importan sin él
+    import matplotlib.pyplot as plt
+
+    # === CONSTRUCCIÓN DE ONDAS ===
+    ondas = {}
+
+    # Static
+    ondas["Static"] = construir_onda_estatica(duracion_verde_static, duracion_amarillo, minuto_inicio, minuto_fin)
+
+    # Actuated y Fuzzy
+    for nombre, (archivo, col_duracion, col_fase) in fuentes.items():
+        df = extraer_fases_csv(archivo, semaforo_objetivo, col_duracion, col_fase)
+        onda = construir_onda_fases(df, minuto_inicio, minuto_fin, col_duracion, col_fase)
+        ondas[nombre] = onda
+
+    # === GRAFICADO ===
+    plt.figure(figsize=(14, 5))
+    x = range((minuto_fin - minuto_inicio) * segundos_por_minuto)
+
+    # Para evitar superposición de curvas
+    desplazamientos = {"Static": 0, "Actuated": 5, "Fuzzy": 10}
+    for nombre, onda in ondas.items():
+        shift = desplazamientos[nombre]
+        onda_shifted = [f + shift if f >= 0 else None for f in onda]
+        estilo = '--' if nombre == "Static" else 'solid'
+        plt.step(x, onda_shifted, where='post', label=nombre, linewidth=2, linestyle=estilo)
+
+    # Ejes y etiquetas
+    yticks = []
+    yticklabels = []
+    for base in [0, 5, 10]:
+        yticks += [base, base + 1, base + 2, base + 3]
+        yticklabels += [f"Fase 0", "Fase 1", "Fase 2", "Fase 3"]
+
+    plt.yticks(yticks, yticklabels)
+    plt.ylim(-1, max(yticks) + 1)
+    plt.xlabel(f"Tiempo (segundos desde el minuto {minuto_inicio})")
+    plt.ylabel("Fase activa")
+    plt.title(f"Comparación de Secuencias de Fases - Semáforo {semaforo_objetivo}")
+    plt.grid(True, linestyle='--', alpha=0.6)
+    plt.legend()
+    plt.tight_layout()
+
+    # Guardar imagen ANTES de mostrarla
+    plt.savefig("./results/phases.png", dpi=300)
+    plt.show()
@@ -1,13 +1,16 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import os
+import sys
 from datetime import datetime, timedelta
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tripinfo_parser import cargar_tabla
+
 # === CONFIGURACIÓN ===
 archivos = {
-    "Static": "./tripinfo_static.csv",
-    "Actuated": "./tripinfo_actuated.csv",
-    "Fuzzy": "./tripinfo_fuzzy.csv"
+    "Static": "./tripinfo_static.npz",
+    "Actuated": "./tripinfo_actuated.npz",
+    "Fuzzy": "./tripinfo_fuzzy.npz"
 }
 
 intervalo_segundos = 60*5  # 10 minutos
@@ -21,7 +24,7 @@ densidades = {}
 
 for etiqueta, archivo in archivos.items():
     try:
-        df = pd.read_csv(archivo, sep=None, engine="python")
+        df = cargar_tabla(archivo)
         print(f"✅ Leyendo {archivo}... columnas: {list(df.columns)}")
 
         if "tripinfo_depart" not in df.columns:
@@ -0,0 +1,128 @@
+import heapq
+import numpy as np
+
+# Estado de los lanes sensados (registro_all_lanes) en arreglos en lugar de un dict de
+# sets por lane que se reconstruía en cada muestra:
+#   - los IDs de vehículos se internan a enteros mientras estén en algún lane sensado;
+#     cuando un vehículo sale de todos, su código vuelve a una lista libre y se reutiliza,
+#     así el diccionario y los códigos quedan acotados por los vehículos presentes y no
+#     por la demanda total de la corrida
+#   - la pertenencia de cada lane es un bitset (int de Python) sobre esos códigos
+#   - las métricas escalares van en un arreglo estructurado indexado por número de lane
+# Las llegadas (vehículos nuevos desde la muestra anterior) son los bits nuevos del
+# bitset. Con pocos lanes por decisión y pocos vehículos por lane el costo está en la
+# cantidad de llamadas, no en su tamaño: todo queda en operaciones sobre enteros.
+DTYPE_LANE = np.dtype([
+    ("vehiculos", "i4"),
+    ("movimiento", "i4"),
+    ("detenidos", "i4"),
+    ("velocidad_promedio", "f8"),
+    ("nuevos_vehiculos", "i4"),
+    ("tiempo_ultimo", "f8"),  # NaN: lane todavía sin muestra
+    ("tasa_llegada", "f8"),
+])
+UMBRAL_MOVIMIENTO = 0.1  # m/s
+
+class RegistroLanes:
+    def __init__(self, lane_ids):
+        self.lanes = list(lane_ids)
+        self.posicion = {lane_id: i for i, lane_id in enumerate(self.lanes)}
+        self.datos = np.zeros(len(self.lanes), dtype=DTYPE_LANE)
+        self.datos["tiempo_ultimo"] = np.nan
+        self._vehiculos = self.datos["vehiculos"]  # vista fija: la más consultada por lane
+        self.miembros = [0] * len(self.lanes)  # bitset de códigos de los vehículos de cada lane
+        self.codigos = {}  # veh_id -> código
+        self.nombres = []  # código -> veh_id
+        self.referencias = []  # código -> cantidad de lanes en que está
+        self.libres = []  # heap de códigos sin vehículo: se reutiliza primero el menor
+
+    # Misma forma de recorrerlo que el dict anterior (lane_id in registro, registro.keys())
+    def __contains__(self, lane_id):
+        return lane_id in self.posicion
+
+    def __iter__(self):
+        return iter(self.lanes)
+
+    def __len__(self):
+        return len(self.lanes)
+
+    def keys(self):
+        return self.lanes
+
+    # Para los checkpoints: la vista de vehículos se rearma al cargar (pickle la copiaría)
+    def __getstate__(self):
+        estado = dict(self.__dict__)
+        del estado["_vehiculos"]
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._vehiculos = self.datos["vehiculos"]
+
+    def indices(self, lane_ids):
+        posicion = self.posicion
+        return np.fromiter((posicion[lane_id] for lane_id in lane_ids if lane_id in posicion), dtype=np.intp)
+
+    def vehiculos(self, lane_id):
+        return int(self._vehiculos[self.posicion[lane_id]])
+
+    def ids_vehiculos(self, lane_id):
+        # Solo para depurar: de códigos a IDs
+        miembros = self.miembros[self.posicion[lane_id]]
+        return [self.nombres[codigo] for codigo in range(miembros.bit_length()) if miembros >> codigo & 1]
+
+    def _codigo(self, veh_id):
+        if self.libres:
+            codigo = heapq.heappop(self.libres)
+            self.nombres[codigo] = veh_id
+        else:
+            codigo = len(self.nombres)
+            self.nombres.append(veh_id)
+            self.referencias.append(0)
+        self.codigos[veh_id] = codigo
+        return codigo
+
+    def _liberar(self, bits):
+        referencias = self.referencias
+        while bits:
+            bit = bits & -bits
+            codigo = bit.bit_length() - 1
+            referencias[codigo] -= 1
+            if not referencias[codigo]:
+                del self.codigos[self.nombres[codigo]]
+                self.nombres[codigo] = None
+                heapq.heappush(self.libres, codigo)
+            bits ^= bit
+
+    def actualizar(self, lane_ids, tiempo, lecturas):
+        # lecturas[k] = (ids, velocidades) de lane_ids[k], sin lanes repetidos
+        posicion = self.posicion
+        codigos = self.codigos
+        referencias = self.referencias
+        miembros = self.miembros
+        datos = self.datos
+        tiempos = datos["tiempo_ultimo"]
+        for lane_id, (ids, velocidades) in zip(lane_ids, lecturas):
+            p = posicion[lane_id]
+            bits = 0
+            for veh_id in ids:
+                codigo = codigos.get(veh_id)
+                bits |= 1 << (self._codigo(veh_id) if codigo is None else codigo)
+            anteriores = miembros[p]
+            miembros[p] = bits
+            entraron = bits & ~anteriores
+            nuevos = entraron.bit_count()
+            while entraron:
+                bit = entraron & -entraron
+                referencias[bit.bit_length() - 1] += 1
+                entraron ^= bit
+            salieron = anteriores & ~bits
+            if salieron:
+                self._liberar(salieron)
+
+            en_movimiento = [v for v in velocidades if v > UMBRAL_MOVIMIENTO]
+            velocidad_promedio = sum(en_movimiento) / len(en_movimiento) if en_movimiento else 0.0
+            delta_t = tiempo - tiempos[p]  # NaN sin muestra anterior: tasa 0
+            tasa = nuevos / delta_t if delta_t > 0 else 0.0
+            datos[p] = (len(ids), len(en_movimiento), len(ids) - len(en_movimiento),
+                        velocidad_promedio, nuevos, tiempo, tasa)
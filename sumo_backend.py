@@ -0,0 +1,139 @@
+import importlib
+import os
+import shutil
+import types
+import xml.etree.ElementTree as ET
+
+# Backend para controlar SUMO con la misma API de traci:
+#   "traci"   -> SUMO como proceso aparte, comandos por socket TCP
+#   "libsumo" -> SUMO cargado en el mismo proceso (sin serialización por llamada)
+#   "simulado" -> modelo de colas sintético sin SUMO (traci_simulado.py), para medir controladores
+# Se elige con --backend en los scripts o con la variable de entorno SUMO_BACKEND.
+BACKENDS = ("traci", "libsumo", "simulado")
+MODULOS = {"traci": "traci", "libsumo": "libsumo", "simulado": "traci_simulado"}
+BACKEND_POR_DEFECTO = os.environ.get("SUMO_BACKEND", "traci")
+# Estados guardados (warm-start y checkpoints): con la precisión por defecto (2 decimales)
+# las velocidades y posiciones se redondean y la corrida que arranca del estado se aparta
+# de la que nunca se cortó. Con 17 dígitos el double vuelve exacto (con 8 las estadísticas difieren en ~1e-11)
+OPCIONES_ESTADO = ["--save-state.precision", "17"]
+
+# Objeto que importan los controladores en lugar del módulo traci; usar_backend copia
+# en él los atributos del backend elegido (acceso directo, sin indirección por llamada)
+traci = types.ModuleType("traci")
+traci.backend = None
+_atributos_copiados = []
+
+def _adaptar_libsumo(modulo):
+    # libsumo no tiene conexiones con etiqueta (una sola simulación por proceso)
+    # ni algunos argumentos de start; se adaptan para que el código no cambie
+    atributos = dict(vars(modulo))
+    start_original = modulo.start
+
+    def start(cmd, port=None, numRetries=60, label="default", verbose=False,
+              traceFile=None, traceGetters=True, stdout=None, doSwitch=True):
+        if os.path.basename(cmd[0]).startswith("sumo-gui"):
+            raise ValueError("libsumo no soporta sumo-gui; use --backend traci")
+        return start_original(cmd)
+
+    def switch(label):
+        if label != "default":
+            raise ValueError(f"libsumo solo admite la conexión 'default' (pedida: {label})")
+
+    atributos["start"] = start
+    atributos["switch"] = switch
+    atributos["getLabel"] = lambda: "default"
+    atributos["setOrder"] = lambda order: None
+    return atributos
+
+def usar_backend(nombre=None):
+    nombre = nombre or BACKEND_POR_DEFECTO
+    if nombre not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {nombre} (opciones: {', '.join(BACKENDS)})")
+    if traci.backend == nombre:
+        return traci
+
+    modulo = importlib.import_module(MODULOS[nombre])
+    atributos = _adaptar_libsumo(modulo) if nombre == "libsumo" else dict(vars(modulo))
+
+    # Quitar lo copiado del backend anterior antes de copiar el nuevo
+    for clave in _atributos_copiados:
+        delattr(traci, clave)
+    _atributos_copiados.clear()
+
+    for clave, valor in atributos.items():
+        if not clave.startswith("__"):
+            setattr(traci, clave, valor)
+            _atributos_copiados.append(clave)
+    traci.backend = nombre
+    return traci
+
+def agregar_argumento_backend(parser):
+    parser.add_argument("--backend", choices=BACKENDS, default=BACKEND_POR_DEFECTO,
+                        help="traci (socket), libsumo (en proceso) o simulado (sin SUMO); también SUMO_BACKEND")
+
+# ========= Opciones de corrida =========
+# Permiten lanzar varias corridas a la vez sin que se pisen: cada una con su semilla,
+# su demanda, su puerto/etiqueta TraCI y un directorio propio para las salidas de SUMO
+def agregar_argumentos_corrida(parser):
+    parser.add_argument("--seed", type=int, default=None, help="semilla de SUMO")
+    parser.add_argument("--rutas", default=None, help="archivo de demanda en lugar del indicado en el .sumocfg")
+    parser.add_argument("--puerto", type=int, default=None, help="puerto TraCI (por defecto uno libre)")
+    parser.add_argument("--etiqueta", default="default", help="etiqueta de la conexión TraCI")
+    parser.add_argument("--salidas-sumo", default=None,
+                        help="directorio para tripinfo, statistics y edgeData (por defecto, los del .sumocfg)")
+    parser.add_argument("--estado-inicial", default=None,
+                        help="estado guardado por warm_start.py; la corrida arranca desde ese instante")
+    parser.add_argument("--fin", type=float, default=None,
+                        help="tiempo de simulación en que se corta la corrida (tripinfo incluye los no llegados)")
+
+def _valores_cfg(sumo_cfg):
+    valores = {}
+    for elemento in ET.parse(sumo_cfg).getroot().iter():
+        if "value" in elemento.attrib:
+            valores[elemento.tag] = elemento.attrib["value"]
+    return valores
+
+def opciones_sumo(sumo_cfg, seed=None, rutas=None, salidas=None, estado=None, fin=None):
+    opciones = []
+    if fin is not None:
+        # Si se corta antes, los vehículos que siguen en la red también cuentan en tripinfo
+        opciones += ["--end", str(fin), "--tripinfo-output.write-unfinished", "true"]
+    if estado:
+        # Al arrancar y no con traci.simulation.loadState: este último, llamado en t=0, deja
+        # en cola de inserción los flujos ya leídos y la red se satura
+        opciones += ["--load-state", os.path.abspath(estado)]
+    if seed is not None:
+        opciones += ["--seed", str(seed)]
+    if rutas:
+        opciones += ["--route-files", os.path.abspath(rutas)]
+    if salidas:
+        os.makedirs(salidas, exist_ok=True)
+        directorio_cfg = os.path.dirname(os.path.abspath(sumo_cfg))
+        valores = _valores_cfg(sumo_cfg)
+        for opcion in ("tripinfo-output", "statistic-output"):
+            if opcion in valores:
+                opciones += ["--" + opcion, os.path.join(salidas, os.path.basename(valores[opcion]))]
+
+        # output.add.xml define el edgeData con ruta relativa a sí mismo: una copia en
+        # el directorio de la corrida lo escribe ahí
+        adicionales = []
+        for archivo in valores.get("additional-files", "").split(","):
+            if not archivo:
+                continue
+            ruta = os.path.join(directorio_cfg, archivo)
+            if os.path.basename(archivo) == "output.add.xml":
+                ruta = shutil.copy(ruta, os.path.join(salidas, "output.add.xml"))
+            adicionales.append(os.path.abspath(ruta))
+        if adicionales:
+            opciones += ["--additional-files", ",".join(adicionales)]
+    return opciones
+
+def iniciar_sumo(sumo_cfg, args, binario="sumo", extra=()):
+    cmd = [binario, "-c", sumo_cfg] + opciones_sumo(sumo_cfg, args.seed, args.rutas, args.salidas_sumo,
+                                                    args.estado_inicial, args.fin) + list(extra)
+    return traci.start(cmd, port=args.puerto, label=args.etiqueta)
+
+try:
+    usar_backend()
+except ImportError:
+    pass  # backend por defecto no instalado (p. ej. sin SUMO): se elige con --backend simulado
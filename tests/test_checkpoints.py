@@ -0,0 +1,55 @@
+import os
+import shutil
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+import numpy as np
+import pytest
+
+# Cortar una corrida en un checkpoint y reanudarla tiene que dar lo mismo que no cortarla:
+# logs, estadísticas y tripinfo. Necesita SUMO (el backend simulado no guarda estados)
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIN = 1800
+CORTE = 1000
+INTERVALO = 600
+
+pytestmark = pytest.mark.skipif(shutil.which("sumo") is None, reason="SUMO no está instalado")
+
+def _correr(*opciones):
+    subprocess.run([sys.executable, os.path.join(RAIZ, "Fuzzy_logic.py"), "--compilado", "--sin-verificar",
+                    *opciones], cwd=RAIZ, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def _tripinfo(ruta):
+    return {e.attrib["id"]: e.attrib for e in ET.parse(ruta).getroot().iter("tripinfo")}
+
+def test_reanudar_igual_a_corrida_directa(tmp_path):
+    directa = str(tmp_path / "directa")
+    cortada = str(tmp_path / "cortada")
+    _correr("--fin", str(FIN), "--salida", directa, "--salidas-sumo", directa)
+    _correr("--fin", str(CORTE), "--checkpoint-intervalo", str(INTERVALO), "--salida", cortada, "--salidas-sumo", cortada)
+    _correr("--fin", str(FIN), "--checkpoint-intervalo", str(INTERVALO), "--resume",
+            "--salida", cortada, "--salidas-sumo", cortada)
+
+    for nombre in ("datos_colas_fuzzy.csv", "datos_semaforos_fuzzy.csv"):
+        with open(os.path.join(directa, nombre), "rb") as a, open(os.path.join(cortada, nombre), "rb") as b:
+            assert a.read() == b.read(), nombre
+
+    for nombre in ("estadisticas_fuzzy_lanes.npz", "estadisticas_fuzzy_fases.npz"):
+        with np.load(os.path.join(directa, nombre)) as a, np.load(os.path.join(cortada, nombre)) as b:
+            assert sorted(a.files) == sorted(b.files)
+            for clave in a.files:
+                np.testing.assert_array_equal(a[clave], b[clave], err_msg=f"{nombre}:{clave}")
+
+    # Antes del checkpoint, los viajes terminados salen en el tripinfo de la corrida cortada;
+    # después, en el de la reanudada (en reanudado_<t>/)
+    esperado = _tripinfo(os.path.join(directa, "tripinfo_fuzzy.xml"))
+    reanudadas = [d for d in os.listdir(cortada) if d.startswith("reanudado_")]
+    assert len(reanudadas) == 1
+    checkpoint = float(reanudadas[0].split("_")[1])
+    antes = {veh: t for veh, t in _tripinfo(os.path.join(cortada, "tripinfo_fuzzy.xml")).items()
+             if 0 <= float(t["arrival"]) <= checkpoint}
+    despues = _tripinfo(os.path.join(cortada, reanudadas[0], "tripinfo_fuzzy.xml"))
+    assert antes and despues
+    for veh, atributos in {**antes, **despues}.items():
+        assert atributos == esperado[veh], veh
+    assert set(antes) | set(despues) == set(esperado)
@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import traci_simulado
+from sumo_backend import traci, usar_backend
+
+# El programador por eventos tiene que dar las mismas decisiones que el bucle paso a paso
+# (--por-pasos): mismos logs de fases y de colas, sobre el backend simulado
+PASOS = 900
+
+def _correr(directorio, por_pasos):
+    import Fuzzy_logic as F
+    usar_backend("simulado")
+    escenario = traci_simulado.red_sintetica(2, 2, vph=400)
+    traci_simulado.iniciar(escenario["red"], escenario["flujos"])
+    F.abrir_logs(directorio)
+    try:
+        estado, registro = F.inicializar_controladores(escenario["semaforos_ids"], escenario["fases_lanes_dict"])
+        F.estadisticas_globales = F.inicializar_estadisticas(registro.keys(), F.indice_lanes["fases"])
+        ejecutar = F.ejecutar_control if por_pasos else F.ejecutar_control_eventos
+        ejecutar(estado, registro, tiempo_fin=PASOS)
+    finally:
+        F.cerrar_logs()
+        traci.close()
+
+def test_eventos_igual_a_por_pasos(tmp_path):
+    eventos, por_pasos = tmp_path / "eventos", tmp_path / "por_pasos"
+    eventos.mkdir()
+    por_pasos.mkdir()
+    _correr(str(eventos), por_pasos=False)
+    _correr(str(por_pasos), por_pasos=True)
+    for nombre in ("datos_semaforos_fuzzy.csv", "datos_colas_fuzzy.csv"):
+        a = (eventos / nombre).read_text()
+        assert a.count("\n") > 1, nombre  # hubo decisiones registradas
+        assert a == (por_pasos / nombre).read_text(), nombre
@@ -0,0 +1,60 @@
+import os
+import sys
+import numpy as np
+from skfuzzy import control as ctrl
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fuzzy_defs import funciones, reglas_definidas, entradas
+from fuzzy_utils import (combinar_definiciones, compilar_motor_fuzzy, crear_reglas_desde_lista,
+                         evaluar_entradas, generar_membresias_fuzzy, inferir_disperso, inferir_lote)
+
+# Paridad del motor NumPy (inferir_lote) y del disperso (inferir_disperso) con skfuzzy,
+# en entradas al azar fijas. El motor usa los mismos universos de 1000 puntos, así que la
+# diferencia es solo de redondeo en la agregación y el centroide
+TOLERANCIA = 1e-3
+MUESTRAS = 40
+
+# Tres entradas con antecedentes "*": reglas que no dependen de todas las entradas
+CAMBIOS_3_ENTRADAS = {
+    "entradas": ["vehiculos", "llegada", "detenidos"],
+    "funciones": {"detenidos": {"lmin": 0, "lmax": 20, "niveles": ["pocos", "normal", "muchos"]}},
+    "reglas_definidas": [
+        ["muy pocos", "*", "*", "muy corto"],
+        ["pocos", "muy lenta", "*", "muy corto"],
+        ["pocos", "*", "pocos", "corto"],
+        ["normal", "media", "*", "normal"],
+        ["normal", "*", "normal", "normal"],
+        ["moderados", "alta", "*", "alto"],
+        ["muchos", "*", "*", "alto"],
+        ["*", "*", "muchos", "muy alto"],
+        ["*", "alta", "muchos", "muy alto"],
+    ],
+}
+
+def _entradas_al_azar(definiciones, nombres, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return [rng.uniform(definiciones[nombre]["lmin"], definiciones[nombre]["lmax"], MUESTRAS) for nombre in nombres]
+
+def _skfuzzy(definiciones, reglas, nombres, valores):
+    sistema = ctrl.ControlSystem(crear_reglas_desde_lista(reglas, generar_membresias_fuzzy(definiciones), nombres))
+    return np.array([evaluar_entradas(sistema, dict(zip(nombres, fila)))
+                     for fila in zip(*(x.tolist() for x in valores))])
+
+def test_inferir_lote_igual_a_skfuzzy():
+    motor = compilar_motor_fuzzy(funciones, reglas_definidas, entradas)
+    valores = _entradas_al_azar(funciones, entradas)
+
+    exacto = _skfuzzy(funciones, reglas_definidas, entradas, valores)
+    rapido = inferir_lote(motor, *valores, por_defecto=30)
+    np.testing.assert_allclose(rapido, exacto, rtol=0, atol=TOLERANCIA)
+
+def test_motor_disperso_con_comodines_igual_a_skfuzzy():
+    definiciones, reglas, nombres = combinar_definiciones(funciones, reglas_definidas, CAMBIOS_3_ENTRADAS, entradas)
+    motor = compilar_motor_fuzzy(definiciones, reglas, nombres)
+    valores = _entradas_al_azar(definiciones, nombres, semilla=1)
+
+    exacto = _skfuzzy(definiciones, reglas, nombres, valores)
+    rapido = inferir_lote(motor, *valores, por_defecto=30)
+    disperso = np.array([inferir_disperso(motor, fila, por_defecto=30) for fila in zip(*(x.tolist() for x in valores))])
+    np.testing.assert_allclose(rapido, exacto, rtol=0, atol=TOLERANCIA)
+    np.testing.assert_allclose(disperso, exacto, rtol=0, atol=TOLERANCIA)
@@ -0,0 +1,80 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from registro_lanes import RegistroLanes
+
+LANES = ["a", "b"]
+
+def _fila(registro, lane_id):
+    return registro.datos[registro.posicion[lane_id]]
+
+def test_conteos_y_llegadas():
+    registro = RegistroLanes(LANES)
+    registro.actualizar(LANES, 0.0, [(["v1", "v2"], [0.0, 5.0]), (["v3"], [2.0])])
+    a = _fila(registro, "a")
+    assert (a["vehiculos"], a["movimiento"], a["detenidos"]) == (2, 1, 1)
+    assert a["velocidad_promedio"] == 5.0
+    assert a["nuevos_vehiculos"] == 2 and a["tasa_llegada"] == 0.0  # sin muestra anterior
+
+    # v1 sale de "a", v4 entra a "b"
+    registro.actualizar(LANES, 10.0, [(["v2"], [0.0]), (["v3", "v4"], [2.0, 4.0])])
+    a, b = _fila(registro, "a"), _fila(registro, "b")
+    assert (a["vehiculos"], a["nuevos_vehiculos"], a["velocidad_promedio"]) == (1, 0, 0.0)
+    assert (b["vehiculos"], b["nuevos_vehiculos"]) == (2, 1)
+    assert b["tasa_llegada"] == 0.1
+    assert registro.vehiculos("b") == 2
+    assert sorted(registro.ids_vehiculos("b")) == ["v3", "v4"]
+
+    # v1 vuelve, ahora a "b": cuenta como llegada otra vez
+    registro.actualizar(LANES, 20.0, [(["v2"], [0.0]), (["v3", "v4", "v1"], [2.0, 4.0, 1.0])])
+    b = _fila(registro, "b")
+    assert (b["vehiculos"], b["nuevos_vehiculos"]) == (3, 1)
+    assert sorted(registro.ids_vehiculos("b")) == ["v1", "v3", "v4"]
+
+def test_vehiculo_en_dos_lanes_conserva_su_codigo():
+    registro = RegistroLanes(LANES)
+    registro.actualizar(LANES, 0.0, [(["v1"], [1.0]), (["v1"], [1.0])])
+    codigo = registro.codigos["v1"]
+    assert registro.referencias[codigo] == 2
+    # Sale de uno solo: sigue registrado con el mismo código
+    registro.actualizar(LANES, 1.0, [([], []), (["v1"], [1.0])])
+    assert registro.codigos["v1"] == codigo and registro.referencias[codigo] == 1
+    assert not registro.libres
+    registro.actualizar(LANES, 2.0, [([], []), ([], [])])
+    assert "v1" not in registro.codigos and registro.libres == [codigo]
+
+def test_codigo_liberado_se_reutiliza_sin_pertenencia_vieja():
+    registro = RegistroLanes(LANES)
+    registro.actualizar(LANES, 0.0, [(["v1"], [1.0]), (["v1", "v2"], [1.0, 1.0])])
+    codigo_v1 = registro.codigos["v1"]
+    registro.actualizar(LANES, 1.0, [([], []), (["v2"], [1.0])])
+    assert registro.libres == [codigo_v1]
+
+    # v5 toma el código de v1 y aparece solo en "a": "b" no debe verlo ni contarlo
+    registro.actualizar(LANES, 2.0, [(["v5"], [1.0]), (["v2"], [1.0])])
+    assert registro.codigos["v5"] == codigo_v1
+    assert "v1" not in registro.codigos and not registro.libres
+    assert registro.ids_vehiculos("a") == ["v5"]
+    assert registro.ids_vehiculos("b") == ["v2"]
+    assert _fila(registro, "a")["nuevos_vehiculos"] == 1
+    assert (_fila(registro, "b")["vehiculos"], _fila(registro, "b")["nuevos_vehiculos"]) == (1, 0)
+    assert registro.referencias[codigo_v1] == 1
+
+    # Si v1 vuelve recibe un código nuevo y es llegada en "b"
+    registro.actualizar(LANES, 3.0, [(["v5"], [1.0]), (["v2", "v1"], [1.0, 1.0])])
+    assert registro.codigos["v1"] != codigo_v1
+    assert _fila(registro, "b")["nuevos_vehiculos"] == 1
+    assert sorted(registro.ids_vehiculos("b")) == ["v1", "v2"]
+    assert len(registro.nombres) == 3  # los códigos quedan acotados por los vehículos presentes
+
+def test_codigo_liberado_y_tomado_en_la_misma_muestra():
+    registro = RegistroLanes(LANES)
+    registro.actualizar(LANES, 0.0, [(["v1"], [1.0]), ([], [])])
+    # "a" se procesa primero y libera el código de v1; v6 lo toma en "b" en la misma llamada
+    registro.actualizar(LANES, 1.0, [([], []), (["v6"], [1.0])])
+    assert registro.codigos == {"v6": 0}
+    assert registro.ids_vehiculos("a") == [] and registro.ids_vehiculos("b") == ["v6"]
+    assert _fila(registro, "b")["nuevos_vehiculos"] == 1
+    assert _fila(registro, "a")["vehiculos"] == 0
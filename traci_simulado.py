@@ -0,0 +1,476 @@
+import heapq
+import os
+import types
+import xml.etree.ElementTree as ET
+from collections import deque
+from tripinfo_parser import abrir_xml
+
+# Simulador sintético con la parte de la API de traci que usan los controladores
+# (Fuzzy_logic, Actuated_logic, lane_sensing). Sirve para probar y medir el costo de los
+# controladores sin SUMO: se elige con --backend simulado.
+#
+# Modelo de colas por lane: cada vehículo recorre su lane en longitud/velocidad segundos
+# y espera en la línea de detención hasta que su conexión esté en verde; en verde sale
+# un vehículo cada HEADWAY_VERDE s (HEADWAY_LIBRE en lanes sin semáforo) y pasa al
+# siguiente lane de su ruta. Las rutas salen de los <flow>/<trip> (from/to) por el
+# camino más corto en número de edges. Todo avanza por eventos: un lane solo se procesa
+# cuando su primer vehículo puede salir, así el costo por paso es proporcional a lo que
+# pasa y no al tamaño de la red. Los programas de semáforo del .net.xml corren con sus
+# duraciones fijas (un tlLogic actuado se comporta como estático).
+HEADWAY_VERDE = 2
+HEADWAY_LIBRE = 1
+
+constants = types.SimpleNamespace(
+    LAST_STEP_VEHICLE_NUMBER=0x10,
+    LAST_STEP_VEHICLE_ID_LIST=0x12,
+    VAR_SPEED=0x40,
+    CMD_GET_VEHICLE_VARIABLE=0xa4,
+    TL_CURRENT_PHASE=0x28,
+    TL_NEXT_SWITCH=0x2d,
+)
+
+# Campos de cada vehículo (lista, por velocidad de acceso)
+RUTA, POS, T_LINEA, SALIDA, ESPERA, LIBRE, LARGO = range(7)
+
+_sim = None
+
+# ========= Red =========
+def leer_red(ruta_net):
+    red = {"edges": {}, "lanes": {}, "conexiones": {}, "semaforos": {}}
+    with abrir_xml(ruta_net) as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag == "edge" and elem.get("function") != "internal":
+                carriles = []
+                for lane in elem.findall("lane"):
+                    red["lanes"][lane.get("id")] = {"longitud": float(lane.get("length")),
+                                                   "velocidad": float(lane.get("speed"))}
+                    carriles.append(lane.get("id"))
+                red["edges"][elem.get("id")] = carriles
+            elif elem.tag == "connection" and not elem.get("from").startswith(":"):
+                origen, destino = elem.get("from"), elem.get("to")
+                lane = f"{origen}_{elem.get('fromLane')}"
+                tls = elem.get("tl")
+                enlace = int(elem.get("linkIndex")) if tls is not None else None
+                red["conexiones"].setdefault(origen, {}).setdefault(destino, []).append((lane, tls, enlace))
+            elif elem.tag == "tlLogic":
+                red["semaforos"][elem.get("id")] = [(int(float(p.get("duration"))), p.get("state"))
+                                                   for p in elem.findall("phase")]
+    return red
+
+def leer_flujos(rutas_xml):
+    # (id, from, to, inicio, fin, periodo); un <trip>/<vehicle> es un flujo de un vehículo
+    flujos = []
+    for ruta in rutas_xml:
+        with abrir_xml(ruta) as f:
+            for _, elem in ET.iterparse(f):
+                if elem.tag == "flow" and elem.get("from") and elem.get("to"):
+                    inicio = float(elem.get("begin", 0))
+                    fin = float(elem.get("end", 86400))
+                    if elem.get("vehsPerHour"):
+                        vph = float(elem.get("vehsPerHour"))
+                        periodo = 3600.0 / vph if vph > 0 else None
+                    elif elem.get("period"):
+                        periodo = float(elem.get("period"))
+                    else:
+                        numero = int(elem.get("number", 1))
+                        periodo = (fin - inicio) / numero
+                    if periodo:
+                        flujos.append((elem.get("id"), elem.get("from"), elem.get("to"), inicio, fin, periodo))
+                elif elem.tag in ("trip", "vehicle") and elem.get("from") and elem.get("to"):
+                    salida = float(elem.get("depart", 0))
+                    flujos.append((elem.get("id"), elem.get("from"), elem.get("to"), salida, salida + 1, 1.0))
+    return flujos
+
+def red_sintetica(filas, columnas, largo=200.0, velocidad=13.9, vph=300, fases=(30, 3, 30, 3)):
+    # Cuadrícula filas × columnas de intersecciones semaforizadas, un carril por sentido.
+    # Enlaces de cada semáforo: 0 oeste→este, 1 este→oeste, 2 norte→sur, 3 sur→norte.
+    red = {"edges": {}, "lanes": {}, "conexiones": {}, "semaforos": {}}
+    estados = ("GGrr", "yyrr", "rrGG", "rryy")
+    fases_lanes = {}
+    flujos = []
+
+    def nodo(i, j):
+        return f"n{i}_{j}"
+
+    secuencias = []
+    for i in range(filas):
+        fila = [f"bW{i}"] + [nodo(i, j) for j in range(columnas)] + [f"bE{i}"]
+        secuencias += [(fila, 0), (fila[::-1], 1)]
+    for j in range(columnas):
+        columna = [f"bN{j}"] + [nodo(i, j) for i in range(filas)] + [f"bS{j}"]
+        secuencias += [(columna, 2), (columna[::-1], 3)]
+
+    for secuencia, direccion in secuencias:
+        edges = [f"{a}>{b}" for a, b in zip(secuencia, secuencia[1:])]
+        for edge in edges:
+            red["edges"][edge] = [edge + "_0"]
+            red["lanes"][edge + "_0"] = {"longitud": largo, "velocidad": velocidad}
+        for entrante, saliente, tls in zip(edges, edges[1:], secuencia[1:-1]):
+            red["conexiones"].setdefault(entrante, {})[saliente] = [(entrante + "_0", tls, direccion)]
+            red["semaforos"][tls] = list(zip(fases, estados))
+            fase = 0 if direccion < 2 else 2
+            fases_lanes.setdefault(tls, {0: [], 2: []})[fase].append(entrante + "_0")
+        flujos.append((f"f{len(flujos)}", edges[0], edges[-1], 0.0, float("inf"), 3600.0 / vph))
+
+    semaforos_ids = sorted(red["semaforos"])
+    return {"red": red, "flujos": flujos, "semaforos_ids": semaforos_ids, "fases_lanes_dict": fases_lanes}
+
+def _camino(red, origen, destino):
+    # BFS sobre edges: el camino más corto en cantidad de edges
+    if origen == destino:
+        return [origen]
+    previo = {origen: None}
+    frontera = deque([origen])
+    while frontera:
+        edge = frontera.popleft()
+        for siguiente in red["conexiones"].get(edge, {}):
+            if siguiente not in previo:
+                previo[siguiente] = edge
+                if siguiente == destino:
+                    camino = [destino]
+                    while previo[camino[-1]] is not None:
+                        camino.append(previo[camino[-1]])
+                    return camino[::-1]
+                frontera.append(siguiente)
+    return None
+
+# ========= Estado de la simulación =========
+def iniciar(red, flujos, fin=None, tripinfo=None):
+    global _sim
+    semaforos = {}
+    lanes_semaforo = {}
+    eventos_tls = []
+    for orden, (tls, fases) in enumerate(red["semaforos"].items()):
+        semaforos[tls] = {"fases": fases, "fase": 0, "fin": fases[0][0], "version": 0}
+        heapq.heappush(eventos_tls, (fases[0][0], orden, 0, tls))
+    for destinos in red["conexiones"].values():
+        for opciones in destinos.values():
+            for lane, tls, _ in opciones:
+                if tls is not None:
+                    lanes_semaforo.setdefault(tls, set()).add(lane)
+
+    tiempos = {lane: max(1, int(round(d["longitud"] / max(d["velocidad"], 0.1))))
+               for lane, d in red["lanes"].items()}
+
+    rutas = []
+    pendientes = []
+    sin_camino = 0
+    for i, (fid, origen, destino, inicio, fin_flujo, periodo) in enumerate(flujos):
+        camino = _camino(red, origen, destino) if origen in red["edges"] and destino in red["edges"] else None
+        if camino is None:
+            sin_camino += 1
+            rutas.append(None)
+            continue
+        # Por tramo, las conexiones posibles hacia el siguiente edge; el último sale de la red
+        tramos = [red["conexiones"][a][b] for a, b in zip(camino, camino[1:])]
+        tramos.append([(red["edges"][camino[-1]][0], None, None)])
+        # Largo y tiempo libre se toman de la primera opción de cada tramo (los carriles de
+        # un edge miden lo mismo); una ruta sin alternativas se comparte entre vehículos
+        fija = [opciones[0] for opciones in tramos]
+        largo = sum(red["lanes"][lane]["longitud"] for lane, _, _ in fija)
+        libre = sum(tiempos[lane] for lane, _, _ in fija)
+        unica = fija if all(len(opciones) == 1 for opciones in tramos) else None
+        rutas.append((fid, tramos, unica, largo, libre))
+        heapq.heappush(pendientes, (inicio, i, 0))
+
+    _sim = {
+        "t": 0.0, "fin": fin, "red": red, "tiempos": tiempos,
+        "semaforos": semaforos, "lanes_semaforo": lanes_semaforo, "eventos_tls": eventos_tls,
+        "orden_tls": {tls: orden for orden, tls in enumerate(red["semaforos"])},
+        "flujos": flujos, "rutas": rutas, "pendientes": pendientes, "sin_camino": sin_camino,
+        "colas": {lane: deque() for lane in red["lanes"]},
+        "libre": dict.fromkeys(red["lanes"], 0.0),
+        "vehiculos": {}, "activos": set(), "despertar": {},
+        "suscripciones": {}, "contextos": {}, "suscripciones_tls": {},
+        "salidos": 0, "llegados": 0, "salidos_paso": 0, "llegados_paso": 0,
+        "tripinfo": tripinfo, "viajes": [] if tripinfo else None,
+    }
+    return _sim
+
+def _despertar(tiempo, lane):
+    _sim["despertar"].setdefault(int(tiempo), set()).add(lane)
+
+def _entrar(vid, v, t):
+    lane = v[RUTA][v[POS]][0]
+    cola = _sim["colas"][lane]
+    v[T_LINEA] = t + _sim["tiempos"][lane]
+    if not cola:
+        _despertar(v[T_LINEA], lane)
+    cola.append(vid)
+
+def _insertar(t):
+    pendientes = _sim["pendientes"]
+    while pendientes and pendientes[0][0] <= t:
+        inicio, i, n = heapq.heappop(pendientes)
+        fid, tramos, ruta, largo, libre = _sim["rutas"][i]
+        periodo = _sim["flujos"][i][5]
+        if ruta is None:
+            # Entre conexiones equivalentes (varios carriles) se alterna por vehículo
+            ruta = [opciones[n % len(opciones)] for opciones in tramos]
+        vid = f"{fid}.{n}"
+        v = [ruta, 0, 0.0, t, 0.0, libre, largo]
+        _sim["vehiculos"][vid] = v
+        _entrar(vid, v, t)
+        _sim["salidos_paso"] += 1
+        siguiente = inicio + periodo
+        if siguiente < _sim["flujos"][i][4]:
+            heapq.heappush(pendientes, (siguiente, i, n + 1))
+
+def _cambiar_fase(tls, fase, t, duracion=None):
+    s = _sim["semaforos"][tls]
+    s["fase"] = fase
+    s["fin"] = t + (s["fases"][fase][0] if duracion is None else duracion)
+    s["version"] += 1
+    heapq.heappush(_sim["eventos_tls"], (s["fin"], _sim["orden_tls"][tls], s["version"], tls))
+    # Los lanes del semáforo con vehículos se revisan en el próximo paso
+    colas = _sim["colas"]
+    _sim["activos"].update(lane for lane in _sim["lanes_semaforo"].get(tls, ()) if colas[lane])
+
+def _paso():
+    t = _sim["t"] + 1
+    _sim["t"] = t
+    _sim["salidos_paso"] = 0
+    _sim["llegados_paso"] = 0
+
+    # Programa propio de cada semáforo (como SUMO cuando nadie llama setPhase)
+    eventos = _sim["eventos_tls"]
+    while eventos and eventos[0][0] <= t:
+        _, _, version, tls = heapq.heappop(eventos)
+        s = _sim["semaforos"][tls]
+        if version == s["version"]:
+            _cambiar_fase(tls, (s["fase"] + 1) % len(s["fases"]), t)
+
+    _insertar(t)
+    lanes = _sim["despertar"].pop(int(t), None)
+    if lanes:
+        _sim["activos"].update(lanes)
+
+    colas = _sim["colas"]
+    libre = _sim["libre"]
+    vehiculos = _sim["vehiculos"]
+    semaforos = _sim["semaforos"]
+    activos = _sim["activos"]
+    for lane in list(activos):
+        cola = colas[lane]
+        if not cola:
+            activos.discard(lane)
+            continue
+        vid = cola[0]
+        v = vehiculos[vid]
+        if v[T_LINEA] > t:
+            activos.discard(lane)
+            _despertar(v[T_LINEA], lane)
+            continue
+        if libre[lane] > t:
+            activos.discard(lane)
+            _despertar(libre[lane], lane)
+            continue
+        _, tls, enlace = v[RUTA][v[POS]]
+        if tls is not None:
+            s = semaforos[tls]
+            if s["fases"][s["fase"]][1][enlace] not in "Gg":
+                activos.discard(lane)  # vuelve a activarse cuando cambie la fase
+                continue
+        cola.popleft()
+        libre[lane] = t + (HEADWAY_VERDE if tls is not None else HEADWAY_LIBRE)
+        v[ESPERA] += t - v[T_LINEA]
+        v[POS] += 1
+        if v[POS] < len(v[RUTA]):
+            _entrar(vid, v, t)
+        else:
+            del vehiculos[vid]
+            _sim["llegados_paso"] += 1
+            if _sim["viajes"] is not None:
+                _sim["viajes"].append((vid, v[SALIDA], t, v[ESPERA], v[LIBRE], v[LARGO]))
+
+    _sim["salidos"] += _sim["salidos_paso"]
+    _sim["llegados"] += _sim["llegados_paso"]
+
+def _escribir_tripinfo(ruta):
+    with open(ruta, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<tripinfos>\n')
+        for vid, salida, llegada, espera, libre, largo in _sim["viajes"]:
+            duracion = llegada - salida
+            f.write(f'    <tripinfo id="{vid}" depart="{salida:.2f}" departLane="" departPos="0.00" '
+                    f'departSpeed="0.00" departDelay="0.00" arrival="{llegada:.2f}" arrivalLane="" '
+                    f'arrivalPos="0.00" arrivalSpeed="0.00" duration="{duracion:.2f}" '
+                    f'routeLength="{largo:.2f}" waitingTime="{espera:.2f}" waitingCount="0" stopTime="0.00" '
+                    f'timeLoss="{max(duracion - libre, 0.0):.2f}" rerouteNo="0" devices="" vType="car" '
+                    f'speedFactor="1.00" vaporized=""/>\n')
+        f.write('</tripinfos>\n')
+
+# ========= API estilo traci =========
+def _opciones(cmd):
+    opciones = {}
+    i = 1
+    while i < len(cmd):
+        if cmd[i].startswith("-") and i + 1 < len(cmd):
+            opciones[cmd[i].lstrip("-")] = cmd[i + 1]
+            i += 2
+        else:
+            i += 1
+    return opciones
+
+def start(cmd, port=None, numRetries=60, label="default", verbose=False,
+          traceFile=None, traceGetters=True, stdout=None, doSwitch=True):
+    opciones = _opciones(cmd)
+    if "load-state" in opciones:
+        raise ValueError("El simulador sintético no admite --load-state: no carga estados de SUMO")
+
+    base = "."
+    cfg = opciones.get("c") or opciones.get("configuration-file")
+    if cfg:
+        base = os.path.dirname(os.path.abspath(cfg))
+        for elem in ET.parse(cfg).getroot().iter():
+            valor = elem.attrib.get("value")
+            if valor is None:
+                continue
+            if elem.tag in ("net-file", "route-files", "tripinfo-output"):
+                # Rutas del .sumocfg: relativas a su directorio
+                valor = ",".join(os.path.join(base, v) for v in valor.split(","))
+            opciones.setdefault(elem.tag, valor)
+
+    red = leer_red(opciones.get("n") or opciones["net-file"])
+    rutas = opciones.get("r") or opciones.get("route-files", "")
+    flujos = leer_flujos([r for r in rutas.split(",") if r])
+    fin = float(opciones["end"]) if "end" in opciones else None
+    iniciar(red, flujos, fin, opciones.get("tripinfo-output"))
+    return (0, "simulado")
+
+def close(wait=True):
+    global _sim
+    if _sim is not None and _sim["tripinfo"]:
+        _escribir_tripinfo(_sim["tripinfo"])
+    _sim = None
+
+def simulationStep(step=0.):
+    if step and step > _sim["t"]:
+        while _sim["t"] < step:
+            _paso()
+    else:
+        _paso()
+
+def switch(label):
+    if label != "default":
+        raise ValueError(f"El simulador sintético solo admite la conexión 'default' (pedida: {label})")
+
+def getLabel():
+    return "default"
+
+def setOrder(order):
+    pass
+
+class _Simulacion:
+    def getTime(self):
+        return _sim["t"]
+
+    def getMinExpectedNumber(self):
+        if _sim["fin"] is not None and _sim["t"] >= _sim["fin"]:
+            return 0
+        return len(_sim["vehiculos"]) + len(_sim["pendientes"])
+
+    def getDepartedNumber(self):
+        return _sim["salidos_paso"]
+
+    def getArrivedNumber(self):
+        return _sim["llegados_paso"]
+
+    def saveState(self, fileName):
+        raise ValueError("El simulador sintético no admite saveState: no guarda estados de SUMO")
+
+    def loadState(self, fileName):
+        raise ValueError("El simulador sintético no admite loadState: no carga estados de SUMO")
+
+class _Lane:
+    def getIDList(self):
+        return tuple(_sim["colas"])
+
+    def getLastStepVehicleIDs(self, laneID):
+        return tuple(_sim["colas"][laneID])
+
+    def getLastStepVehicleNumber(self, laneID):
+        return len(_sim["colas"][laneID])
+
+    def subscribe(self, objectID, varIDs=(constants.LAST_STEP_VEHICLE_ID_LIST,), begin=0, end=2**31 - 1,
+                  parameters=None):
+        _sim["suscripciones"][objectID] = (tuple(varIDs), begin, end)
+
+    def subscribeContext(self, objectID, domain, dist, varIDs=(constants.VAR_SPEED,), begin=0, end=2**31 - 1,
+                         parameters=None):
+        _sim["contextos"][objectID] = (tuple(varIDs), begin, end)
+
+    def getSubscriptionResults(self, objectID):
+        suscripcion = _sim["suscripciones"].get(objectID)
+        if suscripcion is None or not suscripcion[1] <= _sim["t"] <= suscripcion[2]:
+            return {}
+        cola = _sim["colas"][objectID]
+        valores = {constants.LAST_STEP_VEHICLE_ID_LIST: tuple(cola),
+                   constants.LAST_STEP_VEHICLE_NUMBER: len(cola)}
+        return {var: valores[var] for var in suscripcion[0] if var in valores}
+
+    def getContextSubscriptionResults(self, objectID):
+        contexto = _sim["contextos"].get(objectID)
+        if contexto is None or not contexto[1] <= _sim["t"] <= contexto[2]:
+            return {}
+        return {vid: {constants.VAR_SPEED: vehicle.getSpeed(vid)} for vid in _sim["colas"][objectID]}
+
+class _Vehiculo:
+    def getIDList(self):
+        return tuple(_sim["vehiculos"])
+
+    def getIDCount(self):
+        return len(_sim["vehiculos"])
+
+    def getSpeed(self, vehID):
+        v = _sim["vehiculos"][vehID]
+        if v[T_LINEA] > _sim["t"]:
+            return _sim["red"]["lanes"][v[RUTA][v[POS]][0]]["velocidad"]
+        return 0.0
+
+    def getLaneID(self, vehID):
+        v = _sim["vehiculos"][vehID]
+        return v[RUTA][v[POS]][0]
+
+class _Semaforo:
+    def getIDList(self):
+        return tuple(_sim["semaforos"])
+
+    def getPhase(self, tlsID):
+        return _sim["semaforos"][tlsID]["fase"]
+
+    def setPhase(self, tlsID, index):
+        _cambiar_fase(tlsID, index, _sim["t"])
+
+    def setPhaseDuration(self, tlsID, phaseDuration):
+        s = _sim["semaforos"][tlsID]
+        _cambiar_fase(tlsID, s["fase"], _sim["t"], phaseDuration)
+
+    def getPhaseDuration(self, tlsID):
+        s = _sim["semaforos"][tlsID]
+        return float(s["fases"][s["fase"]][0])
+
+    def getNextSwitch(self, tlsID):
+        return float(_sim["semaforos"][tlsID]["fin"])
+
+    def subscribe(self, objectID, varIDs=(constants.TL_CURRENT_PHASE,), begin=0, end=2**31 - 1, parameters=None):
+        _sim["suscripciones_tls"][objectID] = (tuple(varIDs), begin, end)
+
+    def getSubscriptionResults(self, objectID):
+        suscripcion = _sim["suscripciones_tls"].get(objectID)
+        if suscripcion is None or not suscripcion[1] <= _sim["t"] <= suscripcion[2]:
+            return {}
+        valores = {constants.TL_CURRENT_PHASE: self.getPhase(objectID),
+                   constants.TL_NEXT_SWITCH: self.getNextSwitch(objectID)}
+        return {var: valores[var] for var in suscripcion[0] if var in valores}
+
+    def getProgram(self, tlsID):
+        return "0"
+
+    def getRedYellowGreenState(self, tlsID):
+        s = _sim["semaforos"][tlsID]
+        return s["fases"][s["fase"]][1]
+
+simulation = _Simulacion()
+lane = _Lane()
+vehicle = _Vehiculo()
+trafficlight = _Semaforo()
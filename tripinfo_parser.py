@@ -0,0 +1,170 @@
+import argparse
+import gzip
+import json
+import xml.etree.ElementTree as ET
+from array import array
+import numpy as np
+
+# Lector en streaming de las salidas XML de SUMO (tripinfo y statistic-output).
+# Recorre el archivo con iterparse y libera cada elemento al procesarlo, así que la
+# memoria no depende del tamaño del XML (solo de las columnas tipadas que se generan).
+# Reemplaza el paso xml2csv.py + pandas.read_csv: las columnas se llaman igual que en
+# la salida de xml2csv ("tripinfo_waitingTime", ...) para que los plotters no cambien.
+
+NUMERICOS = ("depart", "departPos", "departSpeed", "departDelay", "arrival", "arrivalPos",
+             "arrivalSpeed", "duration", "routeLength", "waitingTime", "waitingCount",
+             "stopTime", "timeLoss", "rerouteNo", "speedFactor")
+CATEGORICOS = ("departLane", "arrivalLane", "vType", "vaporized")
+PREFIJO = "tripinfo_"
+
+def abrir_xml(ruta):
+    # Detecta gzip por los bytes mágicos, no por la extensión
+    with open(ruta, "rb") as f:
+        es_gzip = f.read(2) == b"\x1f\x8b"
+    return gzip.open(ruta, "rb") if es_gzip else open(ruta, "rb")
+
+def _a_float(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return float("nan")
+
+def parsear_tripinfo(ruta, incluir_ids=True):
+    numericos = {nombre: array("d") for nombre in NUMERICOS}
+    codigos = {nombre: array("I") for nombre in CATEGORICOS}
+    diccionarios = {nombre: {} for nombre in CATEGORICOS}
+    ids = []
+
+    with abrir_xml(ruta) as f:
+        contexto = ET.iterparse(f, events=("start", "end"))
+        _, raiz = next(contexto)
+        for evento, elem in contexto:
+            if evento != "end" or elem.tag != "tripinfo":
+                continue
+
+            atributos = elem.attrib
+            for nombre, columna in numericos.items():
+                columna.append(_a_float(atributos.get(nombre)))
+            for nombre, columna in codigos.items():
+                dic = diccionarios[nombre]
+                valor = atributos.get(nombre, "")
+                codigo = dic.get(valor)
+                if codigo is None:
+                    codigo = dic[valor] = len(dic)
+                columna.append(codigo)
+            if incluir_ids:
+                ids.append(atributos.get("id", ""))
+
+            # Liberar lo ya procesado (el elemento y sus hijos cuelgan de la raíz)
+            raiz.clear()
+
+    columnas = {PREFIJO + nombre: np.frombuffer(columna, dtype=np.float64) for nombre, columna in numericos.items()}
+    for nombre, columna in codigos.items():
+        tipo = np.uint16 if len(diccionarios[nombre]) <= np.iinfo(np.uint16).max else np.uint32
+        columnas[PREFIJO + nombre] = np.frombuffer(columna, dtype=np.uint32).astype(tipo)
+    if incluir_ids:
+        columnas[PREFIJO + "id"] = np.array(ids)
+
+    return {
+        "columnas": columnas,
+        "diccionarios": {PREFIJO + nombre: list(dic) for nombre, dic in diccionarios.items()}
+    }
+
+def parsear_estadisticas(ruta):
+    # statistic-output: un elemento por sección (<vehicles loaded=... />, ...) -> "seccion_atributo"
+    resultado = {}
+    with abrir_xml(ruta) as f:
+        contexto = ET.iterparse(f, events=("start", "end"))
+        _, raiz = next(contexto)
+        for evento, elem in contexto:
+            if evento != "end" or elem is raiz:
+                continue
+            for atributo, valor in elem.attrib.items():
+                try:
+                    resultado[f"{elem.tag}_{atributo}"] = int(valor)
+                except ValueError:
+                    try:
+                        resultado[f"{elem.tag}_{atributo}"] = float(valor)
+                    except ValueError:
+                        resultado[f"{elem.tag}_{atributo}"] = valor
+            raiz.clear()
+    return resultado
+
+def tipo_salida_sumo(ruta):
+    # Etiqueta raíz del XML: "tripinfos" o "statistics"
+    with abrir_xml(ruta) as f:
+        for _, elem in ET.iterparse(f, events=("start",)):
+            return elem.tag
+
+# ========= Escritura / lectura de tablas =========
+def guardar_tabla(tabla, ruta):
+    columnas = tabla["columnas"]
+    diccionarios = tabla["diccionarios"]
+
+    if ruta.endswith(".npz"):
+        arrays = dict(columnas)
+        for nombre, valores in diccionarios.items():
+            arrays[f"__diccionario__{nombre}"] = np.array(valores)
+        np.savez(ruta, **arrays)
+    elif ruta.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        campos = {}
+        for nombre, valores in columnas.items():
+            if nombre in diccionarios:
+                campos[nombre] = pa.DictionaryArray.from_arrays(pa.array(valores), pa.array(diccionarios[nombre]))
+            else:
+                campos[nombre] = pa.array(valores)
+        pq.write_table(pa.table(campos), ruta)
+    else:
+        tabla_a_dataframe(tabla).to_csv(ruta, index=False)
+
+def tabla_a_dataframe(tabla):
+    import pandas as pd
+    datos = {}
+    for nombre, valores in tabla["columnas"].items():
+        if nombre in tabla["diccionarios"]:
+            datos[nombre] = pd.Categorical.from_codes(valores.astype(np.int64), tabla["diccionarios"][nombre])
+        else:
+            datos[nombre] = valores
+    return pd.DataFrame(datos)
+
+def cargar_tabla(ruta):
+    # DataFrame desde .npz (de este módulo), .parquet o .csv (p. ej. de xml2csv)
+    import pandas as pd
+    if ruta.endswith(".npz"):
+        with np.load(ruta, allow_pickle=False) as datos:
+            columnas = {k: datos[k] for k in datos.files if not k.startswith("__diccionario__")}
+            diccionarios = {k[len("__diccionario__"):]: datos[k].tolist()
+                            for k in datos.files if k.startswith("__diccionario__")}
+        return tabla_a_dataframe({"columnas": columnas, "diccionarios": diccionarios})
+    if ruta.endswith(".parquet"):
+        return pd.read_parquet(ruta)
+    return pd.read_csv(ruta)
+
+def convertir(entrada, salida):
+    tipo = tipo_salida_sumo(entrada)
+    if tipo == "statistics":
+        estadisticas = parsear_estadisticas(entrada)
+        if salida.endswith(".json"):
+            with open(salida, "w") as f:
+                json.dump(estadisticas, f, indent=2)
+        else:
+            guardar_tabla({"columnas": {k: np.array([v]) for k, v in estadisticas.items()},
+                           "diccionarios": {}}, salida)
+        return estadisticas
+    if tipo == "tripinfos":
+        tabla = parsear_tripinfo(entrada)
+        guardar_tabla(tabla, salida)
+        return tabla
+    raise ValueError(f"Salida de SUMO no soportada: <{tipo}> en {entrada}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convierte tripinfo/statistics de SUMO a tablas (.npz, .parquet, .csv, .json)")
+    parser.add_argument("entrada", help="XML de SUMO (puede estar comprimido con gzip)")
+    parser.add_argument("-o", "--salida", required=True, help="archivo de salida; el formato sale de la extensión")
+    args = parser.parse_args()
+
+    resultado = convertir(args.entrada, args.salida)
+    filas = len(next(iter(resultado["columnas"].values()))) if "columnas" in resultado else 1
+    print(f"✅ {args.entrada} → {args.salida} ({filas} filas)")
@@ -0,0 +1,162 @@
+import argparse
+import itertools
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from generate_routes import horas_pico
+from sumo_backend import BACKEND_POR_DEFECTO, BACKENDS
+from tripinfo_parser import cargar_tabla
+from columnar_logs import leer_log
+from warm_start import SUMO_CFG_CALENTAMIENTO, calentar_varios, ruta_estado
+from escenarios import (CONTROLADORES, DEMANDA_POR_DEFECTO, PUERTO_BASE, RAIZ,
+                        ejecutar_matriz, mostrar_resultado)
+
+# Evaluación por ventanas (por defecto las horas pico de generate_routes): un solo
+# calentamiento guarda el estado al inicio de cada ventana y cada ventana × controlador ×
+# semilla corre en paralelo desde ese estado hasta el fin de la ventana. Las métricas de
+# tripinfo y de los registros de semáforos se juntan por ventana y en un total combinado.
+
+def nombre_ventana(inicio, fin):
+    return f"{int(inicio) // 3600:02d}{int(inicio) % 3600 // 60:02d}-{int(fin) // 3600:02d}{int(fin) % 3600 // 60:02d}"
+
+def parsear_ventanas(especificaciones):
+    # ["21600-25200", ...] o ["06:00-07:00", ...]
+    def segundos(texto):
+        if ":" in texto:
+            horas, minutos = texto.split(":")
+            return int(horas) * 3600 + int(minutos) * 60
+        return int(float(texto))
+    ventanas = []
+    for espec in especificaciones:
+        inicio, fin = (segundos(t) for t in espec.split("-"))
+        if not inicio < fin:
+            raise ValueError(f"Ventana vacía: {espec}")
+        ventanas.append((inicio, fin))
+    return ventanas
+
+def preparar_estados_ventanas(ventanas, demanda, directorio, backend=BACKEND_POR_DEFECTO):
+    # Las ventanas que empiezan en t=0 no necesitan estado
+    os.makedirs(directorio, exist_ok=True)
+    destinos = {inicio: ruta_estado(directorio, demanda, inicio) for inicio, _ in ventanas if inicio > 0}
+    estados = {}
+    if destinos:
+        for r in calentar_varios(destinos, os.path.abspath(demanda), None,
+                                 os.path.join(RAIZ, SUMO_CFG_CALENTAMIENTO), backend):
+            estados[r["tiempo"]] = r["estado"]
+    return estados
+
+def armar_corridas_ventanas(ventanas, estados, controladores, semillas, demanda, salida,
+                            backend=BACKEND_POR_DEFECTO, puerto_base=PUERTO_BASE):
+    corridas = []
+    for i, ((inicio, fin), controlador, semilla) in enumerate(itertools.product(ventanas, controladores, semillas)):
+        ventana = nombre_ventana(inicio, fin)
+        nombre = f"{ventana}_{controlador}_s{semilla}"
+        corridas.append({
+            "nombre": nombre, "controlador": controlador, "demanda": os.path.abspath(demanda),
+            "semilla": semilla, "directorio": os.path.abspath(os.path.join(salida, ventana, f"{controlador}_s{semilla}")),
+            "puerto": puerto_base + i, "etiqueta": nombre, "backend": backend,
+            "ventana": ventana, "inicio": inicio, "fin": fin, "estado_inicial": estados.get(inicio),
+        })
+    return corridas
+
+# ========= Métricas =========
+def _registro_semaforos(directorio, controlador):
+    # Vehículos en los lanes de la fase (al decidir en fuzzy, al terminar la fase en actuated)
+    if controlador == "actuated":
+        ruta = os.path.join(directorio, "datos_semaforos_actuated.csv")
+        columna = "vehiculos_en_carriles"
+    else:
+        ruta = os.path.join(directorio, "datos_semaforos_fuzzy")
+        columna = "num_vehiculos"
+        for sufijo in ("", ".csv", ".parquet"):
+            if os.path.exists(ruta + sufijo):
+                ruta += sufijo
+                break
+    if not os.path.exists(ruta):
+        return None
+    return leer_log(ruta)[columna].to_numpy()
+
+def metricas_corrida(resultado):
+    # Solo los viajes que empiezan dentro de la ventana; los no terminados cuentan hasta el fin
+    fila = {"ventana": resultado["ventana"], "controlador": resultado["controlador"],
+            "semilla": resultado["semilla"], "inicio": resultado["inicio"], "fin": resultado["fin"]}
+    tabla = os.path.join(resultado["directorio"], "tripinfo.npz")
+    if resultado["codigo_salida"] != 0 or not os.path.exists(tabla):
+        return dict(fila, vehiculos=0)
+
+    viajes = cargar_tabla(tabla)
+    salida = viajes["tripinfo_depart"]
+    viajes = viajes[(salida >= resultado["inicio"]) & (salida < resultado["fin"])]
+    fila.update({
+        "vehiculos": len(viajes),
+        "sin_terminar": int((viajes["tripinfo_arrival"] < 0).sum()),
+        "espera_media": viajes["tripinfo_waitingTime"].mean(),
+        "perdida_media": viajes["tripinfo_timeLoss"].mean(),
+        "duracion_media": viajes["tripinfo_duration"].mean(),
+    })
+    vehiculos_fase = _registro_semaforos(resultado["directorio"], resultado["controlador"])
+    if vehiculos_fase is not None and len(vehiculos_fase):
+        fila["vehiculos_por_fase"] = float(np.mean(vehiculos_fase))
+    return fila
+
+def combinar(metricas):
+    # Por ventana: promedio entre semillas. Combinado: promedio ponderado por vehículos
+    df = pd.DataFrame(metricas)
+    columnas = [c for c in ("espera_media", "perdida_media", "duracion_media", "vehiculos_por_fase") if c in df]
+    por_ventana = df.groupby(["ventana", "controlador"], sort=False)[["vehiculos", "sin_terminar"] + columnas] \
+        .mean().reset_index()
+
+    filas = []
+    for controlador, grupo in df[df["vehiculos"] > 0].groupby("controlador", sort=False):
+        pesos = grupo["vehiculos"]
+        fila = {"controlador": controlador, "ventanas": grupo["ventana"].nunique(),
+                "vehiculos": pesos.sum() / grupo["semilla"].nunique()}
+        for c in columnas:
+            validos = grupo[c].notna()
+            fila[c] = np.average(grupo.loc[validos, c], weights=pesos[validos]) if validos.any() else np.nan
+        filas.append(fila)
+    return por_ventana, pd.DataFrame(filas)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara controladores solo en ventanas de tiempo (horas pico)")
+    parser.add_argument("--ventanas", nargs="+", default=None,
+                        help="inicio-fin en segundos o HH:MM (por defecto, horas_pico de generate_routes)")
+    parser.add_argument("--controladores", nargs="+", choices=list(CONTROLADORES), default=list(CONTROLADORES))
+    parser.add_argument("--semillas", nargs="+", type=int, default=[42])
+    parser.add_argument("--demanda", default=DEMANDA_POR_DEFECTO)
+    parser.add_argument("--salida", default="./ventanas")
+    parser.add_argument("--procesos", type=int, default=None)
+    parser.add_argument("--backend", choices=BACKENDS, default=BACKEND_POR_DEFECTO)
+    parser.add_argument("--puerto-base", type=int, default=PUERTO_BASE,
+                        help="puerto TraCI de la primera corrida (uno distinto por evaluación en paralelo)")
+    parser.add_argument("extra", nargs=argparse.REMAINDER,
+                        help="tras '--', argumentos adicionales para Fuzzy_logic.py")
+    args = parser.parse_args()
+    extra = args.extra[1:] if args.extra[:1] == ["--"] else args.extra
+
+    ventanas = parsear_ventanas(args.ventanas) if args.ventanas else list(horas_pico)
+    if args.backend == "simulado" and any(inicio > 0 for inicio, _ in ventanas):
+        parser.error("las ventanas que no empiezan en 0 necesitan SUMO: el backend simulado no guarda estados")
+    os.makedirs(args.salida, exist_ok=True)
+    inicio = time.perf_counter()
+
+    estados = preparar_estados_ventanas(ventanas, args.demanda, os.path.join(args.salida, "estados"), args.backend)
+    print(f"💾 {len(estados)} estados en {time.perf_counter() - inicio:.0f}s")
+
+    corridas = armar_corridas_ventanas(ventanas, estados, args.controladores, args.semillas,
+                                       args.demanda, args.salida, args.backend, args.puerto_base)
+    print(f"▶️ {len(corridas)} corridas ({len(ventanas)} ventanas) en {args.procesos or os.cpu_count()} procesos")
+    resultados = ejecutar_matriz(corridas, args.procesos, extra, mostrar_resultado)
+
+    por_ventana, combinado = combinar([metricas_corrida(r) for r in resultados])
+    por_ventana.to_csv(os.path.join(args.salida, "reporte_ventanas.csv"), index=False)
+    combinado.to_csv(os.path.join(args.salida, "reporte_combinado.csv"), index=False)
+    with open(os.path.join(args.salida, "manifiesto.json"), "w") as f:
+        json.dump({"ventanas": ventanas, "segundos_totales": round(time.perf_counter() - inicio, 2),
+                   "corridas": resultados}, f, indent=2, ensure_ascii=False)
+
+    with pd.option_context("display.width", 140, "display.float_format", "{:.2f}".format):
+        print("\n📊 Por ventana\n", por_ventana.to_string(index=False))
+        print("\n📊 Combinado\n", combinado.to_string(index=False))
@@ -0,0 +1,62 @@
+import argparse
+import os
+from sumo_backend import traci, usar_backend, agregar_argumento_backend, opciones_sumo, OPCIONES_ESTADO
+
+# Calentamiento compartido: se simula una sola vez (plan fijo, sin controlador) hasta el
+# instante elegido y se guarda el estado de SUMO. Las corridas static, actuated y fuzzy
+# (y los candidatos del optimizador) arrancan desde ahí con --estado-inicial en lugar de
+# repetir las horas de tráfico nocturno desde t=0.
+SUMO_CFG_CALENTAMIENTO = "./sumo_files/osm_static.sumocfg"
+
+def ruta_estado(directorio, demanda, tiempo):
+    base = os.path.basename(demanda).split(".")[0]
+    return os.path.join(directorio, f"estado_{base}_{int(tiempo)}.xml.gz")
+
+def ruta_temporal(salida):
+    # SUMO elige el formato por la extensión (.xml, .xml.gz, .sbx): se conserva completa
+    directorio, nombre = os.path.split(os.path.abspath(salida))
+    base, _, extension = nombre.partition(".")
+    return os.path.join(directorio, f"{base}.{os.getpid()}.tmp" + (f".{extension}" if extension else ""))
+
+def calentar_varios(destinos, rutas=None, seed=None, sumo_cfg=SUMO_CFG_CALENTAMIENTO, backend=None):
+    # destinos: {tiempo: archivo}; una sola simulación guarda todos los instantes en orden
+    primero = next(iter(destinos.values()))
+    # Las salidas de esta simulación no interesan: van a un directorio al lado del estado
+    salidas = os.path.join(os.path.dirname(os.path.abspath(primero)), "calentamiento")
+    usar_backend(backend)
+    traci.start(["sumo", "-c", sumo_cfg, "--no-step-log", "true", "--verbose", "false",
+                 "--duration-log.statistics", "false"] + OPCIONES_ESTADO
+                + opciones_sumo(sumo_cfg, seed, rutas, salidas))
+    resultados = []
+    try:
+        for tiempo in sorted(destinos):
+            salida = destinos[tiempo]
+            traci.simulationStep(tiempo)
+            # Escritura atómica: varias corridas pueden estar esperando este archivo
+            temporal = ruta_temporal(salida)
+            traci.simulation.saveState(temporal)
+            os.replace(temporal, salida)
+            resultados.append({"estado": os.path.abspath(salida), "tiempo": tiempo,
+                               "vehiculos": traci.vehicle.getIDCount()})
+    finally:
+        traci.close()
+    return resultados
+
+def calentar(tiempo, salida, rutas=None, seed=None, sumo_cfg=SUMO_CFG_CALENTAMIENTO, backend=None):
+    return calentar_varios({tiempo: salida}, rutas, seed, sumo_cfg, backend)[0]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simula hasta un instante y guarda el estado de SUMO")
+    agregar_argumento_backend(parser)
+    parser.add_argument("--tiempo", type=float, required=True, help="instante de simulación a guardar (s)")
+    parser.add_argument("-o", "--salida", default=None, help="archivo de estado (.xml, .xml.gz o .sbx)")
+    parser.add_argument("--rutas", default=None, help="demanda (por defecto, la del .sumocfg)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    if args.backend == "simulado":
+        parser.error("el backend simulado no guarda estados de SUMO")
+
+    salida = args.salida or ruta_estado("./estados", args.rutas or "generated_routes_hourly", args.tiempo)
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    resultado = calentar(args.tiempo, salida, args.rutas, args.seed, backend=args.backend)
+    print(f"💾 Estado en t={resultado['tiempo']:.0f}s ({resultado['vehiculos']} vehículos): {resultado['estado']}")